@@ -1,5 +1,9 @@
-from .main import run
+import time
+
+_STARTED = time.perf_counter()
+
+from .main import run  # noqa: E402 - timed from before the import
 
 
 if __name__ == "__main__":
-    run()
+    run(started=_STARTED)
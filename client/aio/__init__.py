@@ -0,0 +1 @@
+"""Asyncio variant of the client that can drive many identities on one event loop."""
@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+from ..main import run_many
+
+
+if __name__ == "__main__":
+    run_many([Path(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from .. import frames
+from ..api import POLL_INTERVAL_HEADER, POLL_WAIT_HEADER, PollResult, header_seconds, seal_envelope
+from .transport import AsyncClientTransport
+
+
+async def register_client(transport: AsyncClientTransport, fingerprint: str, name: Optional[str]) -> Dict[str, str]:
+    response = await transport.request(
+        "register",
+        "POST",
+        "/api/v1/clients/register",
+        authenticated=False,
+        json={"name": name, "fingerprint": fingerprint} if name else {"fingerprint": fingerprint},
+    )
+    response.raise_for_status()
+    data = response.json()
+    data["fingerprint"] = fingerprint
+    return data
+
+
+async def ack_messages(transport: AsyncClientTransport, last_id: str) -> None:
+    response = await transport.request(
+        "ack",
+        "POST",
+        "/api/v1/messages/ack",
+        json={"last_received_id": last_id},
+    )
+    response.raise_for_status()
+
+
+async def fast_forward(transport: AsyncClientTransport) -> Optional[int]:
+    response = await transport.request("ack", "POST", "/api/v1/messages/fast-forward")
+    response.raise_for_status()
+    return response.json().get("last_acked_message_id")
+
+
+async def poll_page(
+    transport: AsyncClientTransport,
+    cursor: Optional[str],
+    limit: Optional[int] = None,
+    ack: bool = False,
+    wait: Optional[int] = None,
+    binary: bool = False,
+) -> PollResult:
+    params: Dict[str, Any] = {}
+    kwargs: Dict[str, Any] = {}
+    if binary:
+        kwargs["headers"] = {"Accept": frames.ACCEPT}
+    if cursor:
+        params["cursor"] = cursor
+    if limit:
+        params["limit"] = limit
+    if ack and cursor:
+        # The server treats the cursor as an ack, replacing a separate ack request.
+        params["ack"] = 1
+    if wait:
+        # Long poll: the server may hold the request for up to ``wait`` seconds.
+        params["wait"] = wait
+        kwargs["timeout"] = transport.policies["poll"].timeout + wait
+    response = await transport.request("poll", "GET", "/api/v1/messages/poll", params=params, **kwargs)
+    hint = header_seconds(response.headers.get(POLL_INTERVAL_HEADER))
+    held = header_seconds(response.headers.get(POLL_WAIT_HEADER))
+    if response.status == 204:
+        return PollResult([], poll_interval=hint, held=held)
+    response.raise_for_status()
+    if response.headers.get("Content-Type", "").startswith(frames.MEDIA_TYPE):
+        messages, has_more, next_cursor = frames.decode_page(response.content)
+        return PollResult(messages, has_more, next_cursor, hint, held)
+    body = response.json()
+    return PollResult(body.get("messages", []), bool(body.get("has_more")), body.get("next_cursor"), hint, held)
+
+
+async def poll_once(transport: AsyncClientTransport, cursor: Optional[str]) -> List[Dict[str, Any]]:
+    return (await poll_page(transport, cursor)).messages
+
+
+async def send_message(transport: AsyncClientTransport, plaintext: Dict[str, Any]) -> None:
+    response = await transport.request(
+        "send", "POST", "/api/v1/messages/send", json=seal_envelope(transport.creds, plaintext, transport.compression)
+    )
+    response.raise_for_status()
+
+
+async def send_batch(transport: AsyncClientTransport, plaintexts: List[Dict[str, Any]]) -> None:
+    creds = transport.creds
+    response = await transport.request(
+        "send",
+        "POST",
+        "/api/v1/messages/send-batch",
+        json={"messages": [seal_envelope(creds, plaintext, transport.compression) for plaintext in plaintexts]},
+    )
+    response.raise_for_status()
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from ..handlers import AsyncPlaintextMessageHandler
+from . import api as aio_api
+from .transport import AsyncClientTransport
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncConsoleMessageHandler(AsyncPlaintextMessageHandler):
+    def __init__(self, transport: AsyncClientTransport) -> None:
+        self.transport = transport
+
+    async def handle_plaintext(
+        self, message: Dict[str, Any], plaintext: Dict[str, Any], creds: Dict[str, str]
+    ) -> None:
+        print(f"[{creds['client_id'][:8]} received #{message['id']}] {json.dumps(plaintext)}")
+
+        if plaintext.get("type") == "test":
+            response_payload = {
+                "type": "test_response",
+                "payload": {"message": "work", "in_reply_to": message.get("id")},
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+            }
+            await aio_api.send_message(self.transport, response_payload)
+            logger.info("Sent automated response for test message.", extra={"message_id": message.get("id")})
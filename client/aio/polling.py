@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+import aiohttp
+
+from .. import metrics
+from ..crypto import Compression
+from ..handlers import AsyncMessageHandler
+from ..polling import PollScheduler, page_items, record_page, report_http_error, retry_after_seconds
+from ..storage import CursorCheckpoint
+from ..transport import TransportStats
+from . import api as aio_api
+from .handlers import AsyncConsoleMessageHandler
+from .transport import AsyncClientTransport, AsyncHTTPError, create_session
+
+logger = logging.getLogger(__name__)
+
+
+async def poll_loop(
+    transport: AsyncClientTransport,
+    handler: AsyncMessageHandler,
+    start_cursor: Optional[str] = None,
+    stop_event: Optional[asyncio.Event] = None,
+    page_size: Optional[int] = None,
+    ack_on_poll: bool = False,
+    scheduler: Optional[PollScheduler] = None,
+    long_poll: Optional[int] = None,
+    binary: bool = False,
+    checkpoint: Optional[CursorCheckpoint] = None,
+) -> None:
+    """Async counterpart of :func:`client.polling.poll_loop` for one identity.
+
+    A ``checkpoint`` records the last handled id after every cycle and is
+    flushed on exit, so a restart can resume from it.
+    """
+
+    creds = transport.creds
+    label = creds["client_id"][:8]
+    scheduler = scheduler or PollScheduler()
+    cursor: Optional[str] = start_cursor
+    acked: Optional[str] = start_cursor
+    try:
+        delay = scheduler.initial_delay()
+        while not await _wait(stop_event, delay):
+            try:
+                page = await aio_api.poll_page(
+                    transport, cursor, page_size, ack=ack_on_poll and cursor != acked, wait=long_poll, binary=binary
+                )
+                record_page(page)
+                if ack_on_poll:
+                    acked = cursor
+                messages = page.messages
+                if long_poll and page.held is None:
+                    logger.warning(
+                        "[%s] Server does not support long polling; falling back to short polling.",
+                        label,
+                        extra={"client": label},
+                    )
+                    long_poll = None
+                if not messages and long_poll:
+                    delay = scheduler.after_held_poll(page.poll_interval)
+                elif not messages:
+                    delay = scheduler.after_empty(page.poll_interval)
+                    logger.debug(
+                        "[%s] No messages. Next poll in %.1fs", label, delay, extra={"client": label, "delay": delay}
+                    )
+                else:
+                    last_id = None
+                    # Decrypt off the event loop so other identities keep polling.
+                    items = await asyncio.get_running_loop().run_in_executor(
+                        None, page_items, handler, creds, messages
+                    )
+                    for msg, plaintext in items:
+                        kind = str(msg.get("type"))
+                        started = time.perf_counter()
+                        try:
+                            if plaintext is None:
+                                await handler.handle(msg, creds)
+                            elif isinstance(plaintext, Exception):
+                                raise plaintext
+                            else:
+                                await handler.handle_plaintext(msg, plaintext, creds)
+                        except Exception as exc:  # pylint: disable=broad-except
+                            metrics.registry.inc("client_handler_errors_total", type=kind)
+                            detail = str(exc).strip() or exc.__class__.__name__
+                            logger.error(
+                                "[%s] Error handling message %s: %s",
+                                label,
+                                msg["id"],
+                                detail,
+                                extra={"client": label, "message_id": msg["id"], "message_type": kind},
+                            )
+                        metrics.registry.observe("client_handler_seconds", time.perf_counter() - started, type=kind)
+                        # Only once the handler has returned, so a cancellation inside it is never acked.
+                        cursor = last_id = msg["id"]
+                    if last_id is not None and not ack_on_poll:
+                        await aio_api.ack_messages(transport, last_id)
+                        acked = last_id
+                    delay = scheduler.after_messages(page.has_more, page.poll_interval)
+                if checkpoint is not None:
+                    checkpoint.record(cursor)
+            except AsyncHTTPError as exc:
+                metrics.registry.inc("client_polls_total", result="error")
+                delay = scheduler.after_error(retry_after_seconds(exc.headers))
+                logger.warning(
+                    "[%s] Error during poll (status %s): %s. Retrying in %.1fs",
+                    label,
+                    exc.status,
+                    exc,
+                    delay,
+                    extra={"client": label, "status": exc.status, "delay": delay},
+                )
+                report_http_error(exc.status, exc.text)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                metrics.registry.inc("client_polls_total", result="error")
+                delay = scheduler.after_error()
+                detail = str(exc).strip() or exc.__class__.__name__
+                logger.warning(
+                    "[%s] Error during poll: %s. Retrying in %.1fs. Confirm the server is running at %s.",
+                    label,
+                    detail,
+                    delay,
+                    transport.base_url,
+                    extra={"client": label, "delay": delay},
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                metrics.registry.inc("client_polls_total", result="error")
+                delay = scheduler.after_error()
+                detail = str(exc).strip() or exc.__class__.__name__
+                logger.error(
+                    "[%s] Error during poll: %s. Retrying in %.1fs", label, detail, delay, extra={"client": label, "delay": delay}
+                )
+            metrics.registry.set("client_poll_delay_seconds", delay)
+    finally:
+        if checkpoint is not None:
+            checkpoint.record(cursor)
+            checkpoint.flush()
+        if cursor is not None and cursor != acked:
+            try:
+                await aio_api.ack_messages(transport, cursor)
+            except (aiohttp.ClientError, asyncio.TimeoutError, AsyncHTTPError) as exc:
+                logger.warning(
+                    "[%s] Unable to ack %s on shutdown: %s", label, cursor, exc, extra={"client": label, "message_id": cursor}
+                )
+
+
+async def _wait(stop_event: Optional[asyncio.Event], delay: float) -> bool:
+    """Sleep for ``delay`` seconds; return ``True`` if the loop should stop."""
+
+    if stop_event is None:
+        # Even a zero delay yields, so a draining identity cannot starve the others.
+        await asyncio.sleep(delay)
+        return False
+    if delay <= 0:
+        await asyncio.sleep(0)
+        return stop_event.is_set()
+    try:
+        await asyncio.wait_for(stop_event.wait(), timeout=delay)
+    except asyncio.TimeoutError:
+        pass
+    return stop_event.is_set()
+
+
+async def run_identities(
+    base_url: str,
+    identities: Iterable[Dict[str, str]],
+    handler_factory: Callable[[AsyncClientTransport], AsyncMessageHandler] = AsyncConsoleMessageHandler,
+    pool_limit: int = 100,
+    stop_event: Optional[asyncio.Event] = None,
+    page_size: Optional[int] = None,
+    ack_on_poll: bool = False,
+    scheduler_factory: Callable[[], PollScheduler] = PollScheduler,
+    long_poll: Optional[int] = None,
+    binary: bool = False,
+    compression: Optional[Compression] = None,
+    checkpoint_factory: Optional[Callable[[Dict[str, str]], CursorCheckpoint]] = None,
+    skip_backlog: bool = False,
+) -> TransportStats:
+    """Poll for every credential set concurrently over one shared connection pool.
+
+    With a ``checkpoint_factory`` each identity resumes after its last
+    checkpointed message, like the single-identity client; identities without
+    a checkpoint (or all of them with ``skip_backlog``) fast-forward past
+    their backlog instead. An identity that fails (for example a 401 while
+    fast-forwarding) is logged and stops on its own; the others keep polling.
+    """
+
+    stats = TransportStats()
+    async with create_session(limit=pool_limit, stats=stats) as session:
+        transports = [AsyncClientTransport(base_url, session, creds, compression=compression) for creds in identities]
+
+        async def run_one(transport: AsyncClientTransport) -> None:
+            label = transport.creds["client_id"][:8]
+            try:
+                checkpoint = checkpoint_factory(transport.creds) if checkpoint_factory is not None else None
+                cursor = checkpoint.load(transport.creds["client_id"]) if checkpoint is not None else None
+                if cursor is not None and not skip_backlog:
+                    logger.info("[%s] Resuming after message %s", label, cursor, extra={"client": label, "cursor": cursor})
+                else:
+                    cursor = await aio_api.fast_forward(transport)
+                await poll_loop(
+                    transport,
+                    handler_factory(transport),
+                    start_cursor=cursor,
+                    stop_event=stop_event,
+                    page_size=page_size,
+                    ack_on_poll=ack_on_poll,
+                    scheduler=scheduler_factory(),
+                    long_poll=long_poll,
+                    binary=binary,
+                    checkpoint=checkpoint,
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                detail = str(exc).strip() or exc.__class__.__name__
+                logger.error("[%s] Identity stopped: %s", label, detail, extra={"client": label})
+
+        await asyncio.gather(*(run_one(transport) for transport in transports))
+
+    return stats
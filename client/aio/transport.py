@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from typing import Any, Dict, Mapping, Optional
+
+import aiohttp
+
+from .. import metrics
+from ..api import auth_headers
+from ..crypto import Compression
+from ..transport import DEFAULT_POLICIES, RETRY_STATUSES, EndpointPolicy, TransportStats
+
+
+class AsyncHTTPError(Exception):
+    """Raised for non-2xx responses; mirrors ``requests.HTTPError`` enough for error reporting."""
+
+    def __init__(self, status: int, text: str, url: str, headers: Optional[Mapping[str, str]] = None) -> None:
+        super().__init__(f"{status} Error for url: {url}")
+        self.status = status
+        self.text = text
+        self.headers = headers or {}
+
+
+class AsyncResponse:
+    """Fully-read response, so callers never hold a pooled connection open."""
+
+    def __init__(self, status: int, headers: Mapping[str, str], content: bytes, url: str) -> None:
+        self.status = status
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            raise AsyncHTTPError(self.status, self.text, self.url, self.headers)
+
+
+def create_session(limit: int = 100, stats: Optional[TransportStats] = None) -> aiohttp.ClientSession:
+    """Build the ``aiohttp`` session whose connector pool is shared by every identity.
+
+    When ``stats`` is supplied, connection creation and reuse are counted through
+    aiohttp's trace hooks so the pool's effectiveness can be confirmed.
+    """
+
+    trace_configs = []
+    if stats is not None:
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session: Any, ctx: Any, params: Any) -> None:
+            stats.record_request()
+
+        async def on_connection_create_end(session: Any, ctx: Any, params: Any) -> None:
+            stats.record_connection()
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace_configs.append(trace)
+
+    connector = aiohttp.TCPConnector(limit=limit, keepalive_timeout=60)
+    return aiohttp.ClientSession(connector=connector, trace_configs=trace_configs)
+
+
+class AsyncClientTransport:
+    """Binds one identity's credentials to a (possibly shared) ``aiohttp`` session.
+
+    Any number of transports can share the same session, which is what lets a
+    single process run many agents over one connection pool.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        session: aiohttp.ClientSession,
+        creds: Optional[Dict[str, str]] = None,
+        policies: Optional[Dict[str, EndpointPolicy]] = None,
+        compression: Optional[Compression] = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.session = session
+        self.policies = dict(DEFAULT_POLICIES)
+        if policies:
+            self.policies.update(policies)
+
+        self.creds: Optional[Dict[str, str]] = None
+        self._auth_headers: Dict[str, str] = {}
+        # Applied to outgoing payloads by api.send_message / api.send_batch.
+        self.compression = compression
+        if creds is not None:
+            self.set_credentials(creds)
+
+    def set_credentials(self, creds: Dict[str, str]) -> None:
+        self.creds = creds
+        self._auth_headers = auth_headers(creds)
+
+    async def request(
+        self,
+        endpoint: str,
+        method: str,
+        path: str,
+        authenticated: bool = True,
+        **kwargs: Any,
+    ) -> AsyncResponse:
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await self._request(endpoint, method, path, authenticated, kwargs)
+            status = str(response.status)
+            return response
+        finally:
+            metrics.registry.record_request(path, status, time.perf_counter() - started)
+
+    async def _request(
+        self, endpoint: str, method: str, path: str, authenticated: bool, kwargs: Dict[str, Any]
+    ) -> AsyncResponse:
+        policy = self.policies[endpoint]
+        if authenticated:
+            if not self._auth_headers:
+                raise RuntimeError("Transport has no credentials attached")
+            kwargs["headers"] = {**self._auth_headers, **kwargs.get("headers", {})}
+        timeout = aiohttp.ClientTimeout(total=kwargs.pop("timeout", policy.timeout))
+        url = f"{self.base_url}{path}"
+
+        attempt = 0
+        while True:
+            try:
+                async with self.session.request(method, url, timeout=timeout, **kwargs) as response:
+                    result = AsyncResponse(response.status, response.headers.copy(), await response.read(), url)
+            except aiohttp.ClientConnectorError:
+                # Nothing reached the server, so a replay is always safe.
+                if attempt >= policy.retries:
+                    raise
+            except (asyncio.TimeoutError, aiohttp.ServerDisconnectedError):
+                if not policy.retry_on_read or attempt >= policy.retries:
+                    raise
+            else:
+                if (
+                    result.status not in RETRY_STATUSES
+                    or not policy.retry_on_read
+                    or attempt >= policy.retries
+                ):
+                    return result
+
+            attempt += 1
+            await asyncio.sleep(policy.backoff * attempt)
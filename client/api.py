@@ -1,10 +1,14 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
-import requests
+from cryptography.exceptions import InvalidTag
 
-from .crypto import decrypt_payload, encrypt_payload
+from . import frames
+from .crypto import Compression, EncryptionError, decrypt_batch, decrypt_payload, encrypt_payload
+
+if TYPE_CHECKING:  # pragma: no cover - import cycle only matters for typing
+    from .transport import ClientTransport
 
 
 def auth_headers(creds: Dict[str, str]) -> Dict[str, str]:
@@ -14,11 +18,13 @@ def auth_headers(creds: Dict[str, str]) -> Dict[str, str]:
     }
 
 
-def register_client(base_url: str, fingerprint: str, name: Optional[str]) -> Dict[str, str]:
-    response = requests.post(
-        f"{base_url}/api/v1/clients/register",
+def register_client(transport: ClientTransport, fingerprint: str, name: Optional[str]) -> Dict[str, str]:
+    response = transport.request(
+        "register",
+        "POST",
+        "/api/v1/clients/register",
+        authenticated=False,
         json={"name": name, "fingerprint": fingerprint} if name else {"fingerprint": fingerprint},
-        timeout=10,
     )
     response.raise_for_status()
     data = response.json()
@@ -26,31 +32,120 @@ def register_client(base_url: str, fingerprint: str, name: Optional[str]) -> Dic
     return data
 
 
-def ack_messages(base_url: str, creds: Dict[str, str], last_id: str) -> None:
-    response = requests.post(
-        f"{base_url}/api/v1/messages/ack",
-        headers=auth_headers(creds),
+def ack_messages(transport: ClientTransport, last_id: str) -> None:
+    response = transport.request(
+        "ack",
+        "POST",
+        "/api/v1/messages/ack",
         json={"last_received_id": last_id},
-        timeout=10,
     )
     response.raise_for_status()
 
 
-def poll_once(base_url: str, creds: Dict[str, str], cursor: Optional[str]) -> List[Dict[str, Any]]:
-    response = requests.get(
-        f"{base_url}/api/v1/messages/poll",
-        headers=auth_headers(creds),
-        params={"cursor": cursor} if cursor else {},
-        timeout=15,
-    )
+def fast_forward(transport: ClientTransport) -> Optional[int]:
+    """Ack everything queued for the client in one request; returns the new cursor."""
+
+    response = transport.request("ack", "POST", "/api/v1/messages/fast-forward")
+    response.raise_for_status()
+    return response.json().get("last_acked_message_id")
+
+
+POLL_INTERVAL_HEADER = "X-Poll-Interval"
+POLL_WAIT_HEADER = "X-Poll-Wait"
+
+
+def header_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a delay header (``X-Poll-Interval`` / ``Retry-After`` in seconds form)."""
+
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        return None
+    return seconds if seconds >= 0 else None
+
+
+class PollResult:
+    """One page of a poll response.
+
+    ``has_more`` is set when the server had to truncate the page, meaning the
+    caller should poll again straight away instead of backing off.
+    ``poll_interval`` is the server's suggested delay before the next poll.
+    ``held`` is the long-poll wait the server honoured, or ``None`` when the
+    server answered immediately (short poll, or long polling unsupported).
+    """
+
+    def __init__(
+        self,
+        messages: List[Dict[str, Any]],
+        has_more: bool = False,
+        next_cursor: Optional[str] = None,
+        poll_interval: Optional[float] = None,
+        held: Optional[float] = None,
+    ) -> None:
+        self.messages = messages
+        self.has_more = has_more
+        self.next_cursor = next_cursor
+        self.poll_interval = poll_interval
+        self.held = held
+
+
+def poll_page(
+    transport: ClientTransport,
+    cursor: Optional[str],
+    limit: Optional[int] = None,
+    ack: bool = False,
+    wait: Optional[int] = None,
+    binary: bool = False,
+) -> PollResult:
+    params: Dict[str, Any] = {}
+    kwargs: Dict[str, Any] = {}
+    if binary:
+        kwargs["headers"] = {"Accept": frames.ACCEPT}
+    if cursor:
+        params["cursor"] = cursor
+    if limit:
+        params["limit"] = limit
+    if ack and cursor:
+        # The server treats the cursor as an ack, replacing a separate ack request.
+        params["ack"] = 1
+    if wait:
+        # Long poll: the server may hold the request for up to ``wait`` seconds.
+        params["wait"] = wait
+        kwargs["timeout"] = transport.policies["poll"].timeout + wait
+    response = transport.request("poll", "GET", "/api/v1/messages/poll", params=params, **kwargs)
+    hint = header_seconds(response.headers.get(POLL_INTERVAL_HEADER))
+    held = header_seconds(response.headers.get(POLL_WAIT_HEADER))
     if response.status_code == 204:
-        return []
+        return PollResult([], poll_interval=hint, held=held)
     response.raise_for_status()
+    if response.headers.get("Content-Type", "").startswith(frames.MEDIA_TYPE):
+        messages, has_more, next_cursor = frames.decode_page(response.content)
+        return PollResult(messages, has_more, next_cursor, hint, held)
     body = response.json()
-    return body.get("messages", [])
+    return PollResult(body.get("messages", []), bool(body.get("has_more")), body.get("next_cursor"), hint, held)
+
+
+def poll_once(transport: ClientTransport, cursor: Optional[str]) -> List[Dict[str, Any]]:
+    return poll_page(transport, cursor).messages
+
+
+_OTHER_DIRECTION = {"to": "from", "from": "to"}
 
 
 def decrypt_message(creds: Dict[str, str], message: Dict[str, Any]) -> Dict[str, Any]:
+    direction = message.get("aad_direction")
+    if direction in _OTHER_DIRECTION:
+        aad = {direction: creds["client_id"], "ts": message["created_at"]}
+        try:
+            return decrypt_payload(creds["personal_token"], message, aad)
+        except InvalidTag:
+            # Older servers sealed a fan-out that included its sender with 'to' but labelled it 'from'.
+            aad = {_OTHER_DIRECTION[direction]: creds["client_id"], "ts": message["created_at"]}
+            return decrypt_payload(creds["personal_token"], message, aad)
+
+    # Servers that predate aad_direction: try the fan-out AAD, then the self-addressed one.
     primary_aad = {
         "to": creds["client_id"],
         "ts": message["created_at"],
@@ -66,22 +161,74 @@ def decrypt_message(creds: Dict[str, str], message: Dict[str, Any]) -> Dict[str,
         return decrypt_payload(creds["personal_token"], message, fallback_aad)
 
 
-def send_message(base_url: str, creds: Dict[str, str], plaintext: Dict[str, Any]) -> None:
-    timestamp = plaintext.get("timestamp")
+def decrypt_page(
+    creds: Dict[str, str], messages: List[Dict[str, Any]]
+) -> List[Tuple[Dict[str, Any], Union[Dict[str, Any], EncryptionError]]]:
+    """Decrypt a poll page, returning ``(message, plaintext)`` pairs in page order.
+
+    A message that fails to decrypt is paired with an :class:`EncryptionError`.
+    """
+
+    if any(message.get("aad_direction") not in _OTHER_DIRECTION for message in messages):
+        # Without aad_direction each message needs trial decryption; keep it serial.
+        pairs = []
+        for message in messages:
+            try:
+                pairs.append((message, decrypt_message(creds, message)))
+            except Exception as exc:  # pylint: disable=broad-except
+                pairs.append((message, EncryptionError(str(exc).strip() or exc.__class__.__name__)))
+        return pairs
+
+    aads = [{message["aad_direction"]: creds["client_id"], "ts": message["created_at"]} for message in messages]
+    results = decrypt_batch(creds["personal_token"], messages, aads)
+
+    # Retry failures under the other direction, for rows an older server mislabelled.
+    failed = [index for index, result in enumerate(results) if isinstance(result, EncryptionError)]
+    if failed:
+        retry_aads = [
+            {_OTHER_DIRECTION[messages[index]["aad_direction"]]: creds["client_id"], "ts": messages[index]["created_at"]}
+            for index in failed
+        ]
+        retried = decrypt_batch(creds["personal_token"], [messages[index] for index in failed], retry_aads)
+        for index, result in zip(failed, retried):
+            if not isinstance(result, EncryptionError):
+                results[index] = result
+    return list(zip(messages, results))
+
+
+def seal_envelope(
+    creds: Dict[str, str], plaintext: Dict[str, Any], compression: Optional[Compression] = None
+) -> Dict[str, Any]:
     aad = {
         "from": creds["client_id"],
-        "ts": timestamp,
+        "ts": plaintext.get("timestamp"),
     }
-    encrypted = encrypt_payload(creds["personal_token"], plaintext, aad)
-    response = requests.post(
-        f"{base_url}/api/v1/messages/send",
-        headers=auth_headers(creds),
-        json={
-            "ciphertext": encrypted["ciphertext"],
-            "nonce": encrypted["nonce"],
-            "tag": encrypted["tag"],
-            "aad": encrypted["aad"],
-        },
-        timeout=15,
+    encrypted = encrypt_payload(creds["personal_token"], plaintext, aad, compression)
+    envelope = {
+        "ciphertext": encrypted["ciphertext"],
+        "nonce": encrypted["nonce"],
+        "tag": encrypted["tag"],
+        "aad": encrypted["aad"],
+    }
+    if "encoding" in encrypted:
+        envelope["encoding"] = encrypted["encoding"]
+    return envelope
+
+
+def send_message(transport: ClientTransport, plaintext: Dict[str, Any]) -> None:
+    envelope = seal_envelope(transport.creds, plaintext, transport.compression)
+    response = transport.request("send", "POST", "/api/v1/messages/send", json=envelope)
+    response.raise_for_status()
+
+
+def send_batch(transport: ClientTransport, plaintexts: List[Dict[str, Any]]) -> None:
+    """Send several messages in one request (``POST /messages/send-batch``)."""
+
+    creds = transport.creds
+    response = transport.request(
+        "send",
+        "POST",
+        "/api/v1/messages/send-batch",
+        json={"messages": [seal_envelope(creds, plaintext, transport.compression) for plaintext in plaintexts]},
     )
     response.raise_for_status()
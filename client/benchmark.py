@@ -0,0 +1,143 @@
+"""Micro-benchmarks for the client's message decryption path.
+
+Run ``python -m client.benchmark decrypt`` to compare the old per-message
+cost (a fresh ``AESGCM`` per call and trial decryption of self-addressed
+messages) with the current one (cached cipher context and the server's
+``aad_direction``). ``python -m client.benchmark batch`` measures page
+decryption throughput with different thread-pool sizes. No network is used.
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import secrets
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from . import api
+from .crypto import decrypt_batch, encrypt_payload
+
+
+def make_messages(creds: Dict[str, str], count: int, size: int, self_ratio: float) -> List[Dict[str, Any]]:
+    """Build poll-shaped messages, a ``self_ratio`` share of them self-addressed."""
+
+    created_at = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+    payload = {"type": "event", "payload": {"data": "x" * size}}
+    self_every = round(1 / self_ratio) if self_ratio > 0 else 0
+    messages = []
+    for idx in range(count):
+        direction = "from" if self_every and idx % self_every == 0 else "to"
+        sealed = encrypt_payload(
+            creds["personal_token"], payload, {direction: creds["client_id"], "ts": created_at}
+        )
+        messages.append(
+            {
+                "id": str(idx + 1),
+                "type": "event",
+                "ciphertext": sealed["ciphertext"],
+                "nonce": sealed["nonce"],
+                "tag": sealed["tag"],
+                "created_at": created_at,
+                "aad_direction": direction,
+            }
+        )
+    return messages
+
+
+def legacy_decrypt(creds: Dict[str, str], message: Dict[str, Any]) -> Dict[str, Any]:
+    """The pre-``aad_direction`` path: new cipher per call, "to" tried before "from"."""
+
+    def attempt(aad: Dict[str, Any]) -> Dict[str, Any]:
+        key = base64.b64decode(creds["personal_token"])
+        combined = base64.b64decode(message["ciphertext"]) + base64.b64decode(message["tag"])
+        aad_bytes = json.dumps(aad, separators=(",", ":"), ensure_ascii=False).encode()
+        plaintext = AESGCM(key).decrypt(base64.b64decode(message["nonce"]), combined, aad_bytes)
+        return json.loads(plaintext.decode())
+
+    try:
+        return attempt({"to": creds["client_id"], "ts": message["created_at"]})
+    except Exception:
+        return attempt({"from": creds["client_id"], "ts": message["created_at"]})
+
+
+def throughput(
+    decrypt: Callable[[Dict[str, str], Dict[str, Any]], Any],
+    creds: Dict[str, str],
+    messages: List[Dict[str, Any]],
+) -> float:
+    started = time.perf_counter()
+    for message in messages:
+        decrypt(creds, message)
+    return len(messages) / (time.perf_counter() - started)
+
+
+def bench_decrypt(args: argparse.Namespace) -> None:
+    creds = {"client_id": str(uuid.uuid4()), "personal_token": base64.b64encode(secrets.token_bytes(32)).decode()}
+    messages = make_messages(creds, args.messages, args.size, args.self_ratio)
+    # Sanity check: both paths must agree before timing them.
+    assert legacy_decrypt(creds, messages[0]) == api.decrypt_message(creds, messages[0])
+
+    before = throughput(legacy_decrypt, creds, messages)
+    after = throughput(api.decrypt_message, creds, messages)
+    print(
+        f"{args.messages} messages of {args.size} bytes, {args.self_ratio:.0%} self-addressed\n"
+        f"  before: {before:10.0f} messages/s\n"
+        f"  after:  {after:10.0f} messages/s ({after / before:.2f}x)"
+    )
+
+
+def bench_batch(args: argparse.Namespace) -> None:
+    creds = {"client_id": str(uuid.uuid4()), "personal_token": base64.b64encode(secrets.token_bytes(32)).decode()}
+    messages = make_messages(creds, args.messages, args.size, 0)
+    aads = [{"to": creds["client_id"], "ts": message["created_at"]} for message in messages]
+    megabytes = args.messages * args.size / 1e6
+    print(f"{args.messages} messages of {args.size} bytes ({megabytes:.0f} MB), {os.cpu_count()} CPUs")
+
+    started = time.perf_counter()
+    for message in messages:
+        api.decrypt_message(creds, message)
+    serial = time.perf_counter() - started
+    print(f"  serial:     {args.messages / serial:8.0f} messages/s {megabytes / serial:8.1f} MB/s")
+
+    for workers in args.workers:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            started = time.perf_counter()
+            results = decrypt_batch(creds["personal_token"], messages, aads, executor)
+            elapsed = time.perf_counter() - started
+        assert not any(isinstance(result, Exception) for result in results)
+        print(
+            f"  {workers:2} threads: {args.messages / elapsed:8.0f} messages/s {megabytes / elapsed:8.1f} MB/s"
+            f" ({serial / elapsed:.2f}x)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    decrypt = commands.add_parser("decrypt", help="Per-message decrypt throughput, before vs after")
+    decrypt.add_argument("--messages", type=int, default=20000)
+    decrypt.add_argument("--size", type=int, default=256, help="Payload bytes per message")
+    decrypt.add_argument("--self-ratio", type=float, default=0.5, help="Share of self-addressed messages")
+    decrypt.set_defaults(func=bench_decrypt)
+
+    batch = commands.add_parser("batch", help="Page decrypt throughput by thread-pool size")
+    batch.add_argument("--messages", type=int, default=1000)
+    batch.add_argument("--size", type=int, default=64 * 1024, help="Payload bytes per message")
+    batch.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    batch.set_defaults(func=bench_batch)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,3 +8,61 @@ CLIENT_NAME = None
 
 # Where to store the issued client credentials
 CREDENTIALS_PATH = Path.home() / ".remoteagent" / "client_credentials.json"
+
+# Where the last handled message id is checkpointed so a restart resumes from it
+CHECKPOINT_PATH = Path.home() / ".remoteagent" / "cursor_checkpoint.json"
+
+# Skip (ack without handling) everything queued at start even when a checkpoint exists
+SKIP_BACKLOG_ON_START = False
+
+# Messages requested per poll page (None uses the server default; the server caps large values)
+POLL_PAGE_SIZE = None
+
+# Let the cursor on each poll acknowledge the previous page instead of sending a separate ack request
+POLL_ACKS_CURSOR = False
+
+# Ask for the compact binary poll format (raw bytes instead of base64 JSON); servers without it answer with JSON.
+# Off by default: binary messages carry ``sealed``/``nonce`` memoryviews instead of ``ciphertext``/``tag`` strings.
+POLL_BINARY = False
+
+# Seconds to ask the server to hold each poll open waiting for messages (None keeps short polling)
+LONG_POLL_WAIT = None
+
+# Handle messages on this many worker threads while polling continues (None handles them one at a time)
+HANDLER_CONCURRENCY = None
+
+# Cap on concurrently running messages per message type, e.g. {"test": 1}; other types may use every worker
+HANDLER_TYPE_LIMITS = {}
+
+# Messages queued or running before polling pauses to let handlers catch up
+HANDLER_MAX_IN_FLIGHT = 64
+
+# Attempts per message before it is dead-lettered, and the first retry delay in seconds (doubled after each retry)
+HANDLER_MAX_ATTEMPTS = 3
+HANDLER_RETRY_DELAY = 1.0
+
+# Append messages whose handler kept failing to this JSON-lines file (None only logs them)
+DEAD_LETTER_PATH = Path.home() / ".remoteagent" / "dead_letters.jsonl"
+
+# Collect outgoing messages for this many seconds and send them in one request (None sends each immediately)
+SEND_BATCH_WINDOW = None
+
+# Flush the outgoing batch early once this many messages are waiting
+SEND_BATCH_MAX = 50
+
+# Message types compressed with zlib before encryption, e.g. {"report"} ("*" for all); needs a server that supports it
+COMPRESS_TYPES = set()
+
+# Smallest serialised payload (bytes) worth compressing
+COMPRESS_THRESHOLD = 1024
+
+# Log verbosity ("DEBUG" also shows every empty poll) and format ("text", or "json" for one object per line)
+LOG_LEVEL = "INFO"
+LOG_FORMAT = "text"
+
+# Serve Prometheus metrics on http://127.0.0.1:<port>/metrics (None disables)
+METRICS_PORT = None
+
+# Also (or instead) write a JSON metrics snapshot to this file every METRICS_SNAPSHOT_INTERVAL seconds
+METRICS_SNAPSHOT_PATH = None
+METRICS_SNAPSHOT_INTERVAL = 15.0
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
 import base64
+import functools
 import json
+import os
 import secrets
-from typing import Any, Dict, Optional
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
@@ -19,27 +24,149 @@ def _aes_key(key_b64: str) -> bytes:
     return key
 
 
-def encrypt_payload(key_b64: str, payload: Dict[str, Any], aad: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
-    key = _aes_key(key_b64)
+@functools.lru_cache(maxsize=64)
+def _cipher(key_b64: str) -> AESGCM:
+    """Return the AES-GCM context for ``key_b64``, built once per key."""
+
+    return AESGCM(_aes_key(key_b64))
+
+
+# Envelope ``encoding`` for plaintext compressed with zlib (RFC 1950) before encryption.
+ENCODING_ZLIB = "zlib"
+
+# Largest plaintext a compressed message may inflate to before it is rejected.
+MAX_INFLATED = 16 * 1024 * 1024
+
+
+class Compression:
+    """Which outgoing payloads are zlib-compressed before encryption.
+
+    Payloads whose ``type`` is in ``types`` (``"*"`` matches every type) and
+    that serialise to at least ``threshold`` bytes are compressed, unless
+    compression would not make them smaller.
+    """
+
+    def __init__(self, types: Iterable[str], threshold: int = 1024, level: int = 6) -> None:
+        self.types = frozenset(types)
+        self.threshold = threshold
+        self.level = level
+
+    def encode(self, kind: Optional[str], plaintext: bytes) -> Tuple[bytes, Optional[str]]:
+        if len(plaintext) < self.threshold or ("*" not in self.types and kind not in self.types):
+            return plaintext, None
+        compressed = zlib.compress(plaintext, self.level)
+        if len(compressed) >= len(plaintext):
+            return plaintext, None
+        return compressed, ENCODING_ZLIB
+
+
+def encrypt_payload(
+    key_b64: str,
+    payload: Dict[str, Any],
+    aad: Optional[Dict[str, Any]] = None,
+    compression: Optional[Compression] = None,
+) -> Dict[str, Any]:
     iv = secrets.token_bytes(12)
     aad_bytes = json.dumps(aad or {}, separators=(",", ":"), ensure_ascii=False).encode()
     plaintext = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
-    cipher = AESGCM(key).encrypt(iv, plaintext, aad_bytes if aad else None)
+    encoding = None
+    if compression is not None:
+        plaintext, encoding = compression.encode(payload.get("type"), plaintext)
+    cipher = _cipher(key_b64).encrypt(iv, plaintext, aad_bytes if aad else None)
     ciphertext, tag = cipher[:-16], cipher[-16:]
-    return {
+    envelope = {
         "ciphertext": base64.b64encode(ciphertext).decode(),
         "nonce": base64.b64encode(iv).decode(),
         "tag": base64.b64encode(tag).decode(),
         "aad": aad or {},
     }
+    if encoding:
+        envelope["encoding"] = encoding
+    return envelope
+
+
+def _inflate(plaintext: bytes, encoding: Optional[str]) -> bytes:
+    if not encoding:
+        return plaintext
+    if encoding != ENCODING_ZLIB:
+        raise EncryptionError(f"Unsupported payload encoding: {encoding}")
+    inflater = zlib.decompressobj()
+    try:
+        # Bounded so a small hostile payload cannot inflate into exhausting memory.
+        inflated = inflater.decompress(plaintext, MAX_INFLATED)
+    except zlib.error as exc:
+        raise EncryptionError(f"Unable to decompress payload: {exc}") from exc
+    if inflater.unconsumed_tail or not inflater.eof:
+        raise EncryptionError("Compressed payload is truncated or larger than MAX_INFLATED")
+    return inflated
+
+
+def _sealed(message: Dict[str, Any]) -> Tuple[Any, Any]:
+    """Return ``(nonce, ciphertext || tag)`` as bytes-like objects.
+
+    Messages decoded from binary poll frames already carry raw ``memoryview``
+    slices; JSON messages carry base64 strings.
+    """
+
+    if "sealed" in message:
+        return message["nonce"], message["sealed"]
+    combined = base64.b64decode(message["ciphertext"]) + base64.b64decode(message["tag"])
+    return base64.b64decode(message["nonce"]), combined
 
 
 def decrypt_payload(key_b64: str, message: Dict[str, Any], aad: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    key = _aes_key(key_b64)
-    ciphertext = base64.b64decode(message["ciphertext"])
-    nonce = base64.b64decode(message["nonce"])
-    tag = base64.b64decode(message["tag"])
+    nonce, combined = _sealed(message)
     aad_bytes = json.dumps(aad or {}, separators=(",", ":"), ensure_ascii=False).encode()
-    combined = ciphertext + tag
-    plaintext = AESGCM(key).decrypt(nonce, combined, aad_bytes if aad else None)
-    return json.loads(plaintext.decode())
+    plaintext = _cipher(key_b64).decrypt(nonce, combined, aad_bytes if aad else None)
+    return json.loads(_inflate(plaintext, message.get("encoding")))
+
+
+# Pages smaller than this (total ciphertext) are decrypted inline; the
+# thread hand-off costs more than it saves on small messages.
+PARALLEL_THRESHOLD = 256 * 1024
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _decrypt_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="decrypt")
+        return _pool
+
+
+def _open_one(key_b64: str, message: Dict[str, Any], aad: Dict[str, Any]) -> Union[Dict[str, Any], EncryptionError]:
+    try:
+        nonce, combined = _sealed(message)
+        aad_bytes = json.dumps(aad, separators=(",", ":"), ensure_ascii=False).encode()
+        plaintext = _cipher(key_b64).decrypt(nonce, combined, aad_bytes)
+        # json accepts UTF-8 bytes directly, which skips a copy of large payloads.
+        return json.loads(_inflate(plaintext, message.get("encoding")))
+    except Exception as exc:  # pylint: disable=broad-except
+        detail = str(exc).strip() or exc.__class__.__name__
+        return EncryptionError(f"Unable to decrypt message {message.get('id')}: {detail}")
+
+
+def decrypt_batch(
+    key_b64: str,
+    messages: Sequence[Dict[str, Any]],
+    aads: Sequence[Dict[str, Any]],
+    executor: Optional[ThreadPoolExecutor] = None,
+) -> List[Union[Dict[str, Any], EncryptionError]]:
+    """Decrypt a page of messages, in parallel when it is large enough to pay off.
+
+    AES-GCM in ``cryptography`` releases the GIL, so base64 decoding, the
+    cipher and ``json.loads`` for different messages overlap across cores.
+    Results are returned in input order; a message that fails to decrypt is
+    returned as an :class:`EncryptionError` instead of aborting the page.
+    """
+
+    size = sum(len(message.get("sealed") or message["ciphertext"]) for message in messages)
+    if len(messages) < 2 or (executor is None and (size < PARALLEL_THRESHOLD or (os.cpu_count() or 1) < 2)):
+        return [_open_one(key_b64, message, aad) for message, aad in zip(messages, aads)]
+
+    pool = executor or _decrypt_pool()
+    return list(pool.map(_open_one, [key_b64] * len(messages), messages, aads))
+
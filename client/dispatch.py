@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from . import metrics
+from .handlers import MessageHandler
+
+logger = logging.getLogger(__name__)
+
+_PENDING, _DONE, _DEAD = "pending", "done", "dead"
+
+
+def deliver(handler: MessageHandler, creds: Dict[str, str], message: Dict[str, Any], plaintext: Any) -> None:
+    """Hand one message to ``handler``, pre-decrypted when ``plaintext`` is set."""
+
+    kind = str(message.get("type"))
+    with metrics.registry.timer("client_handler_seconds", type=kind):
+        try:
+            if plaintext is None:
+                handler.handle(message, creds)
+            elif isinstance(plaintext, Exception):
+                raise plaintext
+            else:
+                handler.handle_plaintext(message, plaintext, creds)
+        except Exception:
+            metrics.registry.inc("client_handler_errors_total", type=kind)
+            raise
+
+
+class ConcurrentDispatcher:
+    """Runs a handler on a thread pool and tracks which messages may be acked.
+
+    At most ``type_limits[type]`` (or ``default_type_limit``) messages of one
+    type run at once; further messages of that type wait in a per-type queue
+    without holding a worker. ``submit`` blocks once ``max_in_flight`` messages
+    are queued or running, which stops the poll loop fetching more than the
+    handler can keep up with.
+
+    :meth:`watermark` is the highest id such that it and every message
+    submitted before it are settled: handled, or dead-lettered. A message
+    whose handler raises is retried up to ``max_attempts`` times in all, waiting
+    ``retry_delay`` seconds and doubling after each failure. If it still
+    fails, it is passed to ``dead_letter`` (by default only logged) and the
+    watermark moves past it, so one bad message never stalls acks or the
+    checkpoint. A message still waiting to retry when :meth:`close` drops
+    queued work is left unsettled, so it and everything after it are
+    redelivered on the next start.
+    """
+
+    def __init__(
+        self,
+        handler: MessageHandler,
+        max_workers: int = 8,
+        max_in_flight: int = 64,
+        type_limits: Optional[Dict[str, int]] = None,
+        default_type_limit: Optional[int] = None,
+        max_attempts: int = 3,
+        retry_delay: float = 1.0,
+        dead_letter: Optional[Callable[[Dict[str, Any], Exception], None]] = None,
+    ) -> None:
+        self.handler = handler
+        self.type_limits = dict(type_limits or {})
+        self.default_type_limit = default_type_limit or max_workers
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.dead_letter = dead_letter
+        # Ids of recently dead-lettered messages, newest last.
+        self.dead: Deque[Any] = deque(maxlen=1000)
+        self._closing = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="handler")
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._status: "OrderedDict[Any, str]" = OrderedDict()
+        self._running: Dict[str, int] = {}
+        self._queued: Dict[str, Deque[Tuple[Dict[str, Any], Dict[str, str], Any]]] = {}
+        self._in_flight = 0
+        self._watermark: Optional[Any] = None
+
+    def submit(self, message: Dict[str, Any], creds: Dict[str, str], plaintext: Any = None) -> None:
+        self._slots.acquire()
+        kind = str(message.get("type"))
+        with self._lock:
+            self._status[message["id"]] = _PENDING
+            self._in_flight += 1
+            if self._running.get(kind, 0) < self.type_limits.get(kind, self.default_type_limit):
+                self._start(kind, message, creds, plaintext)
+            else:
+                self._queued.setdefault(kind, deque()).append((message, creds, plaintext))
+
+    def watermark(self) -> Optional[Any]:
+        with self._lock:
+            return self._watermark
+
+    def close(self, cancel_queued: bool = False) -> Optional[Any]:
+        """Wait for in-flight messages and return the watermark.
+
+        With ``cancel_queued``, queued messages and pending retries are dropped
+        instead of waited for.
+        """
+
+        with self._lock:
+            if cancel_queued:
+                # Messages waiting to retry give up at once and stay unsettled.
+                self._closing.set()
+                for queue in self._queued.values():
+                    for _ in queue:
+                        self._in_flight -= 1
+                        self._slots.release()
+                    queue.clear()
+            while self._in_flight:
+                self._idle.wait()
+        self._executor.shutdown(wait=True)
+        return self.watermark()
+
+    def _start(self, kind: str, message: Dict[str, Any], creds: Dict[str, str], plaintext: Any) -> None:
+        # Called with the lock held.
+        self._running[kind] = self._running.get(kind, 0) + 1
+        self._executor.submit(self._run, kind, message, creds, plaintext)
+
+    def _run(self, kind: str, message: Dict[str, Any], creds: Dict[str, str], plaintext: Any) -> None:
+        outcome = self._attempt(kind, message, creds, plaintext)
+
+        with self._lock:
+            if outcome is not None:
+                self._status[message["id"]] = outcome
+                self._advance()
+            self._running[kind] -= 1
+            queue = self._queued.get(kind)
+            if queue:
+                self._start(kind, *queue.popleft())
+            self._in_flight -= 1
+            self._idle.notify_all()
+        self._slots.release()
+
+    def _attempt(self, kind: str, message: Dict[str, Any], creds: Dict[str, str], plaintext: Any) -> Optional[str]:
+        """Handle ``message`` with retries; ``None`` means it was interrupted by :meth:`close`."""
+
+        delay = self.retry_delay
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                deliver(self.handler, creds, message, plaintext)
+                return _DONE
+            except Exception as exc:  # pylint: disable=broad-except
+                detail = str(exc).strip() or exc.__class__.__name__
+                if attempt < self.max_attempts:
+                    logger.warning(
+                        "Error handling message %s (attempt %d of %d): %s. Retrying in %.1fs",
+                        message["id"],
+                        attempt,
+                        self.max_attempts,
+                        detail,
+                        delay,
+                        extra={"message_id": message["id"], "message_type": kind},
+                    )
+                    if self._closing.wait(delay):
+                        return None
+                    delay *= 2
+                    continue
+                logger.error(
+                    "Error handling message %s: %s. Giving up after %d attempts.",
+                    message["id"],
+                    detail,
+                    attempt,
+                    extra={"message_id": message["id"], "message_type": kind},
+                )
+                self._dead_letter(message, exc)
+        return _DEAD
+
+    def _dead_letter(self, message: Dict[str, Any], exc: Exception) -> None:
+        metrics.registry.inc("client_dead_letters_total", type=str(message.get("type")))
+        with self._lock:
+            self.dead.append(message["id"])
+        if self.dead_letter is None:
+            return
+        try:
+            self.dead_letter(message, exc)
+        except Exception as hook_exc:  # pylint: disable=broad-except
+            logger.error("Unable to dead-letter message %s: %s", message["id"], hook_exc, extra={"message_id": message["id"]})
+
+    def _advance(self) -> None:
+        # Called with the lock held: pop the settled prefix off the ordered status map.
+        while self._status:
+            message_id, status = next(iter(self._status.items()))
+            if status == _PENDING:
+                return
+            self._status.popitem(last=False)
+            self._watermark = message_id
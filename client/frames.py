@@ -0,0 +1,80 @@
+"""Decoder for the binary poll response format (``application/vnd.remoteagent.frames``).
+
+See ``server/app/Services/BinaryPollFormat.php`` for the layout. Each decoded
+message carries ``nonce`` and ``sealed`` (ciphertext with the tag appended) as
+``memoryview`` slices of the response body, so no bytes are copied before
+they reach AES-GCM.
+"""
+
+from __future__ import annotations
+
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+MEDIA_TYPE = "application/vnd.remoteagent.frames"
+# Ask for frames, but let servers that do not know them answer with JSON.
+ACCEPT = f"{MEDIA_TYPE}, application/json;q=0.5"
+
+_MAGIC = b"RAF1"
+_HEADER = struct.Struct(">4sBQI")
+_U8 = struct.Struct(">B")
+_U16 = struct.Struct(">H")
+_U32 = struct.Struct(">I")
+_ID_FLAGS = struct.Struct(">QB")
+_FLAG_FROM = 1
+_FLAG_ZLIB = 2
+
+
+class FrameError(ValueError):
+    """Raised when a binary poll body is malformed."""
+
+
+def decode_page(body: bytes) -> Tuple[List[Dict[str, Any]], bool, Optional[int]]:
+    """Return ``(messages, has_more, next_cursor)`` for a binary poll body."""
+
+    view = memoryview(body)
+    if len(view) < _HEADER.size:
+        raise FrameError("Truncated poll frame header")
+    magic, flags, next_cursor, count = _HEADER.unpack_from(view)
+    if magic != _MAGIC:
+        raise FrameError("Unknown poll frame format")
+
+    messages = []
+    offset = _HEADER.size
+    try:
+        for _ in range(count):
+            (length,) = _U32.unpack_from(view, offset)
+            offset += _U32.size
+            end = offset + length
+            if end > len(view):
+                raise FrameError("Truncated poll frame")
+            messages.append(_decode_message(view, offset))
+            offset = end
+    except (struct.error, UnicodeDecodeError) as exc:
+        raise FrameError(f"Malformed poll frame: {exc}") from exc
+
+    return messages, bool(flags & 1), next_cursor or None
+
+
+def _decode_message(view: memoryview, offset: int) -> Dict[str, Any]:
+    message_id, flags = _ID_FLAGS.unpack_from(view, offset)
+    offset += _ID_FLAGS.size
+    created_at, offset = _field(view, offset, _U8)
+    kind, offset = _field(view, offset, _U16)
+    nonce, offset = _field(view, offset, _U8)
+    sealed, offset = _field(view, offset, _U32)
+    return {
+        "id": message_id,
+        "type": str(kind, "utf-8"),
+        "created_at": str(created_at, "ascii") or None,
+        "aad_direction": "from" if flags & _FLAG_FROM else "to",
+        "encoding": "zlib" if flags & _FLAG_ZLIB else None,
+        "nonce": nonce,
+        "sealed": sealed,
+    }
+
+
+def _field(view: memoryview, offset: int, prefix: struct.Struct) -> Tuple[memoryview, int]:
+    (length,) = prefix.unpack_from(view, offset)
+    start = offset + prefix.size
+    return view[start : start + length], start + length
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
 import json
+import logging
 from datetime import datetime, timezone
-from typing import Any, Dict
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
 from . import api
+from .transport import ClientTransport
+
+if TYPE_CHECKING:  # pragma: no cover - import cycle only matters for typing
+    from .outbox import Outbox
+
+logger = logging.getLogger(__name__)
 
 
 class MessageHandler:
@@ -12,12 +19,47 @@ class MessageHandler:
         print(message)
 
 
-class ConsoleMessageHandler(MessageHandler):
-    def __init__(self, base_url: str) -> None:
-        self.base_url = base_url
+class AsyncMessageHandler:
+    """Coroutine counterpart of :class:`MessageHandler` used by ``client.aio``."""
+
+    async def handle(self, message: Dict[str, Any], creds: Dict[str, str]) -> None:  # pragma: no cover - interface
+        print(message)
+
+
+class PlaintextMessageHandler(MessageHandler):
+    """Handler that works on decrypted payloads.
+
+    ``poll_loop`` decrypts whole pages for these handlers up front (in parallel
+    for large pages) and calls :meth:`handle_plaintext` once per message, in order.
+    """
 
     def handle(self, message: Dict[str, Any], creds: Dict[str, str]) -> None:
-        plaintext = api.decrypt_message(creds, message)
+        self.handle_plaintext(message, api.decrypt_message(creds, message), creds)
+
+    def handle_plaintext(
+        self, message: Dict[str, Any], plaintext: Dict[str, Any], creds: Dict[str, str]
+    ) -> None:  # pragma: no cover - interface
+        print(plaintext)
+
+
+class AsyncPlaintextMessageHandler(AsyncMessageHandler):
+    """Coroutine counterpart of :class:`PlaintextMessageHandler`."""
+
+    async def handle(self, message: Dict[str, Any], creds: Dict[str, str]) -> None:
+        await self.handle_plaintext(message, api.decrypt_message(creds, message), creds)
+
+    async def handle_plaintext(
+        self, message: Dict[str, Any], plaintext: Dict[str, Any], creds: Dict[str, str]
+    ) -> None:  # pragma: no cover - interface
+        print(plaintext)
+
+
+class ConsoleMessageHandler(PlaintextMessageHandler):
+    def __init__(self, transport: ClientTransport, outbox: Optional[Outbox] = None) -> None:
+        self.transport = transport
+        self.outbox = outbox
+
+    def handle_plaintext(self, message: Dict[str, Any], plaintext: Dict[str, Any], creds: Dict[str, str]) -> None:
         print(f"[received #{message['id']}] {json.dumps(plaintext)}")
 
         if plaintext.get("type") == "test":
@@ -26,5 +68,9 @@ class ConsoleMessageHandler(MessageHandler):
                 "payload": {"message": "work", "in_reply_to": message.get("id")},
                 "timestamp": datetime.now(timezone.utc).isoformat(),
             }
-            api.send_message(self.base_url, creds, response_payload)
-            print("Sent automated response for test message.")
+            if self.outbox is not None:
+                self.outbox.put(response_payload)
+                logger.info("Queued automated response for test message.", extra={"message_id": message.get("id")})
+            else:
+                api.send_message(self.transport, response_payload)
+                logger.info("Sent automated response for test message.", extra={"message_id": message.get("id")})
@@ -7,7 +7,7 @@ import platform
 import socket
 import uuid
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Mapping, Optional
 
 
 def _mac_address() -> str:
@@ -19,22 +19,41 @@ def _home_device_hint() -> str:
     return str(Path.home())
 
 
-def fingerprint_components() -> Dict[str, str]:
+def _host_components() -> Dict[str, str]:
+    # Cheap to read; platform.platform() is left out because it can spawn
+    # subprocesses and scan the interpreter binary.
     return {
         "hostname": socket.gethostname(),
-        "platform": platform.platform(),
         "machine": platform.machine(),
         "mac": _mac_address(),
         "home": _home_device_hint(),
     }
 
 
-def machine_fingerprint() -> str:
-    parts = fingerprint_components()
+def fingerprint_components() -> Dict[str, str]:
+    return {**_host_components(), "platform": platform.platform()}
+
+
+def _digest(parts: Mapping[str, str]) -> str:
     joined = "|".join(f"{key}:{value}" for key, value in sorted(parts.items()))
     return hashlib.sha256(joined.encode("utf-8")).hexdigest()
 
 
+def host_key() -> str:
+    """Digest of the cheap fingerprint components, used to validate a cached fingerprint."""
+
+    return _digest(_host_components())
+
+
+def machine_fingerprint(cached: Optional[Mapping[str, str]] = None) -> str:
+    """Return the machine fingerprint, reusing ``cached["fingerprint"]`` when
+    ``cached["host_key"]`` shows it was computed on this host."""
+
+    if cached and cached.get("fingerprint") and cached.get("host_key") == host_key():
+        return cached["fingerprint"]
+    return _digest(fingerprint_components())
+
+
 def machine_display_name() -> str:
     hostname = os.environ.get("COMPUTERNAME") or socket.gethostname()
     username = os.environ.get("USERNAME") or getpass.getuser()
@@ -1,56 +1,241 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
 
-from . import api
-from .conf import BASE_URL, CLIENT_NAME, CREDENTIALS_PATH
+from . import api, logs, metrics
+from .conf import (
+    BASE_URL,
+    CHECKPOINT_PATH,
+    CLIENT_NAME,
+    COMPRESS_THRESHOLD,
+    COMPRESS_TYPES,
+    CREDENTIALS_PATH,
+    DEAD_LETTER_PATH,
+    HANDLER_CONCURRENCY,
+    HANDLER_MAX_ATTEMPTS,
+    HANDLER_MAX_IN_FLIGHT,
+    HANDLER_RETRY_DELAY,
+    HANDLER_TYPE_LIMITS,
+    LOG_FORMAT,
+    LOG_LEVEL,
+    LONG_POLL_WAIT,
+    METRICS_PORT,
+    METRICS_SNAPSHOT_INTERVAL,
+    METRICS_SNAPSHOT_PATH,
+    POLL_ACKS_CURSOR,
+    POLL_BINARY,
+    POLL_PAGE_SIZE,
+    SEND_BATCH_MAX,
+    SEND_BATCH_WINDOW,
+    SKIP_BACKLOG_ON_START,
+)
+from .crypto import Compression
+from .dispatch import ConcurrentDispatcher
 from .handlers import ConsoleMessageHandler
-from .identity import machine_display_name, machine_fingerprint
-from .polling import discard_pending_messages, poll_loop
-from .storage import load_credentials, save_credentials
+from .identity import host_key, machine_display_name, machine_fingerprint
+from .outbox import Outbox
+from .polling import poll_loop
+from .storage import CursorCheckpoint, DeadLetterLog, load_credentials, save_credentials
+from .transport import ClientTransport
 
+logger = logging.getLogger(__name__)
 
-def ensure_registration() -> dict:
-    fingerprint = machine_fingerprint()
+
+def start_observability():
+    """Configure logging and start any metrics exporters; returns a function that stops them."""
+
+    logs.configure(LOG_LEVEL, LOG_FORMAT)
+    return metrics.export(METRICS_PORT, METRICS_SNAPSHOT_PATH, METRICS_SNAPSHOT_INTERVAL)
+
+
+def compression_policy() -> Optional[Compression]:
+    return Compression(COMPRESS_TYPES, COMPRESS_THRESHOLD) if COMPRESS_TYPES else None
+
+
+def register(transport: ClientTransport, fingerprint: str, client_name: str) -> dict:
+    creds = api.register_client(transport, fingerprint, client_name)
+    creds["name"] = client_name
+    creds["host_key"] = host_key()
+    save_credentials(CREDENTIALS_PATH, creds)
+    transport.set_credentials(creds)
+    return creds
+
+
+def push_display_name(transport: ClientTransport, fingerprint: str, client_name: str) -> None:
+    """Send a changed hostname\\username to the server without delaying startup."""
+
+    def push() -> None:
+        try:
+            register(transport, fingerprint, client_name)
+        except Exception as exc:  # noqa: BLE001 - retried on the next start
+            logger.warning("Unable to update the display name on the server: %s", exc)
+
+    threading.Thread(target=push, name="push-display-name", daemon=True).start()
+
+
+def ensure_registration(transport: ClientTransport) -> dict:
     client_name = CLIENT_NAME or machine_display_name()
     creds = load_credentials(CREDENTIALS_PATH)
+    fingerprint = machine_fingerprint(creds)
 
-    try:
-        freshly_registered = False
-        if creds is None or creds.get("fingerprint") != fingerprint:
-            creds = api.register_client(BASE_URL, fingerprint, client_name)
-            freshly_registered = True
-        else:
-            # Refresh registration to ensure the latest hostname\\username is stored server-side.
-            creds = api.register_client(BASE_URL, fingerprint, client_name)
+    def reauthenticate() -> None:
+        logger.warning("Stored credentials were rejected by the server; registering again.")
+        register(transport, fingerprint, client_name)
 
-        save_credentials(CREDENTIALS_PATH, creds)
-        if freshly_registered:
-            print(f"Registered client {creds['client_id']} and saved credentials to {CREDENTIALS_PATH}")
-        else:
-            print(f"Using existing credentials at {CREDENTIALS_PATH}")
+    transport.reauthenticate = reauthenticate
+
+    if creds is not None and creds.get("fingerprint") == fingerprint:
+        # Trust the stored credentials; the first authenticated request validates
+        # them and a 401 there triggers reauthenticate().
+        transport.set_credentials(creds)
+        logger.info("Using existing credentials at %s", CREDENTIALS_PATH)
+        if creds.get("name") != client_name:
+            push_display_name(transport, fingerprint, client_name)
+        return creds
+
+    try:
+        creds = register(transport, fingerprint, client_name)
+        logger.info(
+            "Registered client %s and saved credentials to %s",
+            creds["client_id"],
+            CREDENTIALS_PATH,
+            extra={"client_id": creds["client_id"]},
+        )
     except Exception as exc:  # noqa: BLE001 - surfacing underlying error to the operator
-        print("Unable to register client with the server:")
-        print(exc)
-        print("\nPlease verify the server is running and migrations are applied, then retry.")
+        logger.error(
+            "Unable to register client with the server:\n%s\n\n"
+            "Please verify the server is running and migrations are applied, then retry.",
+            exc,
+        )
         sys.exit(1)
 
     return creds
 
 
-def run() -> None:
-    creds = ensure_registration()
+def run(started: Optional[float] = None) -> None:
+    """Run the client. ``started`` is a ``perf_counter`` taken before the imports, for the startup report."""
+
+    imported = time.perf_counter()
+    stop_metrics = start_observability()
+    transport = ClientTransport(BASE_URL, compression=compression_policy())
+    outbox = None
+    try:
+        creds = ensure_registration(transport)
+
+        checkpoint = CursorCheckpoint(CHECKPOINT_PATH)
+        cursor = checkpoint.load(creds["client_id"])
+        if cursor is not None and not SKIP_BACKLOG_ON_START:
+            logger.info("Resuming after message %s from %s", cursor, CHECKPOINT_PATH, extra={"cursor": cursor})
+        else:
+            # No checkpoint yet (or skipping on purpose): ack the backlog in one request.
+            cursor = api.fast_forward(transport)
+            if cursor:
+                logger.info("Skipped pending messages on startup.", extra={"cursor": cursor})
+        checkpoint.client_id = transport.creds["client_id"]
+        ready = time.perf_counter()
+
+        def report_startup(first_poll: float) -> None:
+            import_ms = (imported - started) * 1000 if started is not None else None
+            ready_ms = (ready - imported) * 1000
+            logger.info(
+                "Startup: imports %s, ready %.0f ms, first poll %.0f ms",
+                "n/a" if import_ms is None else f"{import_ms:.0f} ms",
+                ready_ms,
+                first_poll * 1000,
+                extra={"import_ms": import_ms, "ready_ms": ready_ms, "first_poll_ms": first_poll * 1000},
+            )
+
+        if SEND_BATCH_WINDOW:
+            outbox = Outbox(transport, window=SEND_BATCH_WINDOW, max_batch=SEND_BATCH_MAX)
+        handler = ConsoleMessageHandler(transport, outbox)
+        dispatcher = None
+        if HANDLER_CONCURRENCY:
+            dispatcher = ConcurrentDispatcher(
+                handler,
+                max_workers=HANDLER_CONCURRENCY,
+                max_in_flight=HANDLER_MAX_IN_FLIGHT,
+                type_limits=HANDLER_TYPE_LIMITS,
+                max_attempts=HANDLER_MAX_ATTEMPTS,
+                retry_delay=HANDLER_RETRY_DELAY,
+                dead_letter=DeadLetterLog(DEAD_LETTER_PATH) if DEAD_LETTER_PATH else None,
+            )
+
+        # The client polls indefinitely. Sending can be layered on top of the
+        # handler structure; for now we focus on keeping the client online and
+        # receptive to new messages.
+        poll_loop(
+            transport,
+            handler,
+            start_cursor=cursor,
+            page_size=POLL_PAGE_SIZE,
+            ack_on_poll=POLL_ACKS_CURSOR,
+            long_poll=LONG_POLL_WAIT,
+            binary=POLL_BINARY,
+            dispatcher=dispatcher,
+            checkpoint=checkpoint,
+            on_first_poll=report_startup,
+        )
+    finally:
+        if outbox is not None:
+            outbox.close()
+        stats = transport.stats
+        logger.info(
+            "Transport: %d requests over %d connections (%d reused)",
+            stats.requests,
+            stats.connections_opened,
+            stats.connections_reused,
+        )
+        transport.close()
+        stop_metrics()
 
-    cursor = discard_pending_messages(BASE_URL, creds)
-    if cursor:
-        print("Cleared pending messages on startup.")
 
-    handler = ConsoleMessageHandler(BASE_URL)
+def identity_checkpoint(creds: Dict[str, str]) -> CursorCheckpoint:
+    """Per-identity checkpoint next to ``CHECKPOINT_PATH``, so identities never share a file."""
 
-    # The client polls indefinitely. Sending can be layered on top of the
-    # handler structure; for now we focus on keeping the client online and
-    # receptive to new messages.
-    poll_loop(BASE_URL, creds, handler, start_cursor=cursor)
+    return CursorCheckpoint(CHECKPOINT_PATH.with_name(f"{CHECKPOINT_PATH.stem}-{creds['client_id']}{CHECKPOINT_PATH.suffix}"))
+
+
+def run_many(credential_paths: List[Path]) -> None:
+    """Run several already-registered identities in this process on one event loop."""
+
+    from .aio.polling import run_identities
+
+    stop_metrics = start_observability()
+    identities = []
+    for path in credential_paths:
+        creds = load_credentials(path)
+        if creds is None:
+            logger.error("No credentials found at %s", path)
+            sys.exit(1)
+        identities.append(creds)
+
+    if not identities:
+        logger.error("Provide at least one credentials file.")
+        sys.exit(1)
+
+    logger.info("Polling for %d identities over a shared connection pool.", len(identities))
+    try:
+        asyncio.run(
+            run_identities(
+                BASE_URL,
+                identities,
+                page_size=POLL_PAGE_SIZE,
+                ack_on_poll=POLL_ACKS_CURSOR,
+                long_poll=LONG_POLL_WAIT,
+                binary=POLL_BINARY,
+                compression=compression_policy(),
+                checkpoint_factory=identity_checkpoint,
+                skip_backlog=SKIP_BACKLOG_ON_START,
+            )
+        )
+    finally:
+        stop_metrics()
 
 
 if __name__ == "__main__":
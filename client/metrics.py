@@ -0,0 +1,292 @@
+"""Client metrics: counters, gauges and latency histograms.
+
+Everything records into the module-level :data:`registry`, which starts
+disabled. While it is disabled each call returns after a single attribute
+check, so the instrumented paths (every request, page and message) cost next
+to nothing. :func:`export` enables it and exposes it as Prometheus text on a
+local port, as a JSON snapshot file rewritten periodically, or both.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .storage import write_json_atomic
+
+# Latency buckets in seconds, from sub-millisecond decrypts to held long polls.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Every metric the client records: name -> (type, help).
+DESCRIPTIONS: Dict[str, Tuple[str, str]] = {
+    "client_api_requests_total": ("counter", "API requests by path and response status (error when no response)."),
+    "client_api_request_seconds": ("histogram", "API request latency by path, including transport retries."),
+    "client_polls_total": ("counter", "Polls by result (messages, empty, error)."),
+    "client_poll_delay_seconds": ("gauge", "Delay the scheduler chose before the next poll."),
+    "client_messages_received_total": ("counter", "Messages received from polls."),
+    "client_backlog_drained_total": ("counter", "Messages received while the server reported more waiting."),
+    "client_decrypt_seconds": ("histogram", "Time to decrypt one poll page."),
+    "client_decrypt_failures_total": ("counter", "Messages that failed to decrypt."),
+    "client_handler_seconds": ("histogram", "Time spent handling one message, by message type."),
+    "client_handler_errors_total": ("counter", "Messages whose handler raised, by message type."),
+    "client_dead_letters_total": ("counter", "Messages given up on after every handler attempt failed, by message type."),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int) -> None:
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "started")
+
+    def __init__(self, metrics: "Metrics", name: str, labels: Dict[str, str]) -> None:
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.metrics.observe(self.name, time.perf_counter() - self.started, **self.labels)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """Thread-safe in-process metric registry.
+
+    Label values are turned into strings; keep them low-cardinality (paths,
+    message types, statuses), never ids.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.enabled = False
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._gauges: Dict[Tuple[str, LabelKey], float] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], _Histogram] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        # Bucket counts are stored per bucket and made cumulative when rendered.
+        slot = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(len(self.buckets) + 1)
+            histogram.counts[slot] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+
+    def timer(self, name: str, **labels: Any) -> Any:
+        """Context manager observing the duration of its block into histogram ``name``."""
+
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def record_request(self, path: str, status: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        self.inc("client_api_requests_total", path=path, status=status)
+        self.observe("client_api_request_seconds", seconds, path=path)
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+
+        samples: Dict[str, List[str]] = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                samples.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_number(value)}")
+            for (name, labels), value in self._gauges.items():
+                samples.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_number(value)}")
+            for (name, labels), histogram in self._histograms.items():
+                lines = samples.setdefault(name, [])
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _number(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_number(histogram.sum)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        out = []
+        for name in sorted(samples):
+            kind, description = DESCRIPTIONS.get(name, ("untyped", ""))
+            if description:
+                out.append(f"# HELP {name} {description}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(samples[name])
+        return "\n".join(out) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return every metric as plain JSON-serialisable data."""
+
+        with self._lock:
+            return {
+                "time": time.time(),
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "gauges": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._gauges.items())
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "buckets": {_number(bound): count for bound, count in zip(self.buckets, histogram.counts)},
+                        "overflow": histogram.counts[-1],
+                    }
+                    for (name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0])
+                ],
+            }
+
+
+registry = Metrics()
+
+
+class SnapshotWriter:
+    """Rewrites ``path`` with :meth:`Metrics.snapshot` every ``interval`` seconds."""
+
+    def __init__(self, path: Path, interval: float = 15.0, metrics: Metrics = registry) -> None:
+        self.path = path
+        self.interval = interval
+        self.metrics = metrics
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join(self.interval)
+        self.write()
+
+    def write(self) -> None:
+        write_json_atomic(self.path, self.metrics.snapshot())
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError:
+                # A full disk or a vanished directory must not take the client down.
+                pass
+
+
+def serve(port: int, host: str = "127.0.0.1", metrics: Metrics = registry) -> ThreadingHTTPServer:
+    """Serve ``GET /metrics`` (Prometheus text) on a background thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming
+            if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - http.server signature
+            return None
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def export(
+    port: Optional[int] = None,
+    snapshot_path: Optional[Path] = None,
+    snapshot_interval: float = 15.0,
+    metrics: Metrics = registry,
+) -> Callable[[], None]:
+    """Enable ``metrics`` if any exporter is requested and start it; returns a function that stops them."""
+
+    server = None
+    writer = None
+    if port is not None or snapshot_path is not None:
+        metrics.enable()
+    if port is not None:
+        server = serve(port, metrics=metrics)
+    if snapshot_path is not None:
+        writer = SnapshotWriter(snapshot_path, snapshot_interval, metrics)
+
+    def stop() -> None:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        if writer is not None:
+            writer.close()
+
+    return stop
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels: LabelKey) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        '{0}="{1}"'.format(name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from requests import HTTPError, RequestException
+
+from . import api
+from .polling import retry_after_seconds
+from .transport import ClientTransport
+
+logger = logging.getLogger(__name__)
+
+
+class Outbox:
+    """Collects outgoing messages and sends them in batches from a background thread.
+
+    A batch is flushed ``window`` seconds after its first message was queued,
+    or as soon as ``max_batch`` messages are waiting, whichever comes first,
+    using one ``POST /messages/send-batch``. A failed flush (network error,
+    ``429`` or ``5xx``) keeps the batch at the head of the queue and retries
+    with backoff, honouring ``Retry-After``. A batch rejected with another
+    ``4xx`` is dropped and reported. If the server has no batch endpoint, the
+    outbox falls back to one ``/messages/send`` per message; each message
+    leaves the queue as soon as its own send succeeds, so a failure part-way
+    through only retries the messages that were not sent yet.
+
+    :meth:`put` blocks while ``max_pending`` messages are waiting, so a long
+    outage slows the producer down instead of growing memory without bound,
+    and refuses new messages once :meth:`close` has been called.
+    A send whose response was lost may be retried, so delivery is at-least-once.
+    """
+
+    def __init__(
+        self,
+        transport: ClientTransport,
+        window: float = 0.5,
+        max_batch: int = 50,
+        max_pending: int = 1000,
+        max_backoff: float = 30.0,
+    ) -> None:
+        self.transport = transport
+        self.window = window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.max_backoff = max_backoff
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self._first_queued: Optional[float] = None
+        self._failures = 0
+        self._batch_supported = True
+        self._closing = False
+        self._changed = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+        self._thread.start()
+
+    def put(self, plaintext: Dict[str, Any]) -> None:
+        """Queue ``plaintext`` for sending; raises ``RuntimeError`` once :meth:`close` was called."""
+
+        with self._changed:
+            while len(self._pending) >= self.max_pending and not self._closing:
+                self._changed.wait()
+            if self._closing:
+                raise RuntimeError("Outbox is closed")
+            if not self._pending:
+                self._first_queued = time.monotonic()
+            self._pending.append(plaintext)
+            self._changed.notify_all()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Flush what is queued (one attempt per batch) and stop the sender thread."""
+
+        with self._changed:
+            self._closing = True
+            self._changed.notify_all()
+        self._thread.join(timeout)
+        with self._changed:
+            if self._pending:
+                logger.warning("Outbox: dropping %d unsent messages on shutdown.", len(self._pending))
+
+    def _run(self) -> None:
+        while True:
+            with self._changed:
+                while True:
+                    if self._pending and (self._closing or len(self._pending) >= self.max_batch):
+                        break
+                    if self._pending:
+                        remaining = self._first_queued + self.window - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._changed.wait(remaining)
+                    elif self._closing:
+                        return
+                    else:
+                        self._changed.wait()
+                batch = [self._pending[idx] for idx in range(min(self.max_batch, len(self._pending)))]
+
+            delay = self._send(batch)
+            with self._changed:
+                if delay is None or self._closing:
+                    # Sent, dropped, or shutting down: either way this batch leaves the queue.
+                    self._release(len(batch))
+                    if delay is not None and batch:
+                        logger.warning("Outbox: unable to send %d messages before shutdown.", len(batch))
+                    continue
+                # put() notifies on every message; keep waiting until the backoff has passed.
+                retry_at = time.monotonic() + delay
+                while not self._closing:
+                    remaining = retry_at - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._changed.wait(remaining)
+
+    def _release(self, count: int) -> None:
+        """Drop ``count`` messages from the head of the queue (caller holds the lock)."""
+
+        for _ in range(count):
+            self._pending.popleft()
+        self._first_queued = time.monotonic() if self._pending else None
+        self._changed.notify_all()
+
+    def _send(self, batch: List[Dict[str, Any]]) -> Optional[float]:
+        """Send ``batch``; return ``None`` when done with it, else seconds to wait before retrying.
+
+        In per-message mode every message that goes through is removed from
+        both the queue and ``batch`` straight away, so ``batch`` is left
+        holding only what is still unsent.
+        """
+
+        try:
+            if self._batch_supported:
+                api.send_batch(self.transport, batch)
+            else:
+                while batch:
+                    api.send_message(self.transport, batch[0])
+                    self._failures = 0
+                    with self._changed:
+                        self._release(1)
+                    batch.pop(0)
+        except HTTPError as exc:
+            response = exc.response
+            status = response.status_code if response is not None else None
+            if status in (404, 405) and self._batch_supported:
+                logger.warning("Server does not support batched sends; sending messages one at a time.")
+                self._batch_supported = False
+                return 0.0
+            if status is not None and 400 <= status < 500 and status != 429:
+                rejected = len(batch) if self._batch_supported else 1
+                logger.error(
+                    "Outbox: server rejected %d messages (status %s): %s",
+                    rejected,
+                    status,
+                    response.text.strip(),
+                    extra={"status": status},
+                )
+                if self._batch_supported:
+                    return None
+                # Only the message that was refused is dropped; the rest go out next round.
+                with self._changed:
+                    self._release(1)
+                batch.pop(0)
+                return 0.0
+            return self._backoff(retry_after_seconds(response.headers if response is not None else None))
+        except RequestException as exc:
+            detail = str(exc).strip() or exc.__class__.__name__
+            logger.warning("Outbox: send failed: %s", detail)
+            return self._backoff()
+
+        self._failures = 0
+        return None
+
+    def _backoff(self, retry_after: Optional[float] = None) -> float:
+        self._failures += 1
+        delay = min(0.5 * 2 ** (self._failures - 1), self.max_backoff)
+        return max(delay, retry_after or 0.0)
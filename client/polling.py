@@ -1,99 +1,308 @@
 from __future__ import annotations
 
+import logging
+import random
 import re
 import time
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
 
 from requests import HTTPError, RequestException
 
-from . import api
-from .handlers import MessageHandler
+from . import api, metrics
+from .dispatch import ConcurrentDispatcher, deliver
+from .handlers import AsyncPlaintextMessageHandler, MessageHandler, PlaintextMessageHandler
+from .storage import CursorCheckpoint
+from .transport import ClientTransport
 
+logger = logging.getLogger(__name__)
 
-def discard_pending_messages(base_url: str, creds: Dict[str, str]) -> Optional[str]:
-    """Ack and discard any messages currently queued for the client.
 
-    Returns the ID of the last message that was acknowledged so the caller can
-    continue polling from that cursor.
+class PollScheduler:
+    """Decides how long ``poll_loop`` waits before each poll.
+
+    Local state is the classic 3s→30s linear backoff. Server hints take
+    precedence: an ``X-Poll-Interval`` header on a poll response replaces the
+    local interval (so the fleet can be slowed down or sped up centrally), and
+    a ``Retry-After`` on an error response is treated as a floor. Every delay
+    is spread by ``jitter`` and the very first poll is delayed by a random
+    fraction of ``startup_spread`` so a fleet restarting together does not
+    poll in lock-step. Subclass or pass a different instance to ``poll_loop``
+    to change the policy.
     """
 
-    cursor: Optional[str] = None
-    while True:
-        messages = api.poll_once(base_url, creds, cursor)
-        if not messages:
-            break
-        cursor = messages[-1]["id"]
-        api.ack_messages(base_url, creds, cursor)
+    def __init__(
+        self,
+        start: float = 3.0,
+        step: float = 3.0,
+        maximum: float = 30.0,
+        jitter: float = 0.2,
+        startup_spread: float = 3.0,
+        max_hint: float = 300.0,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.start = start
+        self.step = step
+        self.maximum = maximum
+        self.jitter = jitter
+        self.startup_spread = startup_spread
+        self.max_hint = max_hint
+        self.rng = rng or random.Random()
+        self.interval = start
+
+    def initial_delay(self) -> float:
+        return self.rng.uniform(0, self.startup_spread) if self.startup_spread > 0 else 0.0
+
+    def after_messages(self, has_more: bool, hint: Optional[float] = None) -> float:
+        self.interval = self.start
+        if has_more:
+            # A backlog is waiting; drain it without sleeping.
+            return 0.0
+        return self._spread(self._hinted(hint, self.interval))
+
+    def after_held_poll(self, hint: Optional[float] = None) -> float:
+        """Delay after a long poll the server held open and that came back empty."""
+
+        self.interval = self.start
+        if hint is None:
+            # The wait already happened server-side; re-arm straight away.
+            return 0.0
+        return self._spread(min(hint, self.max_hint))
+
+    def after_empty(self, hint: Optional[float] = None) -> float:
+        self.interval = min(self.interval + self.step, self.maximum)
+        return self._spread(self._hinted(hint, self.interval))
+
+    def after_error(self, retry_after: Optional[float] = None) -> float:
+        self.interval = min(self.interval + self.step, self.maximum)
+        delay = self.interval
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_hint))
+        return self._spread(delay)
+
+    def _hinted(self, hint: Optional[float], fallback: float) -> float:
+        return fallback if hint is None else min(hint, self.max_hint)
+
+    def _spread(self, delay: float) -> float:
+        if self.jitter <= 0 or delay <= 0:
+            return delay
+        return delay * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+def retry_after_seconds(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    if not headers:
+        return None
+    return api.header_seconds(headers.get("Retry-After"))
+
+
+def http_error_hint(status: object, body: str) -> str:
+    if not isinstance(status, int):
+        return ""
+    if status == 401:
+        return (
+            "Authentication failed. Stored credentials may be stale; "
+            "delete the credentials file and re-run to re-register."
+        )
+    if status >= 500:
+        lowered = (body or "").lower()
+        if "no such table" in lowered or ("table" in lowered and "exists" not in lowered):
+            return (
+                "The server reported a database error. Ensure migrations have "
+                "been run on the server (php artisan migrate)."
+            )
+    return ""
+
+
+def response_snippet(body: str) -> str:
+    snippet = body.strip()
+    if re.search(r"<\s*(?:!doctype|html|head|body)\b", snippet, re.IGNORECASE):
+        comment_match = re.search(r"<!--\s*(.*?)\s*-->", snippet, re.DOTALL)
+        if comment_match and comment_match.group(1):
+            snippet = comment_match.group(1).strip()
+        else:
+            snippet = re.sub(r"<[^>]+>", " ", snippet)
+    snippet = " ".join(snippet.split())
+    return snippet if len(snippet) <= 300 else f"{snippet[:297]}..."
+
 
-    return cursor
+def report_http_error(status: object, body: str) -> None:
+    """Log a remediation hint, or a trimmed server response, for a failed poll."""
+
+    hint = http_error_hint(status, body)
+    if hint:
+        logger.warning(hint, extra={"status": status})
+    elif body:
+        logger.info("Server response: %s", response_snippet(body), extra={"status": status})
+
+
+def page_items(handler: MessageHandler, creds: Dict[str, str], messages: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Any]]:
+    """Pair each message with its plaintext when the handler wants it pre-decrypted."""
+
+    if isinstance(handler, (PlaintextMessageHandler, AsyncPlaintextMessageHandler)):
+        with metrics.registry.timer("client_decrypt_seconds"):
+            pairs = api.decrypt_page(creds, messages)
+        if metrics.registry.enabled:
+            failures = sum(1 for _, plaintext in pairs if isinstance(plaintext, Exception))
+            if failures:
+                metrics.registry.inc("client_decrypt_failures_total", failures)
+        return pairs
+    return [(message, None) for message in messages]
+
+
+def record_page(page: api.PollResult) -> None:
+    """Count a poll's outcome and the messages it brought in."""
+
+    registry = metrics.registry
+    if not registry.enabled:
+        return
+    registry.inc("client_polls_total", result="messages" if page.messages else "empty")
+    if page.messages:
+        registry.inc("client_messages_received_total", len(page.messages))
+        if page.has_more:
+            registry.inc("client_backlog_drained_total", len(page.messages))
 
 
 def poll_loop(
-    base_url: str, creds: Dict[str, str], handler: MessageHandler, start_cursor: Optional[str] = None
+    transport: ClientTransport,
+    handler: MessageHandler,
+    start_cursor: Optional[str] = None,
+    page_size: Optional[int] = None,
+    ack_on_poll: bool = False,
+    scheduler: Optional[PollScheduler] = None,
+    long_poll: Optional[int] = None,
+    binary: bool = False,
+    dispatcher: Optional[ConcurrentDispatcher] = None,
+    checkpoint: Optional[CursorCheckpoint] = None,
+    on_first_poll: Optional[Callable[[float], None]] = None,
 ) -> None:
+    """Poll, dispatch and ack messages until interrupted.
+
+    With ``ack_on_poll`` the standalone ack request is skipped: the cursor sent
+    on the next poll acknowledges everything handled so far. Whatever is still
+    unacknowledged when the loop exits is acked explicitly.
+
+    With ``long_poll`` each poll asks the server to hold the request for up to
+    that many seconds. If the server does not honour it, the loop falls back to
+    short polling with the scheduler's backoff.
+
+    With ``binary`` the poll asks for the compact binary frame format; servers
+    that do not offer it answer with JSON as before.
+
+    With a ``dispatcher`` messages are handled concurrently and polling carries
+    on while they run. Acks then follow the dispatcher's watermark rather than
+    the poll cursor, so ``ack_on_poll`` is ignored. A message whose handler
+    keeps failing is dead-lettered by the dispatcher and then acked past like
+    any other. On exit, running messages are allowed to finish and queued ones
+    (and any waiting to retry) are dropped; they will be redelivered.
+
+    A ``checkpoint`` records the last handled id (the watermark with a
+    dispatcher) after every cycle, so a restart can resume from it.
+
+    ``on_first_poll`` is called once with the duration of the first poll
+    request (the startup spread before it is not included).
+    """
+
+    scheduler = scheduler or PollScheduler()
+    if dispatcher is not None:
+        ack_on_poll = False
     cursor: Optional[str] = start_cursor
-    interval = 3
-    while True:
-        try:
-            messages = api.poll_once(base_url, creds, cursor)
-            if not messages:
-                interval = min(interval + 3, 30)
-                print(f"No messages. Next poll in {interval}s")
-            else:
-                last_id = None
-                for msg in messages:
-                    cursor = msg["id"]
-                    last_id = cursor
-                    try:
-                        handler.handle(msg, creds)
-                    except Exception as exc:  # pylint: disable=broad-except
-                        detail = str(exc).strip() or exc.__class__.__name__
-                        print(f"Error handling message {cursor}: {detail}\n{exc}")
-                if last_id is not None:
-                    api.ack_messages(base_url, creds, last_id)
-                interval = 3
-        except HTTPError as exc:
-            interval = min(interval + 3, 30)
-            response = exc.response
-            status = response.status_code if response is not None else "unknown"
-            hint = ""
-            if isinstance(status, int):
-                if status == 401:
-                    hint = (
-                        "Authentication failed. Stored credentials may be stale; "
-                        "delete the credentials file and re-run to re-register."
-                    )
-                elif status >= 500:
-                    body = (response.text or "").lower() if response is not None else ""
-                    if "no such table" in body or ("table" in body and "exists" not in body):
-                        hint = (
-                            "The server reported a database error. Ensure migrations have "
-                            "been run on the server (php artisan migrate)."
-                        )
-            detail = str(exc).strip() or exc.__class__.__name__
-            print(f"Error during poll (status {status}): {detail}. Retrying in {interval}s")
-            if hint:
-                print(hint)
-            elif response is not None and response.text:
-                snippet = response.text.strip()
-                if re.search(r"<\s*(?:!doctype|html|head|body)\b", snippet, re.IGNORECASE):
-                    comment_match = re.search(r"<!--\s*(.*?)\s*-->", snippet, re.DOTALL)
-                    if comment_match and comment_match.group(1):
-                        snippet = comment_match.group(1).strip()
-                    else:
-                        snippet = re.sub(r"<[^>]+>", " ", snippet)
-                snippet = " ".join(snippet.split())
-                snippet = snippet if len(snippet) <= 300 else f"{snippet[:297]}..."
-                print(f"Server response: {snippet}")
-        except RequestException as exc:
-            interval = min(interval + 3, 30)
-            detail = str(exc).strip() or exc.__class__.__name__
-            print(
-                "Error during poll: {0}. Retrying in {1}s. "
-                "Confirm the server is running at {2}.".format(detail, interval, base_url)
-            )
-        except Exception as exc:  # pylint: disable=broad-except
-            interval = min(interval + 3, 30)
-            detail = str(exc).strip() or exc.__class__.__name__
-            print(f"Error during poll: {detail}. Retrying in {interval}s")
-        time.sleep(interval)
+    acked: Optional[str] = start_cursor
+    try:
+        time.sleep(scheduler.initial_delay())
+        while True:
+            try:
+                poll_started = time.perf_counter()
+                page = api.poll_page(
+                    transport, cursor, page_size, ack=ack_on_poll and cursor != acked, wait=long_poll, binary=binary
+                )
+                if on_first_poll is not None:
+                    on_first_poll(time.perf_counter() - poll_started)
+                    on_first_poll = None
+                record_page(page)
+                # Read after the poll: the transport may have re-registered on a 401.
+                creds = transport.creds
+                if ack_on_poll:
+                    acked = cursor
+                messages = page.messages
+                if long_poll and page.held is None:
+                    logger.warning("Server does not support long polling; falling back to short polling.")
+                    long_poll = None
+                if not messages and long_poll:
+                    delay = scheduler.after_held_poll(page.poll_interval)
+                elif not messages:
+                    delay = scheduler.after_empty(page.poll_interval)
+                    logger.debug("No messages. Next poll in %.1fs", delay, extra={"delay": delay})
+                else:
+                    last_id = None
+                    for msg, plaintext in page_items(handler, creds, messages):
+                        if dispatcher is not None:
+                            cursor = msg["id"]
+                            # Blocks while the dispatcher is full (backpressure).
+                            dispatcher.submit(msg, creds, plaintext)
+                            continue
+                        try:
+                            deliver(handler, creds, msg, plaintext)
+                        except Exception as exc:  # pylint: disable=broad-except
+                            detail = str(exc).strip() or exc.__class__.__name__
+                            logger.error(
+                                "Error handling message %s: %s",
+                                msg["id"],
+                                detail,
+                                extra={"message_id": msg["id"], "message_type": msg.get("type")},
+                            )
+                        # Only once the handler has returned, so an interrupt inside it is never acked.
+                        cursor = last_id = msg["id"]
+                    if last_id is not None and not ack_on_poll:
+                        api.ack_messages(transport, last_id)
+                        acked = last_id
+                    delay = scheduler.after_messages(page.has_more, page.poll_interval)
+                if dispatcher is not None:
+                    watermark = dispatcher.watermark()
+                    if watermark is not None and watermark != acked:
+                        api.ack_messages(transport, watermark)
+                        acked = watermark
+                if checkpoint is not None:
+                    checkpoint.record(cursor if dispatcher is None else dispatcher.watermark())
+            except HTTPError as exc:
+                metrics.registry.inc("client_polls_total", result="error")
+                response = exc.response
+                status = response.status_code if response is not None else "unknown"
+                body = response.text if response is not None else ""
+                delay = scheduler.after_error(retry_after_seconds(response.headers if response is not None else None))
+                detail = str(exc).strip() or exc.__class__.__name__
+                logger.warning(
+                    "Error during poll (status %s): %s. Retrying in %.1fs",
+                    status,
+                    detail,
+                    delay,
+                    extra={"status": status, "delay": delay},
+                )
+                report_http_error(status, body)
+            except RequestException as exc:
+                metrics.registry.inc("client_polls_total", result="error")
+                delay = scheduler.after_error()
+                detail = str(exc).strip() or exc.__class__.__name__
+                logger.warning(
+                    "Error during poll: %s. Retrying in %.1fs. Confirm the server is running at %s.",
+                    detail,
+                    delay,
+                    transport.base_url,
+                    extra={"delay": delay},
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                metrics.registry.inc("client_polls_total", result="error")
+                delay = scheduler.after_error()
+                detail = str(exc).strip() or exc.__class__.__name__
+                logger.error("Error during poll: %s. Retrying in %.1fs", detail, delay, extra={"delay": delay})
+            metrics.registry.set("client_poll_delay_seconds", delay)
+            if delay > 0:
+                time.sleep(delay)
+    finally:
+        last = cursor if dispatcher is None else dispatcher.close(cancel_queued=True)
+        if checkpoint is not None:
+            checkpoint.record(last)
+            checkpoint.flush()
+        if last is not None and last != acked:
+            try:
+                api.ack_messages(transport, last)
+            except RequestException as exc:
+                logger.warning("Unable to ack %s on shutdown: %s", last, exc, extra={"message_id": last})
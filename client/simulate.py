@@ -0,0 +1,75 @@
+"""Simulate the fleet-wide poll rate after every client restarts at once.
+
+Run ``python -m client.simulate`` to compare the legacy lock-step backoff with
+the jittered :class:`~client.polling.PollScheduler`. No network is used: each
+client is a scheduler instance and every poll is assumed to come back empty.
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import random
+from typing import Callable, List, Optional
+
+from .polling import PollScheduler
+
+
+def simulate_restart(
+    clients: int,
+    duration: int,
+    scheduler_factory: Callable[[random.Random], PollScheduler],
+    hint: Optional[float] = None,
+    seed: int = 0,
+) -> List[int]:
+    """Return the number of polls issued in each second after a mass restart."""
+
+    buckets = [0] * duration
+    events = []
+    schedulers = []
+    for idx in range(clients):
+        scheduler = scheduler_factory(random.Random(seed + idx))
+        schedulers.append(scheduler)
+        events.append((scheduler.initial_delay(), idx))
+    heapq.heapify(events)
+
+    while events:
+        at, idx = heapq.heappop(events)
+        if at >= duration:
+            continue
+        buckets[int(at)] += 1
+        heapq.heappush(events, (at + schedulers[idx].after_empty(hint), idx))
+
+    return buckets
+
+
+def legacy_scheduler(rng: random.Random) -> PollScheduler:
+    return PollScheduler(jitter=0, startup_spread=0, rng=rng)
+
+
+def jittered_scheduler(rng: random.Random) -> PollScheduler:
+    return PollScheduler(rng=rng)
+
+
+def render_curve(label: str, buckets: List[int], width: int = 50) -> None:
+    peak = max(buckets) or 1
+    print(f"{label}: peak {max(buckets)} req/s, mean {sum(buckets) / len(buckets):.1f} req/s")
+    for second, count in enumerate(buckets):
+        bar = "#" * round(count / peak * width)
+        print(f"  {second:4}s {count:6} {bar}")
+    print()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--duration", type=int, default=60, help="Seconds to simulate")
+    parser.add_argument("--hint", type=float, default=None, help="Server X-Poll-Interval hint on every 204")
+    args = parser.parse_args()
+
+    render_curve("lock-step 3s->30s", simulate_restart(args.clients, args.duration, legacy_scheduler, args.hint))
+    render_curve("jittered scheduler", simulate_restart(args.clients, args.duration, jittered_scheduler, args.hint))
+
+
+if __name__ == "__main__":
+    main()
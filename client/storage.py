@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import json
+import os
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 
 
 def load_credentials(path: Path) -> Optional[Dict[str, str]]:
@@ -16,3 +19,107 @@ def save_credentials(path: Path, data: Dict[str, str]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     with path.open("w", encoding="utf-8") as fp:
         json.dump(data, fp, indent=2)
+
+
+def write_json_atomic(path: Path, data: Any) -> None:
+    """Replace ``path`` with ``data`` as JSON so readers see the old or new file, never a torn one."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp")
+    with tmp.open("w", encoding="utf-8") as fp:
+        json.dump(data, fp)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+
+
+class CursorCheckpoint:
+    """Crash-safe record of the last message id this client has handled.
+
+    The file is replaced atomically (write to a temp file, then rename), so a
+    crash leaves either the old or the new checkpoint, never a torn one.
+    Writes are batched: :meth:`record` only updates memory unless
+    ``flush_interval`` seconds have passed since the last write, and each
+    write is fsynced. A crash can therefore lose up to ``flush_interval``
+    seconds of progress, which means those messages are handled again on the
+    next start (at-least-once). Call :meth:`flush` on shutdown.
+
+    The checkpoint is tied to ``client_id`` (set by :meth:`load`), so a
+    checkpoint left by a different registration is ignored.
+    """
+
+    def __init__(self, path: Path, flush_interval: float = 5.0) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.client_id: Optional[str] = None
+        self._cursor: Optional[Any] = None
+        self._written: Optional[Any] = None
+        self._last_write = 0.0
+
+    def load(self, client_id: str) -> Optional[Any]:
+        self.client_id = client_id
+        try:
+            with self.path.open("r", encoding="utf-8") as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("client_id") != client_id:
+            return None
+        self._cursor = self._written = data.get("cursor")
+        return self._cursor
+
+    def record(self, cursor: Optional[Any]) -> None:
+        if cursor is not None:
+            self._cursor = cursor
+        # Check even when the cursor is unchanged, so a buffered one is written once the interval passes.
+        if self._cursor != self._written and time.monotonic() - self._last_write >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._cursor is None or self._cursor == self._written:
+            return
+        write_json_atomic(self.path, {"client_id": self.client_id, "cursor": self._cursor})
+        self._written = self._cursor
+        self._last_write = time.monotonic()
+
+
+class DeadLetterLog:
+    """Append-only JSON-lines record of messages given up on by the dispatcher.
+
+    Each line holds the message id, type, creation time, the error and when it
+    was recorded; payloads are not written, since they may be sensitive. Safe
+    to call from several handler threads.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, message: Dict[str, Any], exc: Exception) -> None:
+        entry = {
+            "id": message.get("id"),
+            "type": message.get("type"),
+            "created_at": message.get("created_at"),
+            "error": str(exc).strip() or exc.__class__.__name__,
+            "failed_at": time.time(),
+        }
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as fp:
+                fp.write(json.dumps(entry) + "\n")
+
+
+def _fsync_dir(path: Path) -> None:
+    """Persist a rename by syncing its directory (not possible on Windows)."""
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from client import api
+from client.aio.polling import run_identities
+from client.aio.transport import AsyncHTTPError
+from client.handlers import AsyncMessageHandler
+from client.polling import PollScheduler
+from client.storage import CursorCheckpoint
+
+
+class FakeServer:
+    """Answers the async API per client id; ``rejected`` ids fail with a 401."""
+
+    def __init__(self, stop_event, rejected=(), queued=None):
+        self.stop_event = stop_event
+        self.rejected = set(rejected)
+        self.queued = queued or {}
+        self.fast_forwarded = []
+        self.polls = []
+        self.acks = []
+
+    async def fast_forward(self, transport):
+        client_id = transport.creds["client_id"]
+        if client_id in self.rejected:
+            raise AsyncHTTPError(401, "Invalid token", "http://server/api/v1/messages/fast-forward")
+        self.fast_forwarded.append(client_id)
+        return None
+
+    async def poll_page(self, transport, cursor, page_size, ack=False, wait=None, binary=False):
+        client_id = transport.creds["client_id"]
+        self.polls.append((client_id, cursor))
+        if len(self.polls) >= 3:
+            self.stop_event.set()
+        return api.PollResult(self.queued.pop(client_id, []))
+
+    async def ack_messages(self, transport, last_id):
+        self.acks.append((transport.creds["client_id"], last_id))
+
+
+class RecordingHandler(AsyncMessageHandler):
+    async def handle(self, message, creds):
+        pass
+
+
+def scheduler():
+    return PollScheduler(jitter=0, startup_spread=0, start=0.01, step=0, maximum=0.01)
+
+
+class RunIdentitiesTests(unittest.TestCase):
+    def run_identities(self, server, identities, **kwargs):
+        async def main():
+            with mock.patch("client.aio.polling.aio_api", server):
+                return await run_identities(
+                    "http://server",
+                    identities,
+                    handler_factory=lambda transport: RecordingHandler(),
+                    stop_event=server.stop_event,
+                    scheduler_factory=scheduler,
+                    **kwargs,
+                )
+
+        return asyncio.run(asyncio.wait_for(main(), 5))
+
+    def test_failing_identity_does_not_stop_the_others(self):
+        server = FakeServer(asyncio.Event(), rejected={"bad-client"})
+        identities = [{"client_id": "bad-client", "api_token": "t"}, {"client_id": "good-client", "api_token": "t"}]
+
+        with self.assertLogs("client.aio.polling", "ERROR") as logs:
+            self.run_identities(server, identities)
+
+        self.assertIn("Identity stopped", logs.output[0])
+        self.assertEqual(server.fast_forwarded, ["good-client"])
+        self.assertEqual({client_id for client_id, _ in server.polls}, {"good-client"})
+
+    def test_identity_resumes_from_its_checkpoint(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        directory = Path(tmp.name)
+        path = directory / "cursor-good-client.json"
+        path.write_text(json.dumps({"client_id": "good-client", "cursor": "5"}), encoding="utf-8")
+        server = FakeServer(asyncio.Event(), queued={"good-client": [{"id": "6", "type": "test"}]})
+
+        self.run_identities(
+            server,
+            [{"client_id": "good-client", "api_token": "t"}],
+            checkpoint_factory=lambda creds: CursorCheckpoint(directory / f"cursor-{creds['client_id']}.json"),
+        )
+
+        self.assertEqual(server.fast_forwarded, [])
+        self.assertEqual(server.polls[0], ("good-client", "5"))
+        self.assertEqual(server.acks, [("good-client", "6")])
+        self.assertEqual(json.loads(path.read_text(encoding="utf-8"))["cursor"], "6")
+
+
+if __name__ == "__main__":
+    unittest.main()
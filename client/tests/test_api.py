@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import base64
+import os
+import unittest
+
+from client.api import decrypt_message, decrypt_page
+from client.crypto import EncryptionError, encrypt_payload
+
+TS = "2026-01-01T00:00:00+00:00"
+
+
+class DecryptDirectionTests(unittest.TestCase):
+    def setUp(self):
+        self.creds = {"client_id": "client-1", "personal_token": base64.b64encode(os.urandom(32)).decode()}
+
+    def message(self, message_id, sealed_with, labelled, key=None):
+        envelope = encrypt_payload(key or self.creds["personal_token"], {"n": message_id}, {sealed_with: "client-1", "ts": TS})
+        return {"id": message_id, "created_at": TS, "aad_direction": labelled, **envelope}
+
+    def test_uses_the_labelled_direction(self):
+        self.assertEqual(decrypt_message(self.creds, self.message(1, "from", "from")), {"n": 1})
+        self.assertEqual(decrypt_message(self.creds, self.message(2, "to", "to")), {"n": 2})
+
+    def test_falls_back_for_mislabelled_rows(self):
+        self.assertEqual(decrypt_message(self.creds, self.message(1, "to", "from")), {"n": 1})
+
+    def test_page_retries_mislabelled_rows_and_keeps_real_failures(self):
+        other_key = base64.b64encode(os.urandom(32)).decode()
+        page = [
+            self.message(1, "to", "to"),
+            self.message(2, "to", "from"),
+            self.message(3, "from", "from", key=other_key),
+        ]
+        results = [result for _, result in decrypt_page(self.creds, page)]
+
+        self.assertEqual(results[:2], [{"n": 1}, {"n": 2}])
+        self.assertIsInstance(results[2], EncryptionError)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from client.dispatch import ConcurrentDispatcher
+from client.handlers import MessageHandler
+from client.storage import DeadLetterLog
+
+WAIT = 5.0
+
+
+def message(message_id, kind="test"):
+    return {"id": message_id, "type": kind}
+
+
+class GatedHandler(MessageHandler):
+    """Blocks each message until the test releases it; fails ids listed in ``failing``."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.gates = {}
+        self.started = []
+        self.handled = []
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+
+    def gate(self, message_id):
+        with self.lock:
+            return self.gates.setdefault(message_id, threading.Event())
+
+    def handle(self, message, creds):
+        with self.changed:
+            self.started.append(message["id"])
+            self.changed.notify_all()
+        self.gate(message["id"]).wait(WAIT)
+        if message["id"] in self.failing:
+            raise RuntimeError(f"boom {message['id']}")
+        with self.changed:
+            self.handled.append(message["id"])
+            self.changed.notify_all()
+
+    def release(self, *ids):
+        for message_id in ids:
+            self.gate(message_id).set()
+
+    def wait_started(self, count):
+        with self.changed:
+            return self.changed.wait_for(lambda: len(self.started) >= count, WAIT)
+
+
+def wait_watermark(dispatcher, expected):
+    deadline = time.monotonic() + WAIT
+    while dispatcher.watermark() != expected and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return dispatcher.watermark()
+
+
+class WatermarkTests(unittest.TestCase):
+    def test_watermark_waits_for_earlier_messages(self):
+        handler = GatedHandler()
+        dispatcher = ConcurrentDispatcher(handler, max_workers=4)
+        for message_id in (1, 2, 3):
+            dispatcher.submit(message(message_id), {})
+        self.assertTrue(handler.wait_started(3))
+
+        handler.release(2, 3)
+        time.sleep(0.05)
+        self.assertIsNone(dispatcher.watermark())
+
+        handler.release(1)
+        self.assertEqual(wait_watermark(dispatcher, 3), 3)
+        self.assertEqual(dispatcher.close(), 3)
+
+    def test_failed_message_is_dead_lettered_and_passed(self):
+        handler = GatedHandler(failing={2})
+        dead = []
+        dispatcher = ConcurrentDispatcher(
+            handler,
+            max_workers=4,
+            max_attempts=2,
+            retry_delay=0.01,
+            dead_letter=lambda msg, exc: dead.append((msg["id"], str(exc))),
+        )
+        handler.release(1, 2, 3, 4)
+        for message_id in (1, 2, 3, 4):
+            dispatcher.submit(message(message_id), {})
+
+        self.assertEqual(dispatcher.close(), 4)
+        self.assertEqual(handler.started.count(2), 2)
+        self.assertEqual(dead, [(2, "boom 2")])
+        self.assertEqual(list(dispatcher.dead), [2])
+        self.assertEqual(sorted(handler.handled), [1, 3, 4])
+
+    def test_retry_success_settles_message(self):
+        attempts = []
+
+        class Flaky(MessageHandler):
+            def handle(self, msg, creds):
+                attempts.append(msg["id"])
+                if len(attempts) < 3:
+                    raise RuntimeError("transient")
+
+        dead = []
+        dispatcher = ConcurrentDispatcher(Flaky(), max_attempts=3, retry_delay=0.01, dead_letter=lambda m, e: dead.append(m))
+        dispatcher.submit(message(7), {})
+        self.assertEqual(dispatcher.close(), 7)
+        self.assertEqual(attempts, [7, 7, 7])
+        self.assertEqual(dead, [])
+
+    def test_dead_letter_hook_errors_do_not_stall(self):
+        def broken_hook(msg, exc):
+            raise OSError("disk full")
+
+        handler = GatedHandler(failing={1})
+        handler.release(1, 2)
+        dispatcher = ConcurrentDispatcher(handler, max_attempts=1, dead_letter=broken_hook)
+        with self.assertLogs("client.dispatch", "ERROR") as logs:
+            dispatcher.submit(message(1), {})
+            dispatcher.submit(message(2), {})
+            self.assertEqual(dispatcher.close(), 2)
+        self.assertTrue(any("Unable to dead-letter message 1" in line for line in logs.output))
+
+    def test_dead_letter_log_appends_json_lines(self):
+        handler = GatedHandler(failing={1, 2})
+        handler.release(1, 2)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "nested" / "dead.jsonl"
+            dispatcher = ConcurrentDispatcher(handler, max_attempts=1, dead_letter=DeadLetterLog(path))
+            dispatcher.submit({"id": 1, "type": "test", "created_at": "c1", "ciphertext": "secret"}, {})
+            dispatcher.submit({"id": 2, "type": "test", "created_at": "c2"}, {})
+            self.assertEqual(dispatcher.close(), 2)
+
+            entries = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual(sorted(entry["id"] for entry in entries), [1, 2])
+        self.assertEqual({entry["error"] for entry in entries}, {"boom 1", "boom 2"})
+        self.assertNotIn("ciphertext", entries[0])
+
+    def test_close_interrupts_retry_and_keeps_message_unsettled(self):
+        handler = GatedHandler(failing={1})
+        handler.release(1, 2)
+        dispatcher = ConcurrentDispatcher(handler, max_workers=2, max_attempts=5, retry_delay=60)
+        dispatcher.submit(message(1), {})
+        dispatcher.submit(message(2), {})
+        self.assertTrue(handler.wait_started(2))
+
+        started = time.monotonic()
+        self.assertIsNone(dispatcher.close(cancel_queued=True))
+        self.assertLess(time.monotonic() - started, WAIT)
+        self.assertEqual(handler.started.count(1), 1)
+
+
+class BackpressureTests(unittest.TestCase):
+    def test_submit_blocks_at_max_in_flight(self):
+        handler = GatedHandler()
+        dispatcher = ConcurrentDispatcher(handler, max_workers=2, max_in_flight=2)
+        dispatcher.submit(message(1), {})
+        dispatcher.submit(message(2), {})
+
+        submitted = threading.Event()
+        thread = threading.Thread(target=lambda: (dispatcher.submit(message(3), {}), submitted.set()))
+        thread.start()
+        self.assertFalse(submitted.wait(0.1))
+
+        handler.release(1)
+        self.assertTrue(submitted.wait(WAIT))
+        handler.release(2, 3)
+        thread.join(WAIT)
+        self.assertEqual(dispatcher.close(), 3)
+
+    def test_type_limit_queues_excess_messages(self):
+        handler = GatedHandler()
+        dispatcher = ConcurrentDispatcher(handler, max_workers=4, type_limits={"slow": 1})
+        dispatcher.submit(message(1, "slow"), {})
+        dispatcher.submit(message(2, "slow"), {})
+        dispatcher.submit(message(3, "fast"), {})
+        self.assertTrue(handler.wait_started(2))
+        time.sleep(0.05)
+        self.assertEqual(sorted(handler.started), [1, 3])
+
+        handler.release(1, 3)
+        self.assertTrue(handler.wait_started(3))
+        self.assertEqual(handler.started[-1], 2)
+        handler.release(2)
+        self.assertEqual(dispatcher.close(), 3)
+
+    def test_close_can_drop_queued_messages(self):
+        handler = GatedHandler()
+        dispatcher = ConcurrentDispatcher(handler, max_workers=4, type_limits={"slow": 1})
+        dispatcher.submit(message(1, "slow"), {})
+        dispatcher.submit(message(2, "slow"), {})
+        self.assertTrue(handler.wait_started(1))
+
+        handler.release(1)
+        self.assertEqual(dispatcher.close(cancel_queued=True), 1)
+        self.assertEqual(handler.started, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
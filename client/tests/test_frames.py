@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import struct
+import unittest
+
+from client.frames import FrameError, decode_page
+
+
+def frame(message_id, flags, created_at, kind, nonce, sealed):
+    """Encode one message the way ``BinaryPollFormat::encode`` does."""
+
+    created = created_at.encode("ascii")
+    kind_bytes = kind.encode("utf-8")
+    body = (
+        struct.pack(">QB", message_id, flags)
+        + struct.pack(">B", len(created)) + created
+        + struct.pack(">H", len(kind_bytes)) + kind_bytes
+        + struct.pack(">B", len(nonce)) + nonce
+        + struct.pack(">I", len(sealed)) + sealed
+    )
+    return struct.pack(">I", len(body)) + body
+
+
+def page(frames, has_more=False, next_cursor=0):
+    return b"RAF1" + struct.pack(">BQI", 1 if has_more else 0, next_cursor, len(frames)) + b"".join(frames)
+
+
+class DecodePageTests(unittest.TestCase):
+    def test_round_trip(self):
+        body = page(
+            [
+                frame(5, 0, "2026-01-01T00:00:00Z", "test", b"n" * 12, b"cipher" + b"t" * 16),
+                frame(6, 3, "", "réport", b"m" * 12, b""),
+            ],
+            has_more=True,
+            next_cursor=6,
+        )
+        messages, has_more, next_cursor = decode_page(body)
+
+        self.assertTrue(has_more)
+        self.assertEqual(next_cursor, 6)
+        first, second = messages
+        self.assertEqual(first["id"], 5)
+        self.assertEqual(first["type"], "test")
+        self.assertEqual(first["created_at"], "2026-01-01T00:00:00Z")
+        self.assertEqual(first["aad_direction"], "to")
+        self.assertIsNone(first["encoding"])
+        self.assertEqual(bytes(first["nonce"]), b"n" * 12)
+        self.assertEqual(bytes(first["sealed"]), b"cipher" + b"t" * 16)
+        self.assertIsInstance(first["sealed"], memoryview)
+        self.assertEqual(second["type"], "réport")
+        self.assertIsNone(second["created_at"])
+        self.assertEqual(second["aad_direction"], "from")
+        self.assertEqual(second["encoding"], "zlib")
+
+    def test_empty_page(self):
+        self.assertEqual(decode_page(page([])), ([], False, None))
+
+    def test_rejects_bad_magic(self):
+        with self.assertRaises(FrameError):
+            decode_page(b"XXXX" + page([])[4:])
+
+    def test_rejects_truncated_header(self):
+        with self.assertRaises(FrameError):
+            decode_page(b"RAF1\x00")
+
+    def test_rejects_truncated_frame(self):
+        body = page([frame(1, 0, "", "test", b"n", b"sealed")])
+        with self.assertRaises(FrameError):
+            decode_page(body[:-3])
+
+    def test_rejects_frame_count_past_body(self):
+        body = page([frame(1, 0, "", "test", b"n", b"sealed")])
+        body = body[:13] + struct.pack(">I", 2) + body[17:]
+        with self.assertRaises(FrameError):
+            decode_page(body)
+
+
+if __name__ == "__main__":
+    unittest.main()
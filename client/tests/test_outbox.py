@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from client.outbox import Outbox
+
+WAIT = 5.0
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    response._content = b"nope"
+    return requests.HTTPError(response=response)
+
+
+class FallbackServer:
+    """Stands in for a server without ``send-batch``; fails the sends listed in ``failures``."""
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.attempts = []
+        self.sent = []
+        self.changed = threading.Condition()
+
+    def send_batch(self, transport, batch):
+        raise http_error(404)
+
+    def send_message(self, transport, plaintext):
+        with self.changed:
+            self.attempts.append(plaintext["n"])
+            self.changed.notify_all()
+            if self.failures and self.failures[0][0] == plaintext["n"]:
+                raise self.failures.pop(0)[1]
+            self.sent.append(plaintext["n"])
+
+    def wait_sent(self, count):
+        with self.changed:
+            return self.changed.wait_for(lambda: len(self.sent) >= count, WAIT)
+
+
+class FallbackTests(unittest.TestCase):
+    def run_outbox(self, server, count):
+        with mock.patch("client.outbox.api", server):
+            outbox = Outbox(transport=None, window=0.01, max_batch=10)
+            outbox._backoff = lambda retry_after=None: 0.01
+            for n in range(count):
+                outbox.put({"n": n})
+            self.assertTrue(server.wait_sent(count - 1))
+            outbox.close()
+        return outbox
+
+    def test_failure_mid_batch_resends_only_unsent_messages(self):
+        server = FallbackServer(failures=[(2, requests.ConnectionError("reset"))])
+        outbox = self.run_outbox(server, 5)
+        self.assertTrue(server.wait_sent(5))
+        self.assertEqual(server.sent, [0, 1, 2, 3, 4])
+        self.assertEqual(server.attempts, [0, 1, 2, 2, 3, 4])
+        self.assertFalse(outbox._pending)
+
+    def test_rejected_message_is_dropped_alone(self):
+        server = FallbackServer(failures=[(1, http_error(422))])
+        with self.assertLogs("client.outbox", "ERROR"):
+            outbox = self.run_outbox(server, 4)
+        self.assertEqual(server.sent, [0, 2, 3])
+        self.assertEqual(server.attempts, [0, 1, 2, 3])
+        self.assertFalse(outbox._pending)
+
+
+
+class FlakyBatchServer:
+    """Fails the first ``send_batch`` with a 503 and records when each attempt was made."""
+
+    def __init__(self):
+        self.attempts = []
+        self.changed = threading.Condition()
+
+    def send_batch(self, transport, batch):
+        with self.changed:
+            self.attempts.append((time.monotonic(), len(batch)))
+            self.changed.notify_all()
+            if len(self.attempts) == 1:
+                raise http_error(503)
+
+    def wait_attempts(self, count):
+        with self.changed:
+            return self.changed.wait_for(lambda: len(self.attempts) >= count, WAIT)
+
+
+class BackoffTests(unittest.TestCase):
+    def test_new_messages_do_not_cut_the_backoff_short(self):
+        server = FlakyBatchServer()
+        with mock.patch("client.outbox.api", server):
+            outbox = Outbox(transport=None, window=0.01, max_batch=2)
+            self.addCleanup(outbox.close)
+            outbox._backoff = lambda retry_after=None: 0.3
+            outbox.put({"n": 0})
+            outbox.put({"n": 1})
+            self.assertTrue(server.wait_attempts(1))
+            # A full batch keeps arriving while the sender is backing off.
+            for n in range(2, 8):
+                outbox.put({"n": n})
+            self.assertTrue(server.wait_attempts(2))
+        self.assertGreaterEqual(server.attempts[1][0] - server.attempts[0][0], 0.3)
+
+    def test_put_after_close_is_refused(self):
+        with mock.patch("client.outbox.api", FlakyBatchServer()):
+            outbox = Outbox(transport=None)
+            outbox.close()
+            with self.assertRaises(RuntimeError):
+                outbox.put({"n": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import random
+import statistics
+import unittest
+from unittest import mock
+
+import requests
+
+from client import api
+from client.handlers import MessageHandler
+from client.polling import PollScheduler, poll_loop
+from client.simulate import jittered_scheduler, legacy_scheduler, simulate_restart
+
+
+class Stop(Exception):
+    pass
+
+
+class FakeClock:
+    """Replaces ``time.sleep`` in the poll loop: records each delay and advances ``now``."""
+
+    def __init__(self, sleeps):
+        self.now = 0.0
+        self.delays = []
+        self.remaining = sleeps
+
+    def sleep(self, delay):
+        self.delays.append(delay)
+        self.now += delay
+        self.remaining -= 1
+        if self.remaining < 0:
+            raise Stop()
+
+
+def unavailable(retry_after):
+    response = requests.Response()
+    response.status_code = 503
+    response.headers["Retry-After"] = str(retry_after)
+    response._content = b""
+    return requests.HTTPError("503 Service Unavailable", response=response)
+
+
+def run_loop(scheduler, outcomes, sleeps):
+    """Run ``poll_loop`` on a fake clock; each poll raises or returns the next outcome."""
+
+    clock = FakeClock(sleeps)
+    outcomes = list(outcomes)
+
+    def poll_page(*args, **kwargs):
+        outcome = outcomes.pop(0) if outcomes else api.PollResult([])
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    with mock.patch("client.polling.time.sleep", clock.sleep), mock.patch("client.polling.api.poll_page", poll_page):
+        with mock.patch("client.polling.logger"), mock.patch("client.polling.report_http_error"):
+            try:
+                poll_loop(transport=mock.Mock(base_url="http://server"), handler=MessageHandler(), scheduler=scheduler)
+            except Stop:
+                pass
+    return clock
+
+
+class JitterTests(unittest.TestCase):
+    def test_delays_are_spread_within_the_jitter_band(self):
+        first, backoff = [], []
+        for seed in range(500):
+            clock = run_loop(jittered_scheduler(random.Random(seed)), [], sleeps=1)
+            first.append(clock.delays[0])
+            backoff.append(clock.delays[1])
+        self.assertTrue(all(0 <= delay <= 3.0 for delay in first))
+        self.assertGreater(max(first) - min(first), 2.5)
+        # The first empty poll backs off to 6s, spread by +/-20%.
+        self.assertTrue(all(6 * 0.8 <= delay <= 6 * 1.2 for delay in backoff))
+        self.assertGreater(statistics.pstdev(backoff), 0.5)
+
+    def test_mass_restart_peak_is_flattened(self):
+        legacy = simulate_restart(2000, 60, legacy_scheduler)
+        jittered = simulate_restart(2000, 60, jittered_scheduler)
+        self.assertEqual(max(legacy), 2000)
+        self.assertLess(max(jittered), 2000 / 2)
+        self.assertAlmostEqual(sum(jittered) / sum(legacy), 1.0, delta=0.25)
+
+
+class RetryAfterTests(unittest.TestCase):
+    def scheduler(self):
+        return PollScheduler(jitter=0, startup_spread=0, max_hint=120.0)
+
+    def test_retry_after_is_a_floor(self):
+        clock = run_loop(self.scheduler(), [unavailable(20)], sleeps=2)
+        self.assertEqual(clock.delays, [0.0, 20.0, 9.0])
+
+    def test_shorter_retry_after_keeps_local_backoff(self):
+        clock = run_loop(self.scheduler(), [api.PollResult([]), api.PollResult([]), unavailable(1)], sleeps=3)
+        self.assertEqual(clock.delays, [0.0, 6.0, 9.0, 12.0])
+
+    def test_retry_after_is_capped_by_max_hint(self):
+        clock = run_loop(self.scheduler(), [unavailable(3600)], sleeps=1)
+        self.assertEqual(clock.delays, [0.0, 120.0])
+        self.assertEqual(clock.now, 120.0)
+
+    def test_jitter_applies_on_top_of_retry_after(self):
+        delays = [
+            run_loop(PollScheduler(startup_spread=0, rng=random.Random(seed)), [unavailable(20)], sleeps=1).delays[1]
+            for seed in range(200)
+        ]
+        self.assertTrue(all(20 * 0.8 <= delay <= 20 * 1.2 for delay in delays))
+        self.assertGreater(max(delays) - min(delays), 4.0)
+
+
+
+class InterruptingHandler(MessageHandler):
+    def __init__(self):
+        self.handled = []
+
+    def handle(self, message, creds):
+        if message["id"] == "2":
+            raise KeyboardInterrupt()
+        self.handled.append(message["id"])
+
+
+class InterruptTests(unittest.TestCase):
+    def test_interrupted_handler_is_not_acked_or_checkpointed(self):
+        page = api.PollResult([{"id": "1", "type": "test"}, {"id": "2", "type": "test"}, {"id": "3", "type": "test"}])
+        handler = InterruptingHandler()
+        checkpoint = mock.Mock()
+        with mock.patch("client.polling.time.sleep"), mock.patch("client.polling.api") as fake_api:
+            fake_api.poll_page.return_value = page
+            with self.assertRaises(KeyboardInterrupt):
+                poll_loop(
+                    transport=mock.Mock(creds={}),
+                    handler=handler,
+                    scheduler=PollScheduler(startup_spread=0),
+                    checkpoint=checkpoint,
+                )
+
+        self.assertEqual(handler.handled, ["1"])
+        fake_api.ack_messages.assert_called_once_with(mock.ANY, "1")
+        checkpoint.record.assert_called_once_with("1")
+
+
+if __name__ == "__main__":
+    unittest.main()
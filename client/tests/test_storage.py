@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from client.storage import CursorCheckpoint
+
+
+class CursorCheckpointTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "checkpoint.json"
+        self.now = 1000.0
+        patcher = mock.patch("client.storage.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def written(self):
+        return json.loads(self.path.read_text(encoding="utf-8"))
+
+    def test_writes_are_batched_by_interval(self):
+        checkpoint = CursorCheckpoint(self.path, flush_interval=5.0)
+        checkpoint.load("client-1")
+        checkpoint.record(10)
+        self.assertEqual(self.written(), {"client_id": "client-1", "cursor": 10})
+
+        self.now += 1
+        checkpoint.record(11)
+        self.assertEqual(self.written()["cursor"], 10)
+
+        self.now += 5
+        checkpoint.record(12)
+        self.assertEqual(self.written()["cursor"], 12)
+
+    def test_unchanged_cursor_flushes_once_interval_passes(self):
+        checkpoint = CursorCheckpoint(self.path, flush_interval=5.0)
+        checkpoint.load("client-1")
+        checkpoint.record(10)
+        self.now += 1
+        checkpoint.record(11)
+        self.assertEqual(self.written()["cursor"], 10)
+
+        # No new messages arrive: idle cycles keep recording the same cursor.
+        self.now += 5
+        checkpoint.record(11)
+        self.assertEqual(self.written()["cursor"], 11)
+
+        self.now += 5
+        checkpoint.record(None)
+        self.assertEqual(self.written()["cursor"], 11)
+
+    def test_flush_writes_buffered_cursor(self):
+        checkpoint = CursorCheckpoint(self.path, flush_interval=60.0)
+        checkpoint.load("client-1")
+        checkpoint.record(1)
+        checkpoint.record(2)
+        checkpoint.flush()
+        self.assertEqual(self.written()["cursor"], 2)
+
+    def test_load_ignores_other_client(self):
+        CursorCheckpoint(self.path).load("client-1")
+        checkpoint = CursorCheckpoint(self.path)
+        checkpoint.load("client-1")
+        checkpoint.record(42)
+        checkpoint.flush()
+
+        self.assertEqual(CursorCheckpoint(self.path).load("client-1"), 42)
+        self.assertIsNone(CursorCheckpoint(self.path).load("client-2"))
+
+    def test_load_ignores_corrupt_file(self):
+        self.path.write_text("{not json", encoding="utf-8")
+        self.assertIsNone(CursorCheckpoint(self.path).load("client-1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
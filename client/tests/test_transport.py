@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import unittest
+from unittest import mock
+
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+from client.transport import ClientTransport, EndpointPolicy, connect_failed
+
+
+def refused():
+    reason = NewConnectionError(None, "Connection refused")
+    return requests.ConnectionError(MaxRetryError(None, "/api/v1/messages/send", reason))
+
+
+def reset():
+    return requests.ConnectionError(ProtocolError("Connection aborted.", ConnectionResetError(104, "reset")))
+
+
+def ok():
+    response = requests.Response()
+    response.status_code = 200
+    return response
+
+
+class ConnectFailedTests(unittest.TestCase):
+    def test_classifies_connect_phase_errors(self):
+        self.assertTrue(connect_failed(refused()))
+        self.assertTrue(connect_failed(requests.ConnectTimeout()))
+        self.assertFalse(connect_failed(reset()))
+        self.assertFalse(connect_failed(requests.ConnectionError()))
+
+
+class SendRetryTests(unittest.TestCase):
+    def setUp(self):
+        policies = {name: EndpointPolicy(timeout=1, retries=2, backoff=0, retry_on_read=name != "send") for name in ("send", "poll")}
+        self.transport = ClientTransport("http://server", creds={"client_id": "c", "api_token": "t"}, policies=policies)
+        self.addCleanup(self.transport.close)
+
+    def run_with(self, endpoint, *outcomes):
+        with mock.patch.object(self.transport.session, "request", side_effect=list(outcomes)) as request:
+            try:
+                return self.transport.request(endpoint, "POST", "/x"), request.call_count
+            except requests.RequestException as exc:
+                return exc, request.call_count
+
+    def test_send_retries_refused_connection(self):
+        response, calls = self.run_with("send", refused(), ok())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(calls, 2)
+
+    def test_send_does_not_replay_dropped_connection(self):
+        error, calls = self.run_with("send", reset(), ok())
+        self.assertIsInstance(error, requests.ConnectionError)
+        self.assertEqual(calls, 1)
+
+    def test_send_does_not_replay_read_timeout(self):
+        error, calls = self.run_with("send", requests.ReadTimeout(), ok())
+        self.assertIsInstance(error, requests.ReadTimeout)
+        self.assertEqual(calls, 1)
+
+    def test_idempotent_endpoint_replays_dropped_connection(self):
+        response, calls = self.run_with("poll", reset(), ok())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+from . import metrics
+from .api import auth_headers
+from .crypto import Compression
+
+
+class EndpointPolicy:
+    """Timeout and retry settings for a single API endpoint.
+
+    ``retry_on_read`` controls whether a request that may already have reached
+    the server (read timeout, dropped connection, 5xx) is replayed. It must
+    stay ``False`` for non-idempotent endpoints such as ``send``, which are
+    only retried when the connection could not be opened at all.
+    """
+
+    def __init__(
+        self,
+        timeout: float,
+        retries: int = 0,
+        backoff: float = 0.5,
+        retry_on_read: bool = False,
+    ) -> None:
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.retry_on_read = retry_on_read
+
+
+DEFAULT_POLICIES: Dict[str, EndpointPolicy] = {
+    "register": EndpointPolicy(timeout=10, retries=2, retry_on_read=True),
+    "poll": EndpointPolicy(timeout=15, retries=2, retry_on_read=True),
+    "ack": EndpointPolicy(timeout=10, retries=2, retry_on_read=True),
+    "send": EndpointPolicy(timeout=15, retries=1, retry_on_read=False),
+}
+
+RETRY_STATUSES = {502, 503, 504}
+
+
+def connect_failed(exc: requests.ConnectionError) -> bool:
+    """True when ``exc`` happened while opening the connection, before any of the request was sent."""
+
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = exc.args[0] if exc.args else None
+    # requests wraps urllib3's MaxRetryError, whose ``reason`` is the underlying error.
+    return isinstance(getattr(reason, "reason", reason), NewConnectionError)
+
+
+class TransportStats:
+    """Counters describing how well the connection pool is being reused."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+        self.retries = 0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def record_connection(self) -> None:
+        with self._lock:
+            self.connections_opened += 1
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    @property
+    def connections_reused(self) -> int:
+        return max(self.requests - self.connections_opened, 0)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused,
+            "retries": self.retries,
+        }
+
+
+def _counting_pool(base: type, stats: TransportStats) -> type:
+    class CountingPool(base):  # type: ignore[misc, valid-type]
+        def _new_conn(self):  # type: ignore[no-untyped-def]
+            stats.record_connection()
+            return super()._new_conn()
+
+    CountingPool.__name__ = f"Counting{base.__name__}"
+    return CountingPool
+
+
+class _CountingAdapter(HTTPAdapter):
+    def __init__(self, stats: TransportStats, **kwargs: Any) -> None:
+        # HTTPAdapter.__init__ builds the pool manager, so stats must exist first.
+        self._stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool(HTTPConnectionPool, self._stats),
+            "https": _counting_pool(HTTPSConnectionPool, self._stats),
+        }
+
+
+class ClientTransport:
+    """Pooled keep-alive HTTP transport shared by every API call of a client.
+
+    A single ``requests.Session`` keeps TCP/TLS connections open between polls,
+    and the auth headers are built once when credentials are attached rather
+    than on every request.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        creds: Optional[Dict[str, str]] = None,
+        policies: Optional[Dict[str, EndpointPolicy]] = None,
+        pool_maxsize: int = 4,
+        compression: Optional[Compression] = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.policies = dict(DEFAULT_POLICIES)
+        if policies:
+            self.policies.update(policies)
+        self.stats = TransportStats()
+
+        self.session = requests.Session()
+        adapter = _CountingAdapter(self.stats, pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Connection"] = "keep-alive"
+
+        self.creds: Optional[Dict[str, str]] = None
+        self._auth_headers: Dict[str, str] = {}
+        # Applied to outgoing payloads by api.send_message / api.send_batch.
+        self.compression = compression
+        # Called (once per rejected request) when the server answers 401; it
+        # should register again and attach the new credentials.
+        self.reauthenticate: Optional[Callable[[], None]] = None
+        self._reauth_lock = threading.Lock()
+        if creds is not None:
+            self.set_credentials(creds)
+
+    def set_credentials(self, creds: Dict[str, str]) -> None:
+        self.creds = creds
+        self._auth_headers = auth_headers(creds)
+
+    def request(
+        self,
+        endpoint: str,
+        method: str,
+        path: str,
+        authenticated: bool = True,
+        **kwargs: Any,
+    ) -> requests.Response:
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = self._request(endpoint, method, path, authenticated, kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            metrics.registry.record_request(path, status, time.perf_counter() - started)
+
+    def _request(
+        self, endpoint: str, method: str, path: str, authenticated: bool, kwargs: Dict[str, Any]
+    ) -> requests.Response:
+        policy = self.policies[endpoint]
+        kwargs.setdefault("timeout", policy.timeout)
+        url = f"{self.base_url}{path}"
+        if not authenticated:
+            return self._send(policy, method, url, kwargs)
+
+        extra_headers = kwargs.pop("headers", {})
+        sent_with = self._auth_headers
+        if not sent_with:
+            raise RuntimeError("Transport has no credentials attached")
+        response = self._send(policy, method, url, {**kwargs, "headers": {**sent_with, **extra_headers}})
+        if response.status_code != 401 or self.reauthenticate is None:
+            return response
+
+        # Stored credentials are trusted without a registration round trip, so
+        # the first rejected request is where stale ones get replaced.
+        response.close()
+        with self._reauth_lock:
+            if self._auth_headers is sent_with:
+                self.reauthenticate()
+        return self._send(policy, method, url, {**kwargs, "headers": {**self._auth_headers, **extra_headers}})
+
+    def _send(self, policy: EndpointPolicy, method: str, url: str, kwargs: Dict[str, Any]) -> requests.Response:
+        attempt = 0
+        while True:
+            self.stats.record_request()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.ConnectionError as exc:
+                # A connection dropped mid-request may already have delivered
+                # the body, so only a failed connect is safe to replay everywhere.
+                if attempt >= policy.retries or not (policy.retry_on_read or connect_failed(exc)):
+                    raise
+            except requests.Timeout:
+                if not policy.retry_on_read or attempt >= policy.retries:
+                    raise
+            else:
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or not policy.retry_on_read
+                    or attempt >= policy.retries
+                ):
+                    return response
+                response.close()
+
+            attempt += 1
+            self.stats.record_retry()
+            time.sleep(policy.backoff * attempt)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "ClientTransport":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
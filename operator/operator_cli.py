@@ -1,8 +1,17 @@
 import argparse
+import fnmatch
+import heapq
+import itertools
 import json
 import os
+import re
+import sys
 import threading
-from typing import Dict, List
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Callable, Deque, Dict, Iterator, List, Optional, TextIO, Tuple
 
 try:
     import curses  # type: ignore
@@ -13,10 +22,28 @@ except ImportError:  # pragma: no cover - platform dependent
     HAS_CURSES = False
 
 import requests
+from urllib3.exceptions import NewConnectionError
 
 
 DEFAULT_OPERATOR_TOKEN = "changeme-operator"
 DEFAULT_ADMIN_TOKEN = "changeme-admin"
+# Rows per page in the interactive client list, and clients per request when syncing it.
+DISPLAY_PAGE_SIZE = 20
+FETCH_PAGE_SIZE = 500
+# Messages per request to the operator message feed, and the most client ids the
+# server accepts as a filter (larger selections are filtered locally instead).
+FEED_PAGE_SIZE = 200
+FEED_MAX_CLIENTS = 1000
+# Recipients per publish request and publish requests in flight for `broadcast`.
+BROADCAST_BATCH_SIZE = 1000
+BROADCAST_CONCURRENCY = 4
+# Longest Retry-After (seconds) a broadcast batch waits before resending.
+BROADCAST_MAX_RETRY_AFTER = 60
+# Lines kept per client by the watch panes, and by the conversation view.
+PANE_SCROLLBACK = 200
+SCROLLBACK_LINES = 5000
+# Longer lines are cut in memory; the history log keeps them whole.
+MAX_LINE_CHARS = 1000
 
 
 def parse_args() -> argparse.Namespace:
@@ -37,63 +64,283 @@ def parse_args() -> argparse.Namespace:
         help=f"Admin token for publishing messages (default: {DEFAULT_ADMIN_TOKEN} or ADMIN_TOKEN env var)",
     )
     parser.add_argument("--json", action="store_true", help="Output raw JSON instead of a table")
+    parser.add_argument("--status", choices=["online", "offline"], help="Only list clients with this status")
+    parser.add_argument("--name", help="Only list clients whose name starts with this prefix")
+    parser.add_argument(
+        "--history-log",
+        default=os.getenv("OPERATOR_HISTORY_LOG"),
+        metavar="PATH",
+        help="Append every line shown by the conversation and watch views to this file, "
+        "keeping history beyond the in-memory scrollback (default: OPERATOR_HISTORY_LOG env var)",
+    )
+
+    commands = parser.add_subparsers(dest="command")
+    watch = commands.add_parser(
+        "watch",
+        help="Follow messages for many clients through the operator message feed",
+        description="Follow messages addressed to the selected clients (all clients by default) with one "
+        "request per cycle. --status and --name select clients too.",
+    )
+    watch.add_argument("--client", action="append", default=[], metavar="ID", help="Watch this client (repeatable)")
+    watch.add_argument("--type", action="append", default=[], dest="types", metavar="TYPE", help="Only show this message type (repeatable)")
+    watch.add_argument("--grep", help="Only show messages whose line contains this text (case-insensitive)")
+    watch.add_argument("--panes", action="store_true", help="Show one pane per client instead of a single stream (needs curses)")
+
+    broadcast = commands.add_parser(
+        "broadcast",
+        help="Publish one message to many clients",
+        description="Publish one message to the selected clients in concurrent batches. Select them with "
+        "--status/--name (before the command) and --pattern, or --ids-file on its own, or --all.",
+    )
+    broadcast.add_argument("--type", required=True, dest="msg_type", help="Message type")
+    broadcast.add_argument("--payload", required=True, help="JSON object payload; plain text is wrapped as {\"message\": ...}")
+    selection = broadcast.add_mutually_exclusive_group()
+    selection.add_argument("--pattern", help="Only clients whose name matches this glob (e.g. 'edge-*-eu')")
+    selection.add_argument("--ids-file", metavar="PATH", help="Read client ids from this file, one per line ('-' for stdin)")
+    broadcast.add_argument("--all", action="store_true", help="Send to every client when no other selection is given")
+    broadcast.add_argument("--batch-size", type=int, default=BROADCAST_BATCH_SIZE, help=f"Recipients per request (default: {BROADCAST_BATCH_SIZE})")
+    broadcast.add_argument("--concurrency", type=int, default=BROADCAST_CONCURRENCY, help=f"Requests in flight (default: {BROADCAST_CONCURRENCY})")
+    broadcast.add_argument("--dry-run", action="store_true", help="Count the selected clients without sending")
+    broadcast.add_argument("--unknown-ids", metavar="PATH", help="Append the ids of batches whose outcome is unknown to this file")
+
+    stats = commands.add_parser("stats", help="Show live fleet statistics", description="Show fleet-wide counts and backlog, refreshed until interrupted.")
+    stats.add_argument("--interval", type=float, default=5.0, help="Seconds between refreshes (default: 5)")
+    stats.add_argument("--top", type=int, default=10, help="Clients with the deepest backlog to list (default: 10, max 100)")
+    stats.add_argument("--once", action="store_true", help="Print one snapshot and exit")
     return parser.parse_args()
 
 
-def fetch_clients(base_url: str, token: str) -> List[Dict[str, str]]:
+def fetch_clients(
+    base_url: str,
+    token: str,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    status: Optional[str] = None,
+    name: Optional[str] = None,
+    since: Optional[str] = None,
+) -> Dict:
+    """Fetch one page of clients; the body carries ``next_cursor`` and ``next_since``."""
+
+    params = {"cursor": cursor, "limit": limit, "status": status, "name": name, "since": since}
     response = requests.get(
         f"{base_url.rstrip('/')}/api/v1/operators/clients",
         headers={"X-Operator-Token": token},
+        params={key: value for key, value in params.items() if value is not None},
         timeout=15,
     )
     response.raise_for_status()
-    body = response.json()
-    return body.get("clients", [])
+    return response.json()
+
+
+def iter_client_pages(base_url: str, token: str, **filters) -> Iterator[Dict]:
+    """Yield every page of the listing, following ``next_cursor``."""
+
+    cursor = None
+    while True:
+        body = fetch_clients(base_url, token, cursor=cursor, limit=FETCH_PAGE_SIZE, **filters)
+        yield body
+        cursor = body.get("next_cursor")
+        if not cursor:
+            return
+
+
+def parse_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class ClientDirectory:
+    """Local copy of the client listing, kept current with ``since`` deltas.
+
+    The first :meth:`refresh` pages through the listing once. Later refreshes
+    only ask for clients seen or registered since the previous one and merge
+    them in, so refreshing costs one small request however many clients exist.
+    Online/offline is recomputed locally from ``last_seen_at`` against the
+    server clock, because a client going offline does not show up in a delta,
+    and ``status`` filters that local view.
+    """
+
+    def __init__(self, base_url: str, token: str, status: Optional[str] = None, name: Optional[str] = None) -> None:
+        self.base_url = base_url
+        self.token = token
+        self.status = status
+        self.name = name
+        self._by_id: Dict[str, Dict] = {}
+        self._since: Optional[str] = None
+        self._server_time: Optional[datetime] = None
+        self._window = 120
+
+    def refresh(self) -> int:
+        """Fetch what changed since the last refresh; returns how many clients were updated."""
+
+        # The status filter is only ever applied locally. Even the first sync
+        # fetches every status: a client that goes offline later never shows
+        # up in a delta, so it must already be known.
+        filters = {"name": self.name, "since": self._since}
+        updated = 0
+        next_since = None
+        for body in iter_client_pages(self.base_url, self.token, **filters):
+            if next_since is None:
+                # Taken from the first page, so nothing that changes while paging is missed.
+                next_since = body.get("next_since")
+                self._server_time = parse_time(body.get("server_time"))
+                self._window = int(body.get("online_window") or self._window)
+            for client in body.get("clients", []):
+                self._by_id[client["id"]] = client
+                updated += 1
+        self._since = next_since
+        return updated
+
+    def clients(self) -> List[Dict]:
+        now = self._server_time
+        listed = []
+        for client in self._by_id.values():
+            if now is not None:
+                last_seen = parse_time(client.get("last_seen_at"))
+                online = last_seen is not None and last_seen >= now - timedelta(seconds=self._window)
+                client["status"] = "online" if online else "offline"
+            if self.status is None or client.get("status") == self.status:
+                listed.append(client)
+        listed.sort(key=lambda client: (client.get("created_at") or "", client.get("id") or ""))
+        return listed
 
 
-def print_table(clients: List[Dict[str, str]]) -> None:
+def print_table(clients: List[Dict[str, str]], start: int = 0, total: Optional[int] = None) -> None:
     if not clients:
         print("No clients registered.")
         return
 
-    header = f"{'#':3} {'Client ID':36}  {'Name':20}  {'Status':7}  Last seen"
+    header = f"{'#':5} {'Client ID':36}  {'Name':20}  {'Status':7}  Last seen"
     print(header)
     print("-" * len(header))
 
-    for idx, client in enumerate(clients, start=1):
+    for idx, client in enumerate(clients, start=start + 1):
         name = (client.get("name") or "-")
         if len(name) > 20:
             name = name[:17] + "..."
         last_seen = client.get("last_seen_at") or "never"
-        print(f"{idx:3} {client.get('id',''):36}  {name:20}  {client.get('status','?'):7}  {last_seen}")
+        print(f"{idx:5} {client.get('id',''):36}  {name:20}  {client.get('status','?'):7}  {last_seen}")
 
+    if total is not None and total > len(clients):
+        print(f"Showing {start + 1}-{start + len(clients)} of {total}.")
+
+
+class MessageFeed:
+    """Follows ``/operators/messages``: one request per :meth:`fetch`, however many clients are watched.
+
+    ``client_ids`` narrows the feed to messages addressed to those clients; an
+    empty list follows every client. The first fetch returns the latest page,
+    so watching starts at the tail; later fetches continue after the last id.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        client_ids: Optional[List[str]] = None,
+        session: Optional[requests.Session] = None,
+    ) -> None:
+        self.url = f"{base_url.rstrip('/')}/api/v1/operators/messages"
+        self.token = token
+        self.client_ids = list(client_ids or [])
+        self.session = session or requests.Session()
+        self.cursor: Optional[int] = None
+        self.has_more = False
+
+    def fetch(self) -> List[Dict]:
+        params: Dict = {"limit": FEED_PAGE_SIZE}
+        if self.cursor is not None:
+            params["cursor"] = self.cursor
+        headers = {"X-Operator-Token": self.token}
+        if self.client_ids:
+            # Ids travel in the body so a long selection is not limited by URL length.
+            response = self.session.post(
+                self.url, headers=headers, json={**params, "client_ids": self.client_ids}, timeout=15
+            )
+        else:
+            response = self.session.get(self.url, headers=headers, params=params, timeout=15)
+
+        if response.status_code == 204:
+            self.has_more = False
+            if self.cursor is None:
+                # Nothing stored yet, so everything that arrives from now on is new.
+                self.cursor = 0
+            return []
+        response.raise_for_status()
+        body = response.json()
+        self.has_more = bool(body.get("has_more"))
+        self.cursor = body.get("next_cursor", self.cursor)
+        return body.get("messages", [])
 
-def stream_client_messages(base_url: str, token: str, client_id: str, cursor: str | None) -> List[Dict]:
-    params = {"cursor": cursor} if cursor else {}
-    response = requests.get(
-        f"{base_url.rstrip('/')}/api/v1/operators/clients/{client_id}/messages",
-        headers={"X-Operator-Token": token},
-        params=params,
-        timeout=15,
-    )
-    if response.status_code == 204:
-        return []
-    response.raise_for_status()
-    body = response.json()
-    return body.get("messages", [])
+
+def follow_feed(
+    feed: MessageFeed,
+    on_messages: Callable[[List[Dict]], None],
+    on_error: Callable[[str], None],
+    stop_event: threading.Event,
+) -> None:
+    """Fetch from ``feed`` until ``stop_event`` is set.
+
+    A page that reports more waiting is followed straight away; otherwise the
+    wait grows from 1 to 5 seconds while idle, and up to 10 seconds on errors.
+    """
+
+    delay = 1
+    while not stop_event.is_set():
+        try:
+            messages = feed.fetch()
+        except requests.HTTPError as exc:
+            detail = exc.response.text if exc.response is not None else str(exc)
+            on_error(f"Failed to read messages: {detail}")
+            delay = min(delay + 1, 10)
+        except requests.RequestException as exc:
+            on_error(f"Failed to read messages: {exc}")
+            delay = min(delay + 1, 10)
+        else:
+            if messages:
+                on_messages(messages)
+            if feed.has_more:
+                continue
+            delay = 1 if messages else min(delay + 1, 5)
+
+        stop_event.wait(delay)
 
 
 def publish_message(base_url: str, admin_token: str, client_id: str, msg_type: str, payload: Dict) -> Dict:
-    response = requests.post(
+    return publish_batch(base_url, admin_token, [client_id], msg_type, payload)
+
+
+def publish_batch(
+    base_url: str,
+    admin_token: str,
+    client_ids: List[str],
+    msg_type: str,
+    payload: Dict,
+    session: Optional[requests.Session] = None,
+) -> Dict:
+    response = (session or requests).post(
         f"{base_url.rstrip('/')}/api/v1/messages/publish",
         headers={"X-Admin-Token": admin_token, "Content-Type": "application/json"},
-        json={"to_client_ids": [client_id], "type": msg_type, "payload": payload},
-        timeout=15,
+        json={"to_client_ids": client_ids, "type": msg_type, "payload": payload},
+        timeout=30,
     )
     response.raise_for_status()
     return response.json()
 
 
+def parse_payload(raw: str) -> Dict:
+    """Parse a JSON object payload; anything else is wrapped as ``{"message": raw}``."""
+
+    try:
+        parsed = json.loads(raw)
+        if not isinstance(parsed, dict):
+            raise ValueError
+        return parsed
+    except ValueError:
+        return {"message": raw}
+
+
 def prompt_payload() -> Dict:
     print("Enter JSON payload for the message. If you provide plain text, it will be wrapped as {\"message\": <text>}.")
     raw = input("Payload: ").strip()
@@ -119,48 +366,80 @@ def render_message_line(message: Dict) -> str:
     )
 
 
-def live_conversation(base_url: str, operator_token: str, admin_token: str, client: Dict) -> None:
+def open_history_log(path: Optional[str]) -> Optional[TextIO]:
+    return open(path, "a", encoding="utf-8", buffering=1) if path else None
+
+
+class Scrollback:
+    """Fixed-capacity line buffer for a curses view, safe to append to from another thread.
+
+    The oldest lines drop off once ``capacity`` is reached, so memory stays flat
+    however long a view is left open; ``log`` (if given) receives every line in
+    full. ``changed`` is set whenever what is visible may differ, so the view
+    only repaints when needed. ``offset`` counts lines scrolled up from the
+    bottom and is kept steady while new lines arrive.
+    """
+
+    def __init__(self, capacity: int = SCROLLBACK_LINES, log: Optional[TextIO] = None) -> None:
+        self.lines: Deque[str] = deque(maxlen=capacity)
+        self.log = log
+        self.offset = 0
+        self.changed = threading.Event()
+        self._lock = threading.Lock()
+
+    def append(self, line: str) -> None:
+        with self._lock:
+            self.lines.append(line[:MAX_LINE_CHARS])
+            if self.offset:
+                self.offset = min(self.offset + 1, len(self.lines) - 1)
+            if self.log is not None:
+                self.log.write(line + "\n")
+        self.changed.set()
+
+    def scroll(self, delta: int, height: int) -> None:
+        """Move the view ``delta`` lines up (positive) or down, keeping a full screen in range."""
+
+        with self._lock:
+            self.offset = max(0, min(self.offset + delta, len(self.lines) - height))
+        self.changed.set()
+
+    def visible(self, height: int) -> List[str]:
+        with self._lock:
+            end = len(self.lines) - self.offset
+            return list(itertools.islice(self.lines, max(end - height, 0), end))
+
+
+def live_conversation(
+    base_url: str,
+    operator_token: str,
+    admin_token: str,
+    client: Dict,
+    history_log: Optional[str] = None,
+) -> None:
     """
     Stream messages in a scrolling pane while keeping the input prompt anchored
     to the bottom of the terminal. A background poller fetches new messages, and
     the curses UI ensures inbound traffic never interrupts the operator's input.
     """
 
-    message_lines: List[str] = []
-    cursor = None
+    log = open_history_log(history_log)
+    scrollback = Scrollback(log=log)
     stop_event = threading.Event()
-    lock = threading.Lock()
     console_lock = threading.Lock()
 
     def append_message(line: str) -> None:
-        with lock:
-            message_lines.append(line)
+        scrollback.append(line)
         if not HAS_CURSES:
             with console_lock:
                 print(line, flush=True)
 
-    def poll_loop() -> None:
-        nonlocal cursor
-        delay = 1
-        while not stop_event.is_set():
-            try:
-                messages = stream_client_messages(base_url, operator_token, client.get("id", ""), cursor)
-                if messages:
-                    for message in messages:
-                        cursor = message.get("id")
-                        append_message(render_message_line(message))
-                    delay = 1
-                else:
-                    delay = min(delay + 1, 5)
-            except requests.HTTPError as exc:
-                detail = exc.response.text if exc.response else str(exc)
-                append_message(f"Failed to read messages: {detail}")
-                delay = min(delay + 1, 10)
-            except requests.RequestException as exc:
-                append_message(f"Failed to read messages: {exc}")
-                delay = min(delay + 1, 10)
+    def append_messages(messages: List[Dict]) -> None:
+        for message in messages:
+            append_message(render_message_line(message))
 
-            stop_event.wait(delay)
+    def poll_loop() -> None:
+        feed = MessageFeed(base_url, operator_token, [client.get("id", "")])
+        follow_feed(feed, append_messages, append_message, stop_event)
 
     def run_curses(screen: "curses._CursesWindow") -> None:
         curses.curs_set(1)
@@ -182,12 +461,12 @@ def live_conversation(base_url: str, operator_token: str, admin_token: str, clie
 
         def redraw() -> None:
             nonlocal msg_win, input_win
+            scrollback.changed.clear()
             height, width = screen.getmaxyx()
             screen.erase()
             msg_win, input_win = get_windows()
 
-            with lock:
-                visible_lines = message_lines[-(height - 3):]
+            visible_lines = scrollback.visible(height - 3)
             msg_win.erase()
             for idx, line in enumerate(visible_lines):
                 msg_win.addnstr(idx, 0, line, width - 1)
@@ -203,7 +482,11 @@ def live_conversation(base_url: str, operator_token: str, admin_token: str, clie
 
             input_win.erase()
             input_win.addnstr(0, 0, prompt + input_buffer, width - 1)
-            input_win.addnstr(1, 0, "Press Enter to submit. Messages appear above.", width - 1)
+            if scrollback.offset:
+                hint = f"Scrolled up {scrollback.offset} lines. PgDn or End to return to the latest."
+            else:
+                hint = "Press Enter to submit. Messages appear above. PgUp/PgDn to scroll."
+            input_win.addnstr(1, 0, hint, width - 1)
             input_win.move(0, min(len(prompt + input_buffer), width - 1))
             input_win.noutrefresh()
             curses.doupdate()
@@ -213,7 +496,9 @@ def live_conversation(base_url: str, operator_token: str, admin_token: str, clie
         while not stop_event.is_set():
             ch = screen.getch()
             if ch == -1:
-                redraw()
+                # Repaint only when messages arrived since the last frame.
+                if scrollback.changed.is_set():
+                    redraw()
                 continue
 
             if ch in {curses.KEY_ENTER, 10, 13}:
@@ -258,8 +543,15 @@ def live_conversation(base_url: str, operator_token: str, admin_token: str, clie
                 redraw()
                 continue
 
+            page = max(screen.getmaxyx()[0] - 4, 1)
             if ch in {curses.KEY_BACKSPACE, 127, 8}:
                 input_buffer = input_buffer[:-1]
+            elif ch == curses.KEY_PPAGE:
+                scrollback.scroll(page, page + 1)
+            elif ch == curses.KEY_NPAGE:
+                scrollback.scroll(-page, page + 1)
+            elif ch == curses.KEY_END:
+                scrollback.scroll(-scrollback.offset, page + 1)
             elif ch == curses.KEY_RESIZE:
                 redraw()
                 continue
@@ -316,28 +608,556 @@ def live_conversation(base_url: str, operator_token: str, admin_token: str, clie
     finally:
         stop_event.set()
         poll_thread.join(timeout=5)
+        if log is not None:
+            log.close()
+
+
+class WatchView:
+    """Routes feed messages to bounded per-client line buffers, applying the type and text filters.
+
+    The first ``MAX_PANES`` clients get a buffer each; later ones share the
+    :data:`OTHER` buffer, so memory stays bounded even when following every
+    client. ``changed`` is set when a message is shown, so the panes repaint
+    only then. With ``store=False`` (the plain stream) nothing is buffered.
+    """
+
+    MAX_PANES = 32
+    OTHER = "*"
+
+    def __init__(
+        self,
+        client_ids: List[str],
+        labels: Dict[str, str],
+        types: List[str],
+        grep: Optional[str],
+        log: Optional[TextIO] = None,
+        store: bool = True,
+    ) -> None:
+        self.wanted = set(client_ids)
+        self.labels = labels
+        self.types = set(types)
+        self.grep = grep.lower() if grep else None
+        self.order: List[str] = list(client_ids[: self.MAX_PANES])
+        self.lines: Dict[str, Deque[Tuple[int, str]]] = {}
+        self.log = log
+        self.store = store
+        self.changed = threading.Event()
+        self.lock = threading.Lock()
+
+    def label(self, client_id: str) -> str:
+        if client_id == self.OTHER:
+            return "other clients"
+        return self.labels.get(client_id) or client_id[:8]
+
+    def accept(self, message: Dict) -> Optional[str]:
+        """Return the rendered line for ``message``, or ``None`` when the filters drop it."""
+
+        if self.wanted and message.get("to_client_id") not in self.wanted:
+            return None
+        if self.types and message.get("type") not in self.types:
+            return None
+        line = render_message_line(message)
+        if self.grep and self.grep not in line.lower():
+            return None
+        return line
+
+    def add(self, messages: List[Dict]) -> List[Tuple[Dict, str]]:
+        shown = []
+        with self.lock:
+            for message in messages:
+                line = self.accept(message)
+                if line is None:
+                    continue
+                client_id = message.get("to_client_id") or ""
+                if self.log is not None:
+                    self.log.write(f"{self.label(client_id)}: {line}\n")
+                shown.append((message, line))
+                if self.store:
+                    self._keep(client_id, int(message.get("id") or 0), line[:MAX_LINE_CHARS])
+        if shown:
+            self.changed.set()
+        return shown
+
+    def _keep(self, client_id: str, message_id: int, line: str) -> None:
+        if client_id not in self.lines:
+            if client_id not in self.order and len(self.order) >= self.MAX_PANES:
+                line = f"{self.label(client_id)}: {line}"
+                client_id = self.OTHER
+            if client_id not in self.order:
+                self.order.append(client_id)
+            self.lines.setdefault(client_id, deque(maxlen=PANE_SCROLLBACK))
+        self.lines[client_id].append((message_id, line))
+
+    def pane_lines(self, client_ids: List[str], count: int, prefixed: bool) -> List[str]:
+        """Last ``count`` lines for ``client_ids`` in message order, prefixed with the client when shared."""
+
+        with self.lock:
+            streams = [
+                [
+                    (message_id, f"{self.label(client_id)}: {line}" if prefixed and client_id != self.OTHER else line)
+                    for message_id, line in self.lines[client_id]
+                ]
+                for client_id in client_ids
+                if client_id in self.lines
+            ]
+        merged = list(heapq.merge(*streams))
+        return [line for _, line in merged[-count:]] if count > 0 else []
+
+
+def resolve_watch_targets(args: argparse.Namespace) -> Tuple[List[str], Dict[str, str]]:
+    """Client ids to watch (empty for all) and their display labels."""
+
+    client_ids = list(dict.fromkeys(args.client))
+    labels: Dict[str, str] = {}
+    if args.status or args.name:
+        directory = ClientDirectory(args.base_url, args.operator_token, status=args.status, name=args.name)
+        directory.refresh()
+        for client in directory.clients():
+            client_ids.append(client["id"])
+            labels[client["id"]] = client.get("name") or client["id"][:8]
+        client_ids = list(dict.fromkeys(client_ids))
+        if not client_ids:
+            raise SystemExit("No clients match the --status/--name filter.")
+    return client_ids, labels
+
+
+def watch(args: argparse.Namespace) -> None:
+    """Follow the message feed for the selected clients until interrupted."""
+
+    client_ids, labels = resolve_watch_targets(args)
+    log = open_history_log(args.history_log)
+    view = WatchView(client_ids, labels, args.types, args.grep, log, store=args.panes and HAS_CURSES)
+    # Past the server's limit the whole feed is fetched and the selection applied locally.
+    feed = MessageFeed(args.base_url, args.operator_token, client_ids if len(client_ids) <= FEED_MAX_CLIENTS else [])
+    stop_event = threading.Event()
+
+    try:
+        if args.panes and HAS_CURSES:
+            watch_panes(feed, view, stop_event)
+        else:
+            if args.panes:
+                print("Curses is not available on this platform. Showing a single stream.\n")
+            watch_stream(args, feed, view, stop_event, len(client_ids))
+    finally:
+        if log is not None:
+            log.close()
+
+
+def watch_stream(
+    args: argparse.Namespace, feed: MessageFeed, view: WatchView, stop_event: threading.Event, watched: int
+) -> None:
+
+    def print_messages(messages: List[Dict]) -> None:
+        for message, line in view.add(messages):
+            if args.json:
+                print(json.dumps(message), flush=True)
+            else:
+                print(f"{view.label(message.get('to_client_id') or ''):<12} {line}", flush=True)
+
+    def print_error(text: str) -> None:
+        print(text, flush=True)
+
+    target = f"{watched} clients" if watched else "all clients"
+    if not args.json:
+        print(f"Watching {target}. Press Ctrl+C to stop.\n")
+    try:
+        follow_feed(feed, print_messages, print_error, stop_event)
+    except KeyboardInterrupt:
+        stop_event.set()
+
+
+def watch_panes(feed: MessageFeed, view: WatchView, stop_event: threading.Event) -> None:
+    """Show one bordered pane per client; clients beyond what fits share the last pane."""
+
+    status = {"text": ""}
+
+    def on_messages(messages: List[Dict]) -> None:
+        view.add(messages)
+        if status["text"]:
+            status["text"] = ""
+            view.changed.set()
+
+    def on_error(text: str) -> None:
+        status["text"] = text
+        view.changed.set()
+
+    def run(screen: "curses._CursesWindow") -> None:
+        curses.curs_set(0)
+        screen.timeout(200)
+
+        def redraw() -> None:
+            view.changed.clear()
+            height, width = screen.getmaxyx()
+            screen.erase()
+            columns = 2 if width >= 120 else 1
+            rows = max(1, (height - 1) // 6)
+            with view.lock:
+                order = list(view.order)
+            capacity = max(1, rows * columns)
+            if len(order) <= capacity:
+                groups = [[client_id] for client_id in order]
+            else:
+                groups = [[client_id] for client_id in order[: capacity - 1]] + [order[capacity - 1 :]]
+            rows = max(1, -(-len(groups) // columns))
+            pane_height = max(3, (height - 1) // rows)
+            pane_width = width // columns
+
+            for index, group in enumerate(groups):
+                top = (index // columns) * pane_height
+                left = (index % columns) * pane_width
+                if top + pane_height > height - 1:
+                    break
+                pane = screen.derwin(pane_height, pane_width, top, left)
+                pane.box()
+                title = view.label(group[0]) if len(group) == 1 else "other clients"
+                pane.addnstr(0, 2, f" {title} ", pane_width - 4)
+                for row, line in enumerate(view.pane_lines(group, pane_height - 2, prefixed=len(group) > 1), start=1):
+                    pane.addnstr(row, 1, line, pane_width - 2)
+                pane.noutrefresh()
+
+            footer = status["text"] or ("Waiting for messages..." if not groups else "")
+            screen.addnstr(height - 1, 0, f"q to quit. {footer}", width - 1)
+            screen.noutrefresh()
+            curses.doupdate()
+
+        redraw()
+        while not stop_event.is_set():
+            ch = screen.getch()
+            if ch in {ord("q"), ord("Q")}:
+                stop_event.set()
+            elif ch == curses.KEY_RESIZE or view.changed.is_set():
+                redraw()
+
+    poll_thread = threading.Thread(target=follow_feed, args=(feed, on_messages, on_error, stop_event), daemon=True)
+    poll_thread.start()
+    try:
+        curses.wrapper(run)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        poll_thread.join(timeout=5)
+
+
+def iter_target_ids(args: argparse.Namespace) -> Iterator[str]:
+    """Yield the ids selected for a broadcast without holding the whole selection in memory."""
+
+    if args.ids_file:
+        handle = sys.stdin if args.ids_file == "-" else open(args.ids_file, encoding="utf-8")
+        try:
+            for line in handle:
+                client_id = line.strip()
+                if client_id and not client_id.startswith("#"):
+                    yield client_id
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+        return
+
+    # The pattern's literal start narrows the listing on the server; the glob is applied here.
+    prefix = args.name or (re.split(r"[*?\[]", args.pattern, maxsplit=1)[0] if args.pattern else None) or None
+    for body in iter_client_pages(args.base_url, args.operator_token, status=args.status, name=prefix):
+        for client in body.get("clients", []):
+            if args.pattern and not fnmatch.fnmatchcase(client.get("name") or "", args.pattern):
+                continue
+            yield client["id"]
+
+
+def iter_batches(items: Iterator[str], size: int) -> Iterator[List[str]]:
+    batch: List[str] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BatchOutcomeUnknown(Exception):
+    """A publish request failed after it may have reached the server, so it was not resent."""
+
+
+def retry_after_seconds(response: Optional[requests.Response]) -> Optional[float]:
+    value = response.headers.get("Retry-After", "").strip() if response is not None else ""
+    return float(value) if value.isdigit() else None
+
+
+def connect_failed(exc: requests.ConnectionError) -> bool:
+    """True when ``exc`` happened while opening the connection, before the request was sent."""
 
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = exc.args[0] if exc.args else None
+    return isinstance(getattr(reason, "reason", reason), NewConnectionError)
 
-def interactive_loop(base_url: str, operator_token: str, admin_token: str) -> None:
+
+def publish_with_retry(
+    session: requests.Session,
+    base_url: str,
+    admin_token: str,
+    client_ids: List[str],
+    msg_type: str,
+    payload: Dict,
+    attempts: int = 3,
+) -> int:
+    """Publish one batch and return how many recipients were queued.
+
+    Publishing is not idempotent, so a batch is only resent when the server
+    cannot have queued it: the connection could not be opened, or the answer
+    was 429/503 with a ``Retry-After``. A timeout, dropped connection or other
+    5xx after the request went out raises :class:`BatchOutcomeUnknown` instead
+    of risking a second copy; other 4xx answers raise ``HTTPError``.
+    """
+
+    for attempt in range(attempts):
+        last = attempt == attempts - 1
+        try:
+            body = publish_batch(base_url, admin_token, client_ids, msg_type, payload, session=session)
+            return int(body.get("queued", len(client_ids)))
+        except requests.HTTPError as exc:
+            response = exc.response
+            status = response.status_code if response is not None else None
+            delay = retry_after_seconds(response) if status in (429, 503) else None
+            if delay is not None:
+                if last:
+                    raise
+                time.sleep(min(delay, BROADCAST_MAX_RETRY_AFTER))
+                continue
+            if status is not None and status >= 500:
+                raise BatchOutcomeUnknown(f"HTTP {status}: {response.text.strip()}") from exc
+            raise
+        except requests.exceptions.JSONDecodeError:
+            # The server accepted the batch; only the summary was unreadable.
+            return len(client_ids)
+        except requests.ConnectionError as exc:
+            if not connect_failed(exc):
+                raise BatchOutcomeUnknown(str(exc)) from exc
+            if last:
+                raise
+        except requests.RequestException as exc:
+            raise BatchOutcomeUnknown(str(exc)) from exc
+        time.sleep(2**attempt)
+    return 0
+
+
+def broadcast(args: argparse.Namespace) -> bool:
+    """Publish ``args.payload`` to the selected clients; returns whether every batch was known to be queued.
+
+    Batches of ``--batch-size`` ids are sent ``--concurrency`` at a time over one
+    pooled session. Ids are read lazily, with at most two batches per worker
+    waiting, so a selection of any size runs in constant memory.
+    """
+
+    if not (args.ids_file or args.status or args.name or args.pattern or args.all):
+        raise SystemExit("Select clients with --status, --name, --pattern or --ids-file, or pass --all.")
+    if args.ids_file and (args.status or args.name):
+        # The file is the whole selection; a filter next to it would be silently ignored.
+        raise SystemExit("--ids-file cannot be combined with --status or --name.")
+    if args.batch_size < 1 or args.concurrency < 1:
+        raise SystemExit("--batch-size and --concurrency must be at least 1.")
+
+    payload = parse_payload(args.payload)
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=args.concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    started = time.monotonic()
+    totals = {"targets": 0, "queued": 0, "failed": 0, "unknown": 0}
+    interactive = sys.stderr.isatty() and not args.json
+    # Errors start on a fresh line when a progress line is being redrawn in place.
+    newline = "\n" if interactive else ""
+
+    def report(final: bool = False) -> None:
+        if args.json or not (interactive or final):
+            return
+        elapsed = max(time.monotonic() - started, 0.001)
+        line = (
+            f"Selected {totals['targets']}, queued {totals['queued']} ({totals['queued'] / elapsed:.0f}/s), "
+            f"failed {totals['failed']}, unknown {totals['unknown']}"
+        )
+        print(("\r" if interactive else "") + line, end="\n" if final else "", file=sys.stderr, flush=True)
+
+    def collect(done: "set[Future]", batches: Dict[Future, List[str]]) -> None:
+        for future in done:
+            batch = batches.pop(future)
+            size = len(batch)
+            try:
+                totals["queued"] += future.result()
+            except BatchOutcomeUnknown as exc:
+                totals["unknown"] += size
+                print(f"{newline}Outcome unknown for a batch of {size}, not resent: {exc}", file=sys.stderr)
+                if args.unknown_ids:
+                    with open(args.unknown_ids, "a", encoding="utf-8") as handle:
+                        handle.writelines(f"{client_id}\n" for client_id in batch)
+            except requests.HTTPError as exc:
+                detail = exc.response.text.strip() if exc.response is not None else str(exc)
+                totals["failed"] += size
+                print(f"{newline}Failed to queue a batch of {size}: {detail}", file=sys.stderr)
+            except requests.RequestException as exc:
+                totals["failed"] += size
+                print(f"{newline}Failed to queue a batch of {size}: {exc}", file=sys.stderr)
+        report()
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        batches: Dict[Future, List[str]] = {}
+        for batch in iter_batches(iter_target_ids(args), args.batch_size):
+            totals["targets"] += len(batch)
+            if args.dry_run:
+                continue
+            if len(batches) >= args.concurrency * 2:
+                done, _ = wait(list(batches), return_when=FIRST_COMPLETED)
+                collect(done, batches)
+            future = pool.submit(
+                publish_with_retry, session, args.base_url, args.admin_token, batch, args.msg_type, payload
+            )
+            batches[future] = batch
+        if batches:
+            done, _ = wait(list(batches))
+            collect(done, batches)
+
+    elapsed = time.monotonic() - started
+    if args.json:
+        print(json.dumps({**totals, "seconds": round(elapsed, 3), "dry_run": args.dry_run}))
+    elif args.dry_run:
+        print(f"{totals['targets']} clients selected; nothing sent (--dry-run).")
+    else:
+        report(final=True)
+    return totals["failed"] == 0 and totals["unknown"] == 0
+
+
+def fetch_stats(base_url: str, token: str, top: int = 10) -> Dict:
+    response = requests.get(
+        f"{base_url.rstrip('/')}/api/v1/operators/stats",
+        headers={"X-Operator-Token": token},
+        params={"top": top},
+        timeout=15,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def format_age(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{seconds / size:.0f}{unit}"
+    return f"{seconds:.0f}s"
+
+
+def render_stats(body: Dict) -> List[str]:
+    clients = body.get("clients", {})
+    backlog = body.get("backlog", {})
+    lines = [
+        f"Fleet at {body.get('server_time')} (online window {body.get('online_window')}s, cached up to {body.get('cache_ttl')}s)",
+        "",
+        f"Clients  total {clients.get('total', 0)}  online {clients.get('online', 0)}  "
+        f"offline {clients.get('offline', 0)}  never seen {clients.get('never_seen', 0)}",
+        "",
+        "Last seen",
+    ]
+    buckets = body.get("last_seen_age", [])
+    widest = max([bucket.get("count", 0) for bucket in buckets] + [1])
+    lower = 0
+    for bucket in buckets:
+        upper = bucket.get("max_seconds")
+        label = f"{format_age(lower)}-{format_age(upper)}" if upper is not None else f">{format_age(lower)}"
+        bar = "#" * round(40 * bucket.get("count", 0) / widest)
+        lines.append(f"  {label:>9} {bucket.get('count', 0):>8}  {bar}")
+        lower = upper or lower
+    lines += [
+        "",
+        f"Backlog  {backlog.get('clients', 0)} clients behind, up to {backlog.get('messages', 0)} messages "
+        f"(max {backlog.get('max_depth', 0)}), oldest unacked {format_age(backlog.get('oldest_unacked_age_seconds'))} ago",
+    ]
+    deepest = backlog.get("deepest", [])
+    if deepest:
+        lines.append(f"  {'Depth':>8}  {'Client ID':36}  Name")
+        for row in deepest:
+            lines.append(f"  {row.get('depth', 0):>8}  {row.get('client_id', ''):36}  {row.get('name') or '-'}")
+    return lines
+
+
+def show_stats(args: argparse.Namespace) -> None:
+    """Print fleet statistics, redrawing every ``--interval`` seconds until interrupted."""
+
+    live = not (args.once or args.json) and sys.stdout.isatty()
+    try:
+        while True:
+            try:
+                body = fetch_stats(args.base_url, args.operator_token, args.top)
+                output = json.dumps(body, indent=2) if args.json else "\n".join(render_stats(body))
+            except requests.HTTPError as exc:
+                output = f"Failed to read stats: {exc.response.text if exc.response is not None else exc}"
+            except requests.RequestException as exc:
+                output = f"Failed to read stats: {exc}"
+            if live:
+                # Home the cursor and clear, so the view is redrawn in place.
+                print("\033[H\033[2J" + output + f"\n\nRefreshing every {args.interval:g}s. Press Ctrl+C to stop.", flush=True)
+            else:
+                print(output, flush=True)
+            if args.once or args.json:
+                return
+            time.sleep(max(args.interval, 1.0))
+    except KeyboardInterrupt:
+        pass
+
+
+def interactive_loop(
+    base_url: str,
+    operator_token: str,
+    admin_token: str,
+    status: Optional[str] = None,
+    name: Optional[str] = None,
+    history_log: Optional[str] = None,
+) -> None:
+    directory = ClientDirectory(base_url, operator_token, status=status, name=name)
+    directory.refresh()
+    page = 0
     while True:
-        clients = fetch_clients(base_url, operator_token)
-        print_table(clients)
+        clients = directory.clients()
+        pages = max(1, -(-len(clients) // DISPLAY_PAGE_SIZE))
+        page = min(page, pages - 1)
+        start = page * DISPLAY_PAGE_SIZE
+        print_table(clients[start : start + DISPLAY_PAGE_SIZE], start=start, total=len(clients))
 
         if not clients:
             choice = input("No clients found. Press Enter to refresh or 'q' to quit: ").strip().lower()
             if choice in {"q", "quit"}:
                 return
+            directory.refresh()
             continue
 
-        selection = input("Select a client number to send a message, 'r' to refresh, or 'q' to quit: ").strip().lower()
+        selection = input(
+            "Select a client number, 'n'/'p' for next/previous page, 'f' to filter, 'r' to refresh, or 'q' to quit: "
+        ).strip().lower()
 
         if selection in {"q", "quit"}:
             return
         if selection in {"r", "refresh", ""}:
+            updated = directory.refresh()
+            print(f"{updated} clients changed since the last refresh.\n")
+            continue
+        if selection in {"n", "next"}:
+            page = min(page + 1, pages - 1)
+            continue
+        if selection in {"p", "prev", "previous"}:
+            page = max(page - 1, 0)
+            continue
+        if selection in {"f", "filter"}:
+            status = input("Status [online/offline/any]: ").strip().lower() or None
+            name = input("Name prefix (blank for any): ").strip() or None
+            directory = ClientDirectory(
+                base_url, operator_token, status=status if status in {"online", "offline"} else None, name=name
+            )
+            directory.refresh()
+            page = 0
             continue
 
         if not selection.isdigit():
-            print("Invalid selection. Enter a client number, 'r' to refresh, or 'q' to quit.\n")
+            print("Invalid selection. Enter a client number, 'n', 'p', 'f', 'r' or 'q'.\n")
             continue
 
         index = int(selection) - 1
@@ -347,7 +1167,7 @@ def interactive_loop(base_url: str, operator_token: str, admin_token: str) -> No
 
         client = clients[index]
         print(f"\nSelected client: {client.get('name') or '-'} ({client.get('id')})")
-        live_conversation(base_url, operator_token, admin_token, client)
+        live_conversation(base_url, operator_token, admin_token, client, history_log=history_log)
 
 
 def main() -> None:
@@ -358,11 +1178,27 @@ def main() -> None:
     if not args.admin_token:
         raise SystemExit("Missing admin token. Provide --admin-token or set ADMIN_TOKEN.")
 
-    if args.json:
-        clients = fetch_clients(args.base_url, args.operator_token)
+    if args.command == "watch":
+        watch(args)
+    elif args.command == "stats":
+        show_stats(args)
+    elif args.command == "broadcast":
+        if not broadcast(args):
+            raise SystemExit(1)
+    elif args.json:
+        clients = []
+        for body in iter_client_pages(args.base_url, args.operator_token, status=args.status, name=args.name):
+            clients.extend(body.get("clients", []))
         print(json.dumps(clients, indent=2))
     else:
-        interactive_loop(args.base_url, args.operator_token, args.admin_token)
+        interactive_loop(
+            args.base_url,
+            args.operator_token,
+            args.admin_token,
+            status=args.status,
+            name=args.name,
+            history_log=args.history_log,
+        )
 
 
 if __name__ == "__main__":
@@ -3,21 +3,22 @@
 namespace App\Http\Controllers;
 
 use App\Models\MessageReceipt;
+use App\Services\MessageNotifier;
 use Illuminate\Http\Request;
 
 class AckMessagesController extends Controller
 {
-    public function __invoke(Request $request)
+    public function __invoke(Request $request, MessageNotifier $notifier)
     {
         $client = $request->attributes->get('client');
         $validated = $request->validate([
             'last_received_id' => ['required', 'integer', 'min:1'],
         ]);
 
-        MessageReceipt::updateOrCreate(
-            ['client_id' => $client->id],
-            ['last_acked_message_id' => $validated['last_received_id']]
-        );
+        MessageReceipt::acknowledge($client->id, (int) $validated['last_received_id']);
+
+        // An explicit ack may move the receipt backwards, so the cursor-less idle mark is stale.
+        $notifier->forgetIdle($client->id);
 
         return response()->json(['status' => 'acked']);
     }
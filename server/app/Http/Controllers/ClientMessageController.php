@@ -4,14 +4,21 @@ namespace App\Http\Controllers;
 
 use App\Jobs\MessageFanoutJob;
 use App\Models\Message;
+use App\Models\MessageReceipt;
+use App\Services\ClientKeyProvider;
 use App\Services\EncryptionService;
+use App\Services\MessageNotifier;
+use Carbon\CarbonInterface;
+use Illuminate\Contracts\Encryption\DecryptException;
+use Illuminate\Database\QueryException;
 use Illuminate\Http\Request;
-use Illuminate\Support\Facades\Crypt;
 use Illuminate\Support\Facades\Date;
+use Illuminate\Support\Facades\DB;
+use Illuminate\Validation\Rule;
 
 class ClientMessageController extends Controller
 {
-    public function send(Request $request, EncryptionService $encryption)
+    public function send(Request $request, EncryptionService $encryption, MessageNotifier $notifier, ClientKeyProvider $keys)
     {
         $client = $request->attributes->get('client');
         $validated = $request->validate([
@@ -19,32 +26,110 @@ class ClientMessageController extends Controller
             'nonce' => ['required', 'string'],
             'tag' => ['required', 'string'],
             'aad' => ['sometimes', 'array'],
+            'encoding' => ['sometimes', 'nullable', Rule::in([EncryptionService::ENCODING_ZLIB])],
         ]);
 
-        $key = Crypt::decryptString($client->encryption_key_encrypted);
-        $aad = $validated['aad'] ?? [];
-        $payload = $encryption->decrypt($key, $validated['ciphertext'], $validated['nonce'], $validated['tag'], $aad);
+        $key = $keys->forClient($client);
+        $timestamp = Date::now();
+        [$payload, $row] = $this->reseal($encryption, $key, $client->id, $validated, $timestamp);
+
+        Message::create($row);
+        $notifier->notify([$client->id]);
+        $this->dispatchFanout($client->id, $payload);
+
+        return response()->json(['status' => 'accepted']);
+    }
 
+    /**
+     * Accept several client envelopes in one request and store them with one
+     * multi-row INSERT. The batch is all-or-nothing: if any envelope fails to
+     * decrypt nothing is stored and the index of the bad envelope is returned.
+     */
+    public function sendBatch(Request $request, EncryptionService $encryption, MessageNotifier $notifier, ClientKeyProvider $keys)
+    {
+        $client = $request->attributes->get('client');
+        $validated = $request->validate([
+            'messages' => ['required', 'array', 'min:1', 'max:'.(int) config('messaging.send_batch_max', 100)],
+            'messages.*.ciphertext' => ['required', 'string'],
+            'messages.*.nonce' => ['required', 'string'],
+            'messages.*.tag' => ['required', 'string'],
+            'messages.*.aad' => ['sometimes', 'array'],
+            'messages.*.encoding' => ['sometimes', 'nullable', Rule::in([EncryptionService::ENCODING_ZLIB])],
+        ]);
+
+        $key = $keys->forClient($client);
         $timestamp = Date::now();
+        $payloads = [];
+        $rows = [];
+
+        foreach ($validated['messages'] as $index => $envelope) {
+            try {
+                [$payloads[], $rows[]] = $this->reseal($encryption, $key, $client->id, $envelope, $timestamp);
+            } catch (DecryptException $e) {
+                return response()->json(['error' => 'Unable to decrypt message', 'index' => $index], 422);
+            }
+        }
+
+        // Bulk inserts bypass Eloquent casts, so store the timestamp the way create() would.
+        $createdAt = (new Message())->fromDateTime($timestamp);
+        foreach ($rows as &$row) {
+            $row['created_at'] = $createdAt;
+        }
+        unset($row);
+
+        try {
+            DB::transaction(function () use ($rows, $client) {
+                Message::insert($rows);
+                MessageReceipt::recordDelivered([$client->id]);
+            });
+        } catch (QueryException $e) {
+            if ($response = $this->databaseUnavailableResponse($e)) {
+                return $response;
+            }
+
+            throw $e;
+        }
+
+        $notifier->notify([$client->id]);
+        foreach ($payloads as $payload) {
+            $this->dispatchFanout($client->id, $payload);
+        }
+
+        return response()->json(['status' => 'accepted', 'accepted' => count($rows)]);
+    }
+
+    /**
+     * Decrypt a client envelope and re-encrypt it at rest under the 'from' AAD,
+     * compressed if the server's policy asks for it.
+     */
+    private function reseal(EncryptionService $encryption, string $key, string $clientId, array $envelope, CarbonInterface $timestamp): array
+    {
+        $payload = $encryption->decrypt(
+            $key, $envelope['ciphertext'], $envelope['nonce'], $envelope['tag'], $envelope['aad'] ?? [], $envelope['encoding'] ?? null
+        );
+        $type = $payload['type'] ?? 'client';
+
         $store = $encryption->encrypt($key, $payload, [
-            'from' => $client->id,
+            'from' => $clientId,
             'ts' => $timestamp->toIso8601String(),
-        ]);
+        ], $type);
 
-        Message::create([
-            'from_client_id' => $client->id,
-            'to_client_id' => $client->id,
-            'type' => $payload['type'] ?? 'client',
+        return [$payload, [
+            'from_client_id' => $clientId,
+            'to_client_id' => $clientId,
+            'type' => $type,
             'ciphertext' => $store['ciphertext'],
             'nonce' => $store['nonce'],
             'tag' => $store['tag'],
+            'encoding' => $store['encoding'],
             'created_at' => $timestamp,
-        ]);
+        ]];
+    }
 
+    private function dispatchFanout(string $clientId, array $payload): void
+    {
         if (isset($payload['to_client_ids']) && is_array($payload['to_client_ids'])) {
-            MessageFanoutJob::dispatch($payload['to_client_ids'], $client->id, $payload['type'] ?? 'client', $payload['payload'] ?? []);
+            MessageFanoutJob::dispatch($payload['to_client_ids'], $clientId, $payload['type'] ?? 'client', $payload['payload'] ?? []);
         }
-
-        return response()->json(['status' => 'accepted']);
     }
 }
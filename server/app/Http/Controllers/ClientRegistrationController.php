@@ -3,6 +3,7 @@
 namespace App\Http\Controllers;
 
 use App\Models\Client;
+use App\Services\ClientKeyProvider;
 use Illuminate\Database\QueryException;
 use Illuminate\Contracts\Encryption\DecryptException;
 use Illuminate\Http\Request;
@@ -11,6 +12,10 @@ use Illuminate\Support\Facades\Hash;
 
 class ClientRegistrationController extends Controller
 {
+    public function __construct(private ClientKeyProvider $keys)
+    {
+    }
+
     public function __invoke(Request $request)
     {
         $validated = $request->validate([
@@ -78,7 +83,7 @@ class ClientRegistrationController extends Controller
 
                 return response()->json([
                     'client_id' => $client->id,
-                    'personal_token' => Crypt::decryptString($client->encryption_key_encrypted),
+                    'personal_token' => $this->keys->forClient($client),
                     'api_token' => Crypt::decryptString($client->api_token_encrypted),
                 ]);
             } catch (DecryptException $e) {
@@ -96,6 +101,7 @@ class ClientRegistrationController extends Controller
             'api_token_encrypted' => Crypt::encryptString($apiToken),
             'encryption_key_encrypted' => Crypt::encryptString($personalToken),
         ]);
+        $this->keys->forget($client->id);
 
         return response()->json([
             'client_id' => $client->id,
@@ -19,7 +19,7 @@ class Controller extends BaseController
         if ($this->isDatabaseConnectionException($exception)) {
             return response()->json([
                 'message' => 'Database connection failed. Start the configured database service or switch to the default sqlite driver (DB_CONNECTION=sqlite) and run migrations.',
-            ], 503);
+            ], 503, ['Retry-After' => 30]);
         }
 
         return null;
@@ -0,0 +1,43 @@
+<?php
+
+namespace App\Http\Controllers;
+
+use App\Models\Message;
+use App\Models\MessageReceipt;
+use App\Services\MessageNotifier;
+use Illuminate\Database\QueryException;
+use Illuminate\Http\Request;
+
+class FastForwardMessagesController extends Controller
+{
+    /**
+     * Acknowledge everything currently queued for the client in one step, for
+     * clients that deliberately skip their backlog instead of paging through it.
+     */
+    public function __invoke(Request $request, MessageNotifier $notifier)
+    {
+        $client = $request->attributes->get('client');
+
+        try {
+            // Served from the (to_client_id, id) index without scanning the backlog.
+            $latest = Message::query()->where('to_client_id', $client->id)->max('id');
+
+            if ($latest !== null) {
+                MessageReceipt::advance($client->id, (int) $latest);
+            }
+        } catch (QueryException $e) {
+            if ($response = $this->databaseUnavailableResponse($e)) {
+                return $response;
+            }
+
+            throw $e;
+        }
+
+        $notifier->forgetIdle($client->id);
+
+        return response()->json([
+            'status' => 'acked',
+            'last_acked_message_id' => $latest !== null ? (int) $latest : null,
+        ]);
+    }
+}
@@ -4,17 +4,14 @@ namespace App\Http\Controllers;
 
 use App\Models\Client;
 use App\Models\Message;
-use App\Services\EncryptionService;
-use Illuminate\Contracts\Encryption\DecryptException;
+use App\Services\OperatorMessagePresenter;
 use Illuminate\Database\QueryException;
 use Illuminate\Http\Request;
-use Illuminate\Support\Carbon;
-use Illuminate\Support\Facades\Crypt;
 use Symfony\Component\HttpKernel\Exception\NotFoundHttpException;
 
 class OperatorClientMessagesController extends Controller
 {
-    public function index(string $clientId, Request $request, EncryptionService $encryption)
+    public function index(string $clientId, Request $request, OperatorMessagePresenter $presenter)
     {
         $cursor = $request->query('cursor');
         $client = Client::find($clientId);
@@ -46,48 +43,7 @@ class OperatorClientMessagesController extends Controller
             return response()->noContent();
         }
 
-        $key = Crypt::decryptString($client->encryption_key_encrypted);
-
-        $payload = $messages->map(function (Message $message) use ($encryption, $key) {
-            $createdAt = $message->created_at;
-
-            if ($createdAt instanceof Carbon) {
-                $createdAt = $createdAt->toIso8601String();
-            } elseif (!is_null($createdAt)) {
-                $createdAt = Carbon::parse($createdAt)->toIso8601String();
-            }
-
-            if ($message->from_client_id === $message->to_client_id) {
-                // Client-originated (self-addressed) messages were encrypted with
-                // AAD ordering of ['from' => <client>, 'ts' => <iso-ts>]. Preserve
-                // that exact ordering to satisfy AES-GCM integrity checks.
-                $aad = [
-                    'from' => $message->from_client_id,
-                    'ts' => $createdAt,
-                ];
-            } else {
-                // Operator / server fanout messages used ['to' => <client>, 'ts' => <iso-ts>].
-                $aad = [
-                    'to' => $message->to_client_id,
-                    'ts' => $createdAt,
-                ];
-            }
-
-            try {
-                $body = $encryption->decrypt($key, $message->ciphertext, $message->nonce, $message->tag, $aad);
-            } catch (DecryptException $e) {
-                $body = ['error' => 'Unable to decrypt message'];
-            }
-
-            return [
-                'id' => $message->id,
-                'type' => $message->type,
-                'from_client_id' => $message->from_client_id,
-                'to_client_id' => $message->to_client_id,
-                'created_at' => $createdAt,
-                'payload' => $body,
-            ];
-        });
+        $payload = $presenter->present($messages, [$client->id => $client]);
 
         return response()->json(['messages' => $payload]);
     }
@@ -3,29 +3,126 @@
 namespace App\Http\Controllers;
 
 use App\Models\Client;
+use App\Services\LastSeenBuffer;
+use Illuminate\Database\Eloquent\Builder;
+use Illuminate\Database\QueryException;
+use Illuminate\Http\Request;
 use Illuminate\Support\Facades\Date;
+use Illuminate\Validation\ValidationException;
 
 class OperatorClientsController extends Controller
 {
-    public function index()
+    /**
+     * Heartbeats recorded between the flush and the query are written later with
+     * a slightly older last_seen_at, so delta tokens reach back this far.
+     */
+    private const SINCE_OVERLAP_SECONDS = 5;
+
+    /**
+     * Keyset-paginated client listing, oldest registration first.
+     *
+     * Filters: `status` (online/offline, decided in SQL from last_seen_at), `name`
+     * (prefix), and `since` (only clients seen or registered after that time; pass
+     * the previous response's `next_since` to refresh incrementally). Pass
+     * `next_cursor` back as `cursor` for the following page.
+     */
+    public function index(Request $request, LastSeenBuffer $lastSeen)
     {
+        $validated = $request->validate([
+            'limit' => ['sometimes', 'integer', 'min:1'],
+            'cursor' => ['sometimes', 'string'],
+            'status' => ['sometimes', 'in:online,offline'],
+            'name' => ['sometimes', 'string', 'max:255'],
+            'since' => ['sometimes', 'date'],
+        ]);
+        $limit = min(
+            (int) ($validated['limit'] ?? config('messaging.operator_clients_page_size', 100)),
+            (int) config('messaging.operator_clients_max_page_size', 1000)
+        );
+        $after = isset($validated['cursor']) ? $this->decodeCursor($validated['cursor']) : null;
+
+        // Persist buffered heartbeats first so status never lags the write-behind schedule.
+        $lastSeen->flush();
+
         $now = Date::now();
-        $clients = Client::query()
+        $window = (int) config('messaging.online_window', 120);
+        $onlineSince = $now->clone()->subSeconds($window);
+
+        $query = Client::query()
+            ->select(['id', 'name', 'created_at', 'last_seen_at'])
+            ->selectRaw('CASE WHEN last_seen_at >= ? THEN 1 ELSE 0 END AS is_online', [$onlineSince])
             ->orderBy('created_at')
-            ->get()
-            ->map(function (Client $client) use ($now) {
-                $lastSeen = $client->last_seen_at;
-                $isOnline = $lastSeen !== null && $lastSeen->gte($now->clone()->subMinutes(2));
-
-                return [
-                    'id' => $client->id,
-                    'name' => $client->name,
-                    'created_at' => $client->created_at,
-                    'last_seen_at' => $lastSeen,
-                    'status' => $isOnline ? 'online' : 'offline',
-                ];
-            });
-
-        return response()->json(['clients' => $clients]);
+            ->orderBy('id')
+            // One extra row tells us whether another page exists.
+            ->limit($limit + 1);
+
+        if (($validated['status'] ?? null) === 'online') {
+            $query->where('last_seen_at', '>=', $onlineSince);
+        } elseif (($validated['status'] ?? null) === 'offline') {
+            $query->where(fn (Builder $q) => $q->whereNull('last_seen_at')->orWhere('last_seen_at', '<', $onlineSince));
+        }
+
+        if (isset($validated['name']) && $validated['name'] !== '') {
+            $query->where('name', 'like', addcslashes($validated['name'], '\\%_').'%');
+        }
+
+        if (isset($validated['since'])) {
+            $since = Date::parse($validated['since'])->setTimezone(config('app.timezone'));
+            $query->where(fn (Builder $q) => $q->where('last_seen_at', '>', $since)->orWhere('created_at', '>', $since));
+        }
+
+        if ($after !== null) {
+            [$createdAt, $id] = $after;
+            $query->where(fn (Builder $q) => $q
+                ->where('created_at', '>', $createdAt)
+                ->orWhere(fn (Builder $q) => $q->where('created_at', $createdAt)->where('id', '>', $id)));
+        }
+
+        try {
+            $clients = $query->get();
+        } catch (QueryException $e) {
+            if ($response = $this->databaseUnavailableResponse($e)) {
+                return $response;
+            }
+
+            throw $e;
+        }
+
+        $nextCursor = null;
+        if ($clients->count() > $limit) {
+            $clients = $clients->take($limit);
+            $last = $clients->last();
+            $nextCursor = $this->encodeCursor($last->getRawOriginal('created_at'), $last->id);
+        }
+
+        return response()->json([
+            'clients' => $clients->map(fn (Client $client) => [
+                'id' => $client->id,
+                'name' => $client->name,
+                'created_at' => $client->created_at,
+                'last_seen_at' => $client->last_seen_at,
+                'status' => $client->is_online ? 'online' : 'offline',
+            ])->values(),
+            'next_cursor' => $nextCursor,
+            'server_time' => $now->toIso8601String(),
+            'next_since' => $now->clone()->subSeconds(self::SINCE_OVERLAP_SECONDS)->toIso8601String(),
+            'online_window' => $window,
+        ]);
+    }
+
+    private function encodeCursor(string $createdAt, string $id): string
+    {
+        return rtrim(strtr(base64_encode(json_encode([$createdAt, $id])), '+/', '-_'), '=');
+    }
+
+    private function decodeCursor(string $cursor): array
+    {
+        $decoded = json_decode((string) base64_decode(strtr($cursor, '-_', '+/'), true), true);
+
+        if (!is_array($decoded) || count($decoded) !== 2 || !is_string($decoded[0]) || !is_string($decoded[1])) {
+            throw ValidationException::withMessages(['cursor' => 'The cursor is invalid.']);
+        }
+
+        return $decoded;
     }
 }
@@ -0,0 +1,90 @@
+<?php
+
+namespace App\Http\Controllers;
+
+use App\Models\Client;
+use App\Models\Message;
+use App\Services\OperatorMessagePresenter;
+use Illuminate\Database\QueryException;
+use Illuminate\Http\Request;
+
+class OperatorMessageFeedController extends Controller
+{
+    /**
+     * One message stream across every client, or across `client_ids` (an array
+     * or a comma-separated list), ordered by the global message id.
+     *
+     * With `cursor` the page holds the messages after that id, oldest first;
+     * pass `next_cursor` back and fetch again straight away while `has_more` is
+     * true. Without it the page is the latest `limit` messages, so a watcher
+     * starts at the tail instead of replaying history. Accepts POST as well so
+     * large id lists need not fit in a URL.
+     */
+    public function index(Request $request, OperatorMessagePresenter $presenter)
+    {
+        if (is_string($request->input('client_ids'))) {
+            $request->merge(['client_ids' => array_values(array_filter(explode(',', $request->input('client_ids')), 'strlen'))]);
+        }
+
+        $validated = $request->validate([
+            'cursor' => ['sometimes', 'integer', 'min:0'],
+            'limit' => ['sometimes', 'integer', 'min:1'],
+            'client_ids' => ['sometimes', 'array', 'max:'.(int) config('messaging.operator_feed_max_clients', 1000)],
+        ]);
+        $limit = min(
+            (int) ($validated['limit'] ?? config('messaging.operator_feed_page_size', 200)),
+            (int) config('messaging.operator_feed_max_page_size', 1000)
+        );
+        $clientIds = array_values(array_unique(array_filter($validated['client_ids'] ?? [], 'is_string')));
+        $cursor = $validated['cursor'] ?? null;
+
+        $query = Message::query()
+            ->select(['id', 'from_client_id', 'to_client_id', 'type', 'ciphertext', 'nonce', 'tag', 'encoding', 'created_at']);
+
+        if ($clientIds !== []) {
+            $query->whereIn('to_client_id', $clientIds);
+        }
+
+        if ($cursor !== null) {
+            // One extra row tells us whether another page exists.
+            $query->where('id', '>', (int) $cursor)->orderBy('id')->limit($limit + 1);
+        } else {
+            $query->orderByDesc('id')->limit($limit);
+        }
+
+        try {
+            $messages = $query->get();
+            $hasMore = false;
+
+            if ($cursor === null) {
+                $messages = $messages->reverse()->values();
+            } elseif ($messages->count() > $limit) {
+                $messages = $messages->take($limit);
+                $hasMore = true;
+            }
+
+            if ($messages->isEmpty()) {
+                return response()->noContent();
+            }
+
+            // Each recipient's key is loaded once per page, however many of its messages it holds.
+            $clients = Client::query()
+                ->whereIn('id', $messages->pluck('to_client_id')->unique()->values())
+                ->get(['id', 'encryption_key_encrypted'])
+                ->keyBy('id')
+                ->all();
+        } catch (QueryException $e) {
+            if ($response = $this->databaseUnavailableResponse($e)) {
+                return $response;
+            }
+
+            throw $e;
+        }
+
+        return response()->json([
+            'messages' => $presenter->present($messages, $clients),
+            'has_more' => $hasMore,
+            'next_cursor' => $messages->last()->id,
+        ]);
+    }
+}
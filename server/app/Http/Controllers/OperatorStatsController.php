@@ -0,0 +1,58 @@
+<?php
+
+namespace App\Http\Controllers;
+
+use App\Services\FleetStats;
+use App\Services\LastSeenBuffer;
+use Illuminate\Contracts\Cache\LockTimeoutException;
+use Illuminate\Database\QueryException;
+use Illuminate\Http\Request;
+use Illuminate\Support\Facades\Cache;
+
+class OperatorStatsController extends Controller
+{
+    /**
+     * Fleet aggregates: online/offline counts, a last-seen age histogram and
+     * backlog depth past each client's receipt, with the `top` deepest clients.
+     * Results are shared for `OPERATOR_STATS_TTL` seconds, and a cache lock lets
+     * only one request recompute them, so any number of dashboards costs at
+     * most one computation per TTL.
+     */
+    public function index(Request $request, FleetStats $stats, LastSeenBuffer $lastSeen)
+    {
+        $validated = $request->validate([
+            'top' => ['sometimes', 'integer', 'min:0', 'max:100'],
+        ]);
+        $top = (int) ($validated['top'] ?? 10);
+        $ttl = (int) config('messaging.operator_stats_ttl', 5);
+
+        $key = "operator_stats:$top";
+        $compute = function () use ($stats, $lastSeen, $top) {
+            // Persist buffered heartbeats first so the counts never lag the write-behind schedule.
+            $lastSeen->flush();
+
+            return $stats->compute($top);
+        };
+
+        try {
+            if ($ttl <= 0) {
+                $body = $compute();
+            } else {
+                // One caller recomputes an expired entry; the others wait for it and read its result.
+                $body = Cache::get($key) ?? Cache::lock("$key:lock", 30)->block(10, function () use ($key, $ttl, $compute) {
+                    return Cache::get($key) ?? tap($compute(), fn (array $body) => Cache::put($key, $body, $ttl));
+                });
+            }
+        } catch (LockTimeoutException $e) {
+            return response()->json(['message' => 'Fleet stats are being computed; retry shortly.'], 503, ['Retry-After' => 1]);
+        } catch (QueryException $e) {
+            if ($response = $this->databaseUnavailableResponse($e)) {
+                return $response;
+            }
+
+            throw $e;
+        }
+
+        return response()->json($body + ['cache_ttl' => $ttl]);
+    }
+}
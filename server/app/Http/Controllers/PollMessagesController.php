@@ -4,35 +4,75 @@ namespace App\Http\Controllers;
 
 use App\Models\Message;
 use App\Models\MessageReceipt;
+use App\Services\BinaryPollFormat;
+use App\Services\MessageNotifier;
 use Illuminate\Database\QueryException;
 use Illuminate\Http\Request;
 use Illuminate\Support\Carbon;
+use Illuminate\Support\Facades\Cache;
+use Symfony\Component\HttpFoundation\Response;
 
 class PollMessagesController extends Controller
 {
-    public function __invoke(Request $request)
+    public const POLL_INTERVAL_CACHE_KEY = 'messaging:poll_interval_hint';
+
+    public function __invoke(Request $request, MessageNotifier $notifier, BinaryPollFormat $frames)
     {
         $client = $request->attributes->get('client');
         $cursor = $request->query('cursor');
+        $validated = $request->validate([
+            'limit' => ['sometimes', 'integer', 'min:1'],
+            'wait' => ['sometimes', 'integer', 'min:0'],
+        ]);
+        $pageSize = min(
+            (int) ($validated['limit'] ?? config('messaging.poll_page_size', 50)),
+            (int) config('messaging.poll_max_page_size', 500)
+        );
+        $wait = min((int) ($validated['wait'] ?? 0), (int) config('messaging.poll_max_wait', 25));
+
+        // Opt-in "poll acks cursor" mode: the cursor the client sends is everything
+        // it has already handled, so it doubles as the ack and saves a round trip.
+        if ($cursor && $request->boolean('ack')) {
+            try {
+                MessageReceipt::advance($client->id, (int) $cursor);
+            } catch (QueryException $e) {
+                if ($response = $this->databaseUnavailableResponse($e)) {
+                    return $response;
+                }
 
-        if (!$cursor) {
-            $receipt = MessageReceipt::find($client->id);
-            if ($receipt && $receipt->last_acked_message_id) {
-                $cursor = $receipt->last_acked_message_id;
+                throw $e;
             }
         }
 
+        // Snapshot the signal before querying so a message inserted between the
+        // query and the wait (or the idle mark) is never missed.
+        $version = $notifier->version($client->id);
+        $idle = $notifier->idleState($client->id, $version);
+        $knownIdle = $idle !== null
+            && (!$cursor || $idle['cursor'] === null || (int) $cursor >= $idle['cursor']);
+
         try {
-            $query = Message::query()
-                ->where('to_client_id', $client->id)
-                ->orderBy('id')
-                ->limit(50);
+            if (!$cursor) {
+                if ($knownIdle) {
+                    $cursor = $idle['cursor'];
+                } else {
+                    $receipt = MessageReceipt::find($client->id);
+                    if ($receipt && $receipt->last_acked_message_id) {
+                        $cursor = $receipt->last_acked_message_id;
+                    }
+                }
+            }
 
-            if ($cursor) {
-                $query->where('id', '>', $cursor);
+            // Idle clients are answered from the cache without reading the messages table.
+            $messages = $knownIdle ? collect() : $this->fetchPage($client->id, $cursor, $pageSize);
+
+            if ($messages->isEmpty() && !$knownIdle) {
+                $notifier->markIdle($client->id, $cursor, $version);
             }
 
-            $messages = $query->get(['id', 'type', 'ciphertext', 'nonce', 'tag', 'created_at']);
+            if ($messages->isEmpty() && $wait > 0 && $notifier->waitForChange($client->id, $version, $wait)) {
+                $messages = $this->fetchPage($client->id, $cursor, $pageSize);
+            }
         } catch (QueryException $e) {
             if ($response = $this->databaseUnavailableResponse($e)) {
                 return $response;
@@ -42,7 +82,12 @@ class PollMessagesController extends Controller
         }
 
         if ($messages->isEmpty()) {
-            return response()->noContent();
+            return $this->withPollHeaders(response()->noContent(), $wait);
+        }
+
+        $hasMore = $messages->count() > $pageSize;
+        if ($hasMore) {
+            $messages = $messages->take($pageSize);
         }
 
         $payload = $messages->map(function ($message) {
@@ -61,9 +106,64 @@ class PollMessagesController extends Controller
                 'nonce' => $message->nonce,
                 'tag' => $message->tag,
                 'created_at' => $createdAt,
+                // Which AAD the message was sealed with, so clients decrypt once
+                // instead of trying both: self-addressed sends use 'from', fan-out 'to'.
+                'aad_direction' => $message->from_client_id === $message->to_client_id ? 'from' : 'to',
+                // Null for plain JSON; 'zlib' when the plaintext must be inflated after decryption.
+                'encoding' => $message->encoding,
             ];
         });
 
-        return response()->json(['messages' => $payload]);
+        $nextCursor = $messages->last()->id;
+
+        // Binary frames only when asked for explicitly; browsers sending */* keep getting JSON.
+        if ($request->prefers(['application/json', BinaryPollFormat::MEDIA_TYPE]) === BinaryPollFormat::MEDIA_TYPE) {
+            $response = response($frames->encode($payload->all(), $hasMore, $nextCursor), 200, [
+                'Content-Type' => BinaryPollFormat::MEDIA_TYPE,
+            ]);
+        } else {
+            $response = response()->json([
+                'messages' => $payload,
+                'has_more' => $hasMore,
+                'next_cursor' => $nextCursor,
+            ]);
+        }
+        $response->headers->set('Vary', 'Accept');
+
+        return $this->withPollHeaders($response, $wait);
+    }
+
+    private function fetchPage(string $clientId, $cursor, int $pageSize)
+    {
+        $query = Message::query()
+            ->where('to_client_id', $clientId)
+            ->orderBy('id')
+            // Fetch one extra row so we can tell the client whether a backlog remains.
+            ->limit($pageSize + 1);
+
+        if ($cursor) {
+            $query->where('id', '>', $cursor);
+        }
+
+        return $query->get(['id', 'from_client_id', 'to_client_id', 'type', 'ciphertext', 'nonce', 'tag', 'encoding', 'created_at']);
+    }
+
+    /**
+     * Attach the operator-controlled next-poll hint, if one is set, and echo the
+     * honoured long-poll wait so clients can tell the server supports it.
+     */
+    private function withPollHeaders(Response $response, int $wait): Response
+    {
+        if ($wait > 0) {
+            $response->headers->set('X-Poll-Wait', (string) $wait);
+        }
+
+        $hint = Cache::get(self::POLL_INTERVAL_CACHE_KEY, config('messaging.poll_interval_hint'));
+
+        if ($hint !== null && $hint !== '') {
+            $response->headers->set('X-Poll-Interval', (string) max(0, (int) $hint));
+        }
+
+        return $response;
     }
 }
@@ -2,11 +2,11 @@
 
 namespace App\Http\Middleware;
 
-use App\Models\Client;
+use App\Services\ClientAuthCache;
+use App\Services\LastSeenBuffer;
 use Closure;
 use Illuminate\Http\Request;
 use Illuminate\Support\Facades\Date;
-use Illuminate\Support\Facades\Hash;
 use Illuminate\Support\Facades\Schema;
 use Symfony\Component\HttpKernel\Exception\UnauthorizedHttpException;
 
@@ -14,6 +14,12 @@ class ClientTokenAuth
 {
     private static ?bool $supportsLastSeen = null;
 
+    public function __construct(
+        private ClientAuthCache $authCache,
+        private LastSeenBuffer $lastSeen,
+    ) {
+    }
+
     public function handle(Request $request, Closure $next)
     {
         $token = $request->bearerToken();
@@ -23,15 +29,15 @@ class ClientTokenAuth
             throw new UnauthorizedHttpException('Bearer', 'Missing credentials');
         }
 
-        $client = Client::find($clientId);
-        if (!$client || !Hash::check($token, $client->api_token_hash)) {
+        $client = $this->authCache->resolve($clientId, $token);
+        if (!$client) {
             throw new UnauthorizedHttpException('Bearer', 'Invalid token');
         }
 
         $request->attributes->set('client', $client);
 
         if ($this->supportsLastSeenAt()) {
-            $client->forceFill(['last_seen_at' => Date::now()])->save();
+            $this->lastSeen->touch($client->id, Date::now());
         }
 
         return $next($request);
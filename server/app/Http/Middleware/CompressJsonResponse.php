@@ -0,0 +1,46 @@
+<?php
+
+namespace App\Http\Middleware;
+
+use Closure;
+use Illuminate\Http\Request;
+use Symfony\Component\HttpFoundation\Response;
+
+/**
+ * Gzip JSON responses for clients that send `Accept-Encoding: gzip`.
+ *
+ * Ciphertext itself does not compress, but the base64 and JSON framing around
+ * it does. Binary poll frames and small bodies are passed through untouched.
+ */
+class CompressJsonResponse
+{
+    public function handle(Request $request, Closure $next)
+    {
+        $response = $next($request);
+        $minBytes = (int) config('messaging.gzip_min_bytes', 1024);
+
+        if ($minBytes <= 0
+            || $response->headers->has('Content-Encoding')
+            || !str_starts_with((string) $response->headers->get('Content-Type'), 'application/json')) {
+            return $response;
+        }
+
+        $response->setVary('Accept-Encoding', false);
+
+        $content = $response->getContent();
+        if (!in_array('gzip', $request->getEncodings(), true) || $content === false || strlen($content) < $minBytes) {
+            return $response;
+        }
+
+        $compressed = gzencode($content, 6);
+        if ($compressed === false) {
+            return $response;
+        }
+
+        $response->setContent($compressed);
+        $response->headers->set('Content-Encoding', 'gzip');
+        $response->headers->set('Content-Length', (string) strlen($compressed));
+
+        return $response;
+    }
+}
@@ -4,14 +4,18 @@ namespace App\Jobs;
 
 use App\Models\Client;
 use App\Models\Message;
+use App\Models\MessageReceipt;
+use App\Services\ClientKeyProvider;
 use App\Services\EncryptionService;
+use App\Services\MessageNotifier;
 use Illuminate\Bus\Queueable;
 use Illuminate\Contracts\Queue\ShouldQueue;
 use Illuminate\Foundation\Bus\Dispatchable;
 use Illuminate\Queue\InteractsWithQueue;
 use Illuminate\Queue\SerializesModels;
-use Illuminate\Support\Facades\Crypt;
 use Illuminate\Support\Facades\Date;
+use Illuminate\Support\Facades\DB;
+use Illuminate\Support\Facades\Log;
 
 class MessageFanoutJob implements ShouldQueue
 {
@@ -25,36 +29,59 @@ class MessageFanoutJob implements ShouldQueue
     ) {
     }
 
-    public function handle(EncryptionService $encryption): void
+    public function handle(EncryptionService $encryption, MessageNotifier $notifier, ClientKeyProvider $keys): void
     {
-        foreach ($this->clientIds as $clientId) {
-            $client = Client::find($clientId);
-            if (!$client) {
-                continue;
-            }
+        $clients = Client::query()
+            ->whereIn('id', $this->clientIds)
+            ->get(['id', 'encryption_key_encrypted']);
 
-            $key = Crypt::decryptString($client->encryption_key_encrypted);
-            $timestamp = Date::now();
-            $aad = [
-                'to' => $client->id,
-                'ts' => $timestamp->toIso8601String(),
-            ];
+        if ($clients->isEmpty()) {
+            return;
+        }
 
-            $encrypted = $encryption->encrypt($key, [
-                'type' => $this->type,
-                'payload' => $this->payload,
-                'ts' => $timestamp->toIso8601String(),
-            ], $aad);
+        // One timestamp and one serialised (and possibly compressed) plaintext for the whole chunk.
+        $timestamp = Date::now();
+        $ts = $timestamp->toIso8601String();
+        $createdAt = (new Message())->fromDateTime($timestamp);
+        $plaintext = json_encode([
+            'type' => $this->type,
+            'payload' => $this->payload,
+            'ts' => $ts,
+        ], JSON_UNESCAPED_SLASHES);
+        [$plaintext, $encoding] = $encryption->compress($plaintext, $this->type);
+
+        $rows = [];
+        foreach ($clients as $client) {
+            $key = $keys->forClient($client);
+            // A sender listed among its own recipients gets a from == to row, which
+            // poll labels (and clients open) with the 'from' AAD, so seal it that way.
+            $direction = $client->id === $this->fromClientId ? 'from' : 'to';
+            $encrypted = $encryption->encryptPlaintext($key, $plaintext, [
+                $direction => $client->id,
+                'ts' => $ts,
+            ], $encoding);
 
-            Message::create([
+            $rows[] = [
                 'from_client_id' => $this->fromClientId,
                 'to_client_id' => $client->id,
                 'type' => $this->type,
                 'ciphertext' => $encrypted['ciphertext'],
                 'nonce' => $encrypted['nonce'],
                 'tag' => $encrypted['tag'],
-                'created_at' => $timestamp,
-            ]);
+                'encoding' => $encoding,
+                'created_at' => $createdAt,
+            ];
         }
+
+        DB::transaction(function () use ($rows, $clients) {
+            foreach (array_chunk($rows, (int) config('messaging.fanout_insert_batch', 500)) as $batch) {
+                Message::insert($batch);
+            }
+            MessageReceipt::recordDelivered($clients->pluck('id')->all());
+        });
+
+        $notifier->notify($clients->pluck('id'));
+
+        Log::debug('Client key cache', $keys->stats());
     }
 }
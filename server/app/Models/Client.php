@@ -2,6 +2,7 @@
 
 namespace App\Models;
 
+use App\Services\ClientAuthCache;
 use Illuminate\Database\Eloquent\Factories\HasFactory;
 use Illuminate\Database\Eloquent\Model;
 use Illuminate\Support\Str;
@@ -40,5 +41,9 @@ class Client extends Model
                 $client->id = (string) Str::uuid();
             }
         });
+
+        // Rotated tokens or keys must not keep authenticating from the cache.
+        static::saved(fn (Client $client) => app(ClientAuthCache::class)->forget($client->id));
+        static::deleted(fn (Client $client) => app(ClientAuthCache::class)->forget($client->id));
     }
 }
@@ -9,6 +9,12 @@ class Message extends Model
     public $timestamps = false;
 
     protected $fillable = [
-        'from_client_id', 'to_client_id', 'type', 'ciphertext', 'nonce', 'tag', 'created_at',
+        'from_client_id', 'to_client_id', 'type', 'ciphertext', 'nonce', 'tag', 'encoding', 'created_at',
     ];
+
+    protected static function booted(): void
+    {
+        // Bulk inserts bypass this and call MessageReceipt::recordDelivered() themselves.
+        static::created(fn (Message $message) => MessageReceipt::recordDelivered([$message->to_client_id]));
+    }
 }
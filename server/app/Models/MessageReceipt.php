@@ -3,7 +3,15 @@
 namespace App\Models;
 
 use Illuminate\Database\Eloquent\Model;
+use Illuminate\Support\Facades\DB;
 
+/**
+ * A client's ack position, plus two columns kept current for fleet stats:
+ * latest_message_id (the newest message addressed to the client) and
+ * first_unacked_message_id (the oldest stored message past the ack, or null
+ * when the client is caught up). Deliveries, acks and retention all call
+ * refreshBacklog() for the clients they touch.
+ */
 class MessageReceipt extends Model
 {
     public $timestamps = true;
@@ -11,4 +19,86 @@ class MessageReceipt extends Model
     public $incrementing = false;
     protected $keyType = 'string';
     protected $fillable = ['client_id', 'last_acked_message_id'];
+
+    /**
+     * Move the client's receipt forward to $messageId, never backwards.
+     */
+    public static function advance(string $clientId, int $messageId): void
+    {
+        $updated = static::query()
+            ->whereKey($clientId)
+            ->where(function ($query) use ($messageId) {
+                $query->whereNull('last_acked_message_id')
+                    ->orWhere('last_acked_message_id', '<', $messageId);
+            })
+            ->update(['last_acked_message_id' => $messageId]);
+
+        if ($updated === 0) {
+            $receipt = static::firstOrCreate(
+                ['client_id' => $clientId],
+                ['last_acked_message_id' => $messageId]
+            );
+            if (!$receipt->wasRecentlyCreated) {
+                return;
+            }
+        }
+
+        static::refreshBacklog([$clientId]);
+    }
+
+    /**
+     * Set the client's receipt to $messageId, which may move it backwards.
+     */
+    public static function acknowledge(string $clientId, int $messageId): void
+    {
+        static::updateOrCreate(['client_id' => $clientId], ['last_acked_message_id' => $messageId]);
+        static::refreshBacklog([$clientId]);
+    }
+
+    /**
+     * Note that new messages were stored for these recipients, creating their
+     * receipts if needed. Call it after the insert, in the same transaction.
+     *
+     * @param  array<int, string>  $clientIds
+     */
+    public static function recordDelivered(array $clientIds): void
+    {
+        $model = new static();
+        $now = $model->fromDateTime($model->freshTimestamp());
+
+        foreach (array_chunk(array_values(array_unique($clientIds)), 500) as $chunk) {
+            static::query()->insertOrIgnore(array_map(fn (string $clientId) => [
+                'client_id' => $clientId,
+                'created_at' => $now,
+                'updated_at' => $now,
+            ], $chunk));
+        }
+
+        static::refreshBacklog($clientIds);
+    }
+
+    /**
+     * Recompute latest_message_id and first_unacked_message_id for these
+     * clients from the (to_client_id, id) index: two seeks per client.
+     *
+     * @param  iterable<int, string>  $clientIds
+     */
+    public static function refreshBacklog(iterable $clientIds): void
+    {
+        $table = (new static())->getTable();
+        $messages = (new Message())->getTable();
+        $latest = "(SELECT MAX(id) FROM {$messages} WHERE to_client_id = {$table}.client_id)";
+        $next = "(SELECT MIN(id) FROM {$messages} WHERE to_client_id = {$table}.client_id"
+            ." AND id > COALESCE({$table}.last_acked_message_id, 0))";
+
+        foreach (collect($clientIds)->unique()->chunk(500) as $chunk) {
+            static::query()->toBase()->whereIn('client_id', $chunk->values()->all())->update([
+                // Writers can commit in any order, so the latest id never moves backwards.
+                'latest_message_id' => DB::raw(
+                    "CASE WHEN latest_message_id IS NULL OR latest_message_id < {$latest} THEN {$latest} ELSE latest_message_id END"
+                ),
+                'first_unacked_message_id' => DB::raw($next),
+            ]);
+        }
+    }
 }
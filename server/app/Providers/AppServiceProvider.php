@@ -2,13 +2,15 @@
 
 namespace App\Providers;
 
+use App\Services\ClientKeyProvider;
 use Illuminate\Support\ServiceProvider;
 
 class AppServiceProvider extends ServiceProvider
 {
     public function register(): void
     {
-        //
+        // One key cache per process, shared by every request and job it serves.
+        $this->app->singleton(ClientKeyProvider::class);
     }
 
     public function boot(): void
@@ -0,0 +1,51 @@
+<?php
+
+namespace App\Services;
+
+/**
+ * Length-prefixed binary encoding of a poll page, negotiated through Accept.
+ *
+ * Ciphertext, tag and nonce travel as raw bytes instead of base64 strings,
+ * with the tag appended to the ciphertext exactly as AES-GCM libraries expect
+ * it. All integers are big-endian:
+ *
+ *   header:  "RAF1" | flags u8 (bit 0 = has_more) | next_cursor u64 | count u32
+ *   message: length u32 (of the rest of the frame)
+ *            | id u64 | flags u8 (bit 0: AAD direction 0 = to, 1 = from; bit 1: zlib encoding)
+ *            | created_at len u8 + bytes | type len u16 + bytes
+ *            | nonce len u8 + bytes | sealed len u32 + ciphertext||tag
+ */
+class BinaryPollFormat
+{
+    public const MEDIA_TYPE = 'application/vnd.remoteagent.frames';
+
+    private const MAGIC = 'RAF1';
+
+    /**
+     * @param  array<int, array{id: int, type: string, ciphertext: string, nonce: string, tag: string, created_at: ?string, aad_direction: string, encoding: ?string}>  $messages
+     */
+    public function encode(array $messages, bool $hasMore, ?int $nextCursor): string
+    {
+        $out = self::MAGIC.pack('CJN', $hasMore ? 1 : 0, $nextCursor ?? 0, count($messages));
+
+        foreach ($messages as $message) {
+            $createdAt = (string) $message['created_at'];
+            $type = (string) $message['type'];
+            $nonce = base64_decode($message['nonce']);
+            $sealed = base64_decode($message['ciphertext']).base64_decode($message['tag']);
+
+            $flags = ($message['aad_direction'] === 'from' ? 1 : 0)
+                | (($message['encoding'] ?? null) === EncryptionService::ENCODING_ZLIB ? 2 : 0);
+
+            $frame = pack('JC', (int) $message['id'], $flags)
+                .pack('C', strlen($createdAt)).$createdAt
+                .pack('n', strlen($type)).$type
+                .pack('C', strlen($nonce)).$nonce
+                .pack('N', strlen($sealed)).$sealed;
+
+            $out .= pack('N', strlen($frame)).$frame;
+        }
+
+        return $out;
+    }
+}
@@ -0,0 +1,79 @@
+<?php
+
+namespace App\Services;
+
+use App\Models\Client;
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Facades\Hash;
+use Illuminate\Support\Str;
+
+/**
+ * Short-lived cache of verified client bearer tokens.
+ *
+ * A successful bcrypt check stores an HMAC-SHA256 digest of the token together
+ * with the client's current auth version, a random value kept in the cache
+ * and discarded by forget() whenever the client row is saved or deleted.
+ * Later requests within the TTL are verified with a constant-time comparison
+ * of both, without reading the client row: the returned model carries only
+ * its id, and callers that need other columns load them with refresh()
+ * (ClientKeyProvider does this itself).
+ *
+ * The version is read before the row, so a request that raced a token
+ * rotation caches the version the rotation discarded and its entry is never
+ * trusted. Only the digest and version are cached, never the client's
+ * attributes or keys. Tokens changed without model events (raw query-builder
+ * updates) must be followed by forget().
+ */
+class ClientAuthCache
+{
+    public function resolve(string $clientId, string $token): ?Client
+    {
+        $digest = hash_hmac('sha256', $token, $this->secret());
+        $version = $this->version($clientId);
+        $cached = Cache::get($this->key($clientId));
+
+        if (is_array($cached)
+            && hash_equals($cached['digest'] ?? '', $digest)
+            && hash_equals($cached['version'] ?? '', $version)) {
+            return (new Client())->newFromBuilder(['id' => $clientId]);
+        }
+
+        $client = Client::find($clientId);
+        if (!$client || !Hash::check($token, $client->api_token_hash)) {
+            return null;
+        }
+
+        Cache::put($this->key($clientId), [
+            'digest' => $digest,
+            'version' => $version,
+        ], (int) config('messaging.auth_cache_ttl', 60));
+
+        return $client;
+    }
+
+    public function forget(string $clientId): void
+    {
+        Cache::forget($this->versionKey($clientId));
+        Cache::forget($this->key($clientId));
+    }
+
+    private function version(string $clientId): string
+    {
+        return (string) Cache::rememberForever($this->versionKey($clientId), fn () => Str::random(40));
+    }
+
+    private function secret(): string
+    {
+        return (string) config('app.key');
+    }
+
+    private function key(string $clientId): string
+    {
+        return 'auth:client:'.$clientId;
+    }
+
+    private function versionKey(string $clientId): string
+    {
+        return 'auth:client-version:'.$clientId;
+    }
+}
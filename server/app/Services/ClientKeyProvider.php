@@ -0,0 +1,103 @@
+<?php
+
+namespace App\Services;
+
+use App\Models\Client;
+use Illuminate\Support\Facades\Crypt;
+
+/**
+ * Per-process cache of decrypted client encryption keys.
+ *
+ * Keys are held in a bounded LRU with a TTL so long-lived workers (queue
+ * workers running fan-out, Octane) stop paying for Crypt::decryptString on
+ * every message. Each entry remembers the encrypted column it was derived
+ * from, so a key rotated by another process is never served stale; rotations
+ * in this process should still call forget() explicitly. Nothing leaves the
+ * process, so decrypted keys are never written to the shared cache store.
+ */
+class ClientKeyProvider
+{
+    /** @var array<string, array{encrypted: string, key: string, expires: float}> */
+    private array $entries = [];
+
+    private int $hits = 0;
+
+    private int $misses = 0;
+
+    private int $evictions = 0;
+
+    public function forClient(Client $client): string
+    {
+        if ($client->exists && !array_key_exists('encryption_key_encrypted', $client->getAttributes())) {
+            // Models authenticated from ClientAuthCache carry only their id.
+            $client->refresh();
+        }
+
+        $id = (string) $client->id;
+        $encrypted = (string) $client->encryption_key_encrypted;
+        $entry = $this->entries[$id] ?? null;
+
+        if ($entry !== null) {
+            unset($this->entries[$id]);
+
+            if ($entry['encrypted'] === $encrypted && $entry['expires'] > microtime(true)) {
+                // Re-insert so the array's insertion order tracks recency.
+                $this->entries[$id] = $entry;
+                $this->hits++;
+
+                return $entry['key'];
+            }
+        }
+
+        $this->misses++;
+        $key = Crypt::decryptString($encrypted);
+        $this->remember($id, $encrypted, $key);
+
+        return $key;
+    }
+
+    public function forget(string $clientId): void
+    {
+        unset($this->entries[$clientId]);
+    }
+
+    public function flush(): void
+    {
+        $this->entries = [];
+    }
+
+    /**
+     * @return array{hits: int, misses: int, evictions: int, size: int, hit_rate: float}
+     */
+    public function stats(): array
+    {
+        $lookups = $this->hits + $this->misses;
+
+        return [
+            'hits' => $this->hits,
+            'misses' => $this->misses,
+            'evictions' => $this->evictions,
+            'size' => count($this->entries),
+            'hit_rate' => $lookups > 0 ? round($this->hits / $lookups, 4) : 0.0,
+        ];
+    }
+
+    private function remember(string $clientId, string $encrypted, string $key): void
+    {
+        $capacity = (int) config('messaging.key_cache_size', 1000);
+        if ($capacity <= 0) {
+            return;
+        }
+
+        while (count($this->entries) >= $capacity) {
+            unset($this->entries[array_key_first($this->entries)]);
+            $this->evictions++;
+        }
+
+        $this->entries[$clientId] = [
+            'encrypted' => $encrypted,
+            'key' => $key,
+            'expires' => microtime(true) + (int) config('messaging.key_cache_ttl', 300),
+        ];
+    }
+}
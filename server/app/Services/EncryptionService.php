@@ -7,14 +7,51 @@ use Illuminate\Support\Str;
 
 class EncryptionService
 {
-    public function encrypt(string $key, array $payload, array $aad = []): array
+    /** Envelope `encoding` for plaintext compressed with zlib (RFC 1950) before encryption. */
+    public const ENCODING_ZLIB = 'zlib';
+
+    public function encrypt(string $key, array $payload, array $aad = [], ?string $type = null): array
+    {
+        [$plaintext, $encoding] = $this->compress(json_encode($payload, JSON_UNESCAPED_SLASHES), $type);
+
+        return $this->encryptPlaintext($key, $plaintext, $aad, $encoding);
+    }
+
+    /**
+     * Compress a JSON plaintext when its type is allowlisted in `messaging.compress_types`
+     * and it is at least `messaging.compress_threshold` bytes. Returns `[$plaintext, $encoding]`,
+     * where `$encoding` is null when the plaintext was left as is.
+     */
+    public function compress(string $plaintext, ?string $type): array
+    {
+        $types = array_filter(array_map('trim', explode(',', (string) config('messaging.compress_types', ''))));
+
+        if ($type === null || strlen($plaintext) < (int) config('messaging.compress_threshold', 1024)
+            || (!in_array('*', $types, true) && !in_array($type, $types, true))) {
+            return [$plaintext, null];
+        }
+
+        $compressed = gzcompress($plaintext, (int) config('messaging.compress_level', 6));
+
+        // Incompressible payloads are cheaper to leave alone.
+        if ($compressed === false || strlen($compressed) >= strlen($plaintext)) {
+            return [$plaintext, null];
+        }
+
+        return [$compressed, self::ENCODING_ZLIB];
+    }
+
+    /**
+     * Encrypt an already JSON-encoded (and possibly compressed) payload, so fan-out
+     * can serialise once per batch. `$encoding` is echoed back for the envelope.
+     */
+    public function encryptPlaintext(string $key, string $plaintext, array $aad = [], ?string $encoding = null): array
     {
         $iv = random_bytes(12);
         $rawKey = base64_decode($key, true);
         if ($rawKey === false) {
             throw new \RuntimeException('Invalid encryption key encoding');
         }
-        $plaintext = json_encode($payload, JSON_UNESCAPED_SLASHES);
         $aadJson = json_encode($aad, JSON_UNESCAPED_SLASHES);
         $tag = '';
         $cipher = openssl_encrypt($plaintext, 'aes-256-gcm', $rawKey, OPENSSL_RAW_DATA, $iv, $tag, $aadJson, 16);
@@ -28,10 +65,11 @@ class EncryptionService
             'nonce' => base64_encode($iv),
             'tag' => base64_encode($tag),
             'aad' => $aad,
+            'encoding' => $encoding,
         ];
     }
 
-    public function decrypt(string $key, string $ciphertext, string $nonce, string $tag, array $aad = []): array
+    public function decrypt(string $key, string $ciphertext, string $nonce, string $tag, array $aad = [], ?string $encoding = null): array
     {
         $cipherRaw = base64_decode($ciphertext);
         $iv = base64_decode($nonce);
@@ -47,6 +85,25 @@ class EncryptionService
             throw new DecryptException('Unable to decrypt payload');
         }
 
-        return json_decode($plaintext, true) ?? [];
+        return json_decode($this->inflate($plaintext, $encoding), true) ?? [];
+    }
+
+    private function inflate(string $plaintext, ?string $encoding): string
+    {
+        if ($encoding === null || $encoding === '') {
+            return $plaintext;
+        }
+
+        if ($encoding !== self::ENCODING_ZLIB) {
+            throw new DecryptException('Unsupported payload encoding');
+        }
+
+        // Bounded so a small hostile payload cannot inflate into exhausting memory.
+        $inflated = @gzuncompress($plaintext, (int) config('messaging.compress_max_inflated', 16 * 1024 * 1024));
+        if ($inflated === false) {
+            throw new DecryptException('Unable to decompress payload');
+        }
+
+        return $inflated;
     }
 }
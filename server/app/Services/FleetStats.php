@@ -0,0 +1,137 @@
+<?php
+
+namespace App\Services;
+
+use App\Models\Client;
+use App\Models\Message;
+use App\Models\MessageReceipt;
+use Carbon\CarbonInterface;
+use Illuminate\Database\Query\Builder;
+use Illuminate\Support\Facades\DB;
+use Illuminate\Support\Facades\Date;
+
+/**
+ * Fleet-wide aggregates for operators, computed in SQL.
+ *
+ * Client counts and the last-seen histogram are index range counts on
+ * last_seen_at, one non-overlapping range per bucket. Backlog reads only
+ * message_receipts, whose latest_message_id and first_unacked_message_id are
+ * maintained on every delivery and ack, so the messages table is never
+ * scanned. The cost is one pass over the receipts of clients that are behind.
+ * The controller caches the result briefly; this class always hits the database.
+ */
+class FleetStats
+{
+    /**
+     * Upper bounds, in seconds since last seen, of the histogram buckets. Clients
+     * seen longer ago fall into a final open bucket; never-seen ones are counted apart.
+     */
+    public const AGE_BUCKETS = [60, 300, 900, 3600, 21600, 86400, 604800];
+
+    private const DEPTH = 'latest_message_id - first_unacked_message_id + 1';
+
+    public function compute(int $top = 10): array
+    {
+        $now = Date::now();
+        $window = (int) config('messaging.online_window', 120);
+
+        return [
+            'server_time' => $now->toIso8601String(),
+            'online_window' => $window,
+            ...$this->clients($now, $window),
+            'backlog' => $this->backlog($now, $top),
+        ];
+    }
+
+    private function clients(CarbonInterface $now, int $window): array
+    {
+        $count = fn () => Client::query()->toBase()->selectRaw('COUNT(*)');
+        $query = DB::query()
+            ->selectSub($count(), 'total')
+            ->selectSub($count()->whereNull('last_seen_at'), 'never_seen')
+            ->selectSub($count()->where('last_seen_at', '>=', $now->clone()->subSeconds($window)), 'online');
+
+        $newer = null;
+        foreach (self::AGE_BUCKETS as $index => $seconds) {
+            $bucket = $count()->where('last_seen_at', '>=', $now->clone()->subSeconds($seconds));
+            if ($newer !== null) {
+                $bucket->where('last_seen_at', '<', $now->clone()->subSeconds($newer));
+            }
+            $query->selectSub($bucket, "bucket_$index");
+            $newer = $seconds;
+        }
+
+        $row = (array) $query->first();
+        $total = (int) $row['total'];
+        $neverSeen = (int) $row['never_seen'];
+        $online = (int) $row['online'];
+
+        $histogram = [];
+        $seen = 0;
+        foreach (self::AGE_BUCKETS as $index => $seconds) {
+            $histogram[] = ['max_seconds' => $seconds, 'count' => (int) $row["bucket_$index"]];
+            $seen += (int) $row["bucket_$index"];
+        }
+        $histogram[] = ['max_seconds' => null, 'count' => $total - $neverSeen - $seen];
+
+        return [
+            'clients' => [
+                'total' => $total,
+                'online' => $online,
+                'offline' => $total - $online,
+                'never_seen' => $neverSeen,
+            ],
+            'last_seen_age' => $histogram,
+        ];
+    }
+
+    private function backlog(CarbonInterface $now, int $top): array
+    {
+        $summary = $this->pending()
+            ->selectRaw('COUNT(*) AS clients')
+            ->selectRaw('SUM('.self::DEPTH.') AS messages')
+            ->selectRaw('MAX('.self::DEPTH.') AS max_depth')
+            ->selectRaw('MIN(first_unacked_message_id) AS oldest_id')
+            ->first();
+
+        $oldest = $summary->oldest_id !== null
+            ? Message::query()->toBase()->where('id', $summary->oldest_id)->value('created_at')
+            : null;
+        $oldestAt = $oldest !== null ? Date::parse($oldest) : null;
+
+        $deepest = $top > 0
+            ? $this->pending()
+                ->select(['client_id', 'latest_message_id', 'last_acked_message_id'])
+                ->selectRaw(self::DEPTH.' AS depth')
+                ->orderByDesc('depth')
+                ->limit($top)
+                ->get()
+            : collect();
+        $names = Client::query()->whereIn('id', $deepest->pluck('client_id'))->pluck('name', 'id');
+
+        return [
+            'clients' => (int) $summary->clients,
+            'messages' => (int) $summary->messages,
+            'max_depth' => (int) $summary->max_depth,
+            'oldest_unacked_at' => $oldestAt?->toIso8601String(),
+            'oldest_unacked_age_seconds' => $oldestAt !== null ? (int) $oldestAt->diffInSeconds($now, true) : null,
+            'deepest' => $deepest->map(fn ($row) => [
+                'client_id' => $row->client_id,
+                'name' => $names[$row->client_id] ?? null,
+                'depth' => (int) $row->depth,
+                'latest_message_id' => (int) $row->latest_message_id,
+                'last_acked_message_id' => $row->last_acked_message_id !== null ? (int) $row->last_acked_message_id : null,
+            ])->values()->all(),
+        ];
+    }
+
+    /**
+     * Receipts of clients with a stored message past their ack. Depth is an id
+     * distance from the oldest unacked message (ids are global), so it is an
+     * upper bound on the number of waiting messages.
+     */
+    private function pending(): Builder
+    {
+        return MessageReceipt::query()->toBase()->whereNotNull('first_unacked_message_id');
+    }
+}
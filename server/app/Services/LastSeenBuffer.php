@@ -0,0 +1,145 @@
+<?php
+
+namespace App\Services;
+
+use App\Models\Client;
+use Carbon\CarbonInterface;
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Facades\Date;
+use Illuminate\Support\Facades\DB;
+
+/**
+ * Write-behind buffer for clients.last_seen_at.
+ *
+ * Authenticated requests only record the timestamp in the cache. The first
+ * touch after a flush also appends the client to a pending queue: it takes a
+ * slot number from an atomic counter and writes its id under that slot's own
+ * key, so a touch costs O(1) and takes no lock however many clients are
+ * pending. flush() drains the slots written since the last flush and writes
+ * every pending timestamp with one UPDATE per chunk. It runs on the scheduler
+ * (clients:flush-last-seen) and before operator listings.
+ */
+class LastSeenBuffer
+{
+    private const TAIL_KEY = 'last_seen:pending:tail';
+
+    private const HEAD_KEY = 'last_seen:pending:head';
+
+    private const DRAIN_CHUNK = 1000;
+
+    public function touch(string $clientId, CarbonInterface $at): void
+    {
+        Cache::forever($this->valueKey($clientId), $at->getTimestamp());
+
+        if (!Cache::add($this->dirtyKey($clientId), true, $this->ttl())) {
+            return;
+        }
+
+        $slot = Cache::increment(self::TAIL_KEY);
+        if ($slot === false) {
+            // Some stores only increment existing keys.
+            Cache::add(self::TAIL_KEY, 0);
+            $slot = Cache::increment(self::TAIL_KEY);
+        }
+
+        // Slots outlive the dirty marker, so a flush that is late by one interval still finds them.
+        Cache::put($this->slotKey((int) $slot), $clientId, $this->ttl() * 2);
+    }
+
+    /**
+     * Persist buffered timestamps and return how many clients were updated.
+     */
+    public function flush(): int
+    {
+        $clientIds = Cache::lock(self::HEAD_KEY.':lock', 30)->block(5, fn () => $this->drain());
+
+        if (empty($clientIds)) {
+            return 0;
+        }
+
+        // Clear the dirty markers before reading values so a touch that lands
+        // mid-flush re-registers itself for the next flush instead of being lost.
+        foreach ($clientIds as $clientId) {
+            Cache::forget($this->dirtyKey($clientId));
+        }
+
+        $values = Cache::many(array_map(fn (string $id) => $this->valueKey($id), $clientIds));
+        $model = new Client();
+        $rows = [];
+        foreach ($clientIds as $clientId) {
+            $timestamp = $values[$this->valueKey($clientId)] ?? null;
+            if ($timestamp !== null) {
+                $rows[$clientId] = $model->fromDateTime(Date::createFromTimestamp($timestamp));
+            }
+        }
+
+        foreach (array_chunk($rows, 500, true) as $chunk) {
+            $cases = str_repeat(' WHEN ? THEN ?', count($chunk));
+            $placeholders = implode(', ', array_fill(0, count($chunk), '?'));
+            $bindings = [];
+            foreach ($chunk as $clientId => $lastSeen) {
+                $bindings[] = $clientId;
+                $bindings[] = $lastSeen;
+            }
+
+            DB::update(
+                "UPDATE {$model->getTable()} SET last_seen_at = CASE id{$cases} END WHERE id IN ({$placeholders})",
+                array_merge($bindings, array_keys($chunk))
+            );
+        }
+
+        return count($rows);
+    }
+
+    private function ttl(): int
+    {
+        // Outlive one missed flush; an expired marker only costs one extra registration.
+        return max(60, (int) config('messaging.last_seen_flush_seconds', 60) * 2);
+    }
+
+    /**
+     * Take every client id queued since the last drain.
+     *
+     * @return array<int, string>
+     */
+    private function drain(): array
+    {
+        $head = (int) Cache::get(self::HEAD_KEY, 0);
+        $tail = (int) Cache::get(self::TAIL_KEY, 0);
+        if ($tail <= $head) {
+            return [];
+        }
+
+        $clientIds = [];
+        for ($from = $head + 1; $from <= $tail; $from += self::DRAIN_CHUNK) {
+            $keys = array_map(fn (int $slot) => $this->slotKey($slot), range($from, min($from + self::DRAIN_CHUNK - 1, $tail)));
+            foreach (Cache::many($keys) as $clientId) {
+                if ($clientId !== null) {
+                    $clientIds[$clientId] = true;
+                }
+            }
+            Cache::deleteMultiple($keys);
+        }
+
+        // A touch that has taken a slot but not yet written it is skipped here.
+        // Its dirty marker then expires after ttl(), and the next touch queues it again.
+        Cache::forever(self::HEAD_KEY, $tail);
+
+        return array_keys($clientIds);
+    }
+
+    private function slotKey(int $slot): string
+    {
+        return 'last_seen:pending:'.$slot;
+    }
+
+    private function valueKey(string $clientId): string
+    {
+        return 'last_seen:'.$clientId;
+    }
+
+    private function dirtyKey(string $clientId): string
+    {
+        return 'last_seen:dirty:'.$clientId;
+    }
+}
@@ -0,0 +1,92 @@
+<?php
+
+namespace App\Services;
+
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Sleep;
+
+/**
+ * Per-client "new message" signal shared through the cache store.
+ *
+ * Writers bump a version counter for each recipient after inserting; long-poll
+ * requests snapshot the counter before querying and then watch it for a change.
+ * The same counter stamps the idle high-water mark: "at version N the client
+ * had nothing after cursor C". While the version is unchanged, polls at or past
+ * C can be answered without touching the database. Stamping with the atomic
+ * counter rather than storing the latest message id avoids lost updates when
+ * two writers race for the same client. With the Redis cache store this is a
+ * cheap cross-server signal; the array store acts as a local stand-in for tests.
+ */
+class MessageNotifier
+{
+    public function version(string $clientId): int
+    {
+        return (int) Cache::get($this->key($clientId), 0);
+    }
+
+    public function notify(iterable $clientIds): void
+    {
+        foreach ($clientIds as $clientId) {
+            Cache::increment($this->key($clientId));
+        }
+    }
+
+    /**
+     * Block for up to $seconds until the client's version moves past $version.
+     */
+    public function waitForChange(string $clientId, int $version, int $seconds): bool
+    {
+        $tick = max(10, (int) config('messaging.poll_wait_tick_ms', 250)) * 1000;
+        $deadline = microtime(true) + $seconds;
+
+        while (microtime(true) < $deadline) {
+            Sleep::usleep($tick);
+
+            if ($this->version($clientId) !== $version) {
+                return true;
+            }
+        }
+
+        return false;
+    }
+
+    /**
+     * Record that the client had no messages after $cursor at $version.
+     */
+    public function markIdle(string $clientId, $cursor, int $version): void
+    {
+        Cache::put($this->idleKey($clientId), [
+            'version' => $version,
+            'cursor' => $cursor === null ? null : (int) $cursor,
+        ], (int) config('messaging.poll_idle_cache_ttl', 300));
+    }
+
+    /**
+     * The idle high-water mark, if one was recorded at the current $version.
+     */
+    public function idleState(string $clientId, int $version): ?array
+    {
+        $state = Cache::get($this->idleKey($clientId));
+
+        if (!is_array($state) || ($state['version'] ?? null) !== $version) {
+            return null;
+        }
+
+        return $state;
+    }
+
+    public function forgetIdle(string $clientId): void
+    {
+        Cache::forget($this->idleKey($clientId));
+    }
+
+    private function key(string $clientId): string
+    {
+        return 'messaging:notify:'.$clientId;
+    }
+
+    private function idleKey(string $clientId): string
+    {
+        return 'messaging:idle:'.$clientId;
+    }
+}
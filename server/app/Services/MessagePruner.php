@@ -0,0 +1,181 @@
+<?php
+
+namespace App\Services;
+
+use App\Models\Message;
+use App\Models\MessageReceipt;
+use Carbon\CarbonInterface;
+use Illuminate\Database\Eloquent\Builder;
+use Illuminate\Support\Facades\Date;
+use RuntimeException;
+
+/**
+ * Deletes messages that no longer need to be kept, oldest first.
+ *
+ * Three policies decide what goes:
+ *  - acked: a message at or below its recipient's receipt
+ *    (message_receipts.last_acked_message_id) once it is older than the grace period;
+ *  - hard TTL: any message older than the TTL, acked or not;
+ *  - self-addressed (a client's own sends, which operators read back): only by
+ *    their own TTL, never because the client acked them.
+ *
+ * The table is walked by primary key in windows of `retention_batch_size` ids.
+ * Each window costs one bounded select and one DELETE by id, so no statement
+ * holds locks for long. Walking stops at the first message younger than every
+ * cutoff, since ids grow with created_at.
+ */
+class MessagePruner
+{
+    /**
+     * @param  callable(array): void|null  $progress  called after each window with the running totals
+     * @return array{deleted: int, archived: int, batches: int, seconds: float, archive: ?string}
+     */
+    public function prune(bool $dryRun = false, ?float $maxSeconds = null, ?callable $progress = null): array
+    {
+        $now = Date::now();
+        $graceCutoff = $now->clone()->subSeconds(max(0, (int) config('messaging.retention_acked_grace', 86400)));
+        $ttl = (int) config('messaging.retention_ttl', 30 * 86400);
+        $ttlCutoff = $ttl > 0 ? $now->clone()->subSeconds($ttl) : null;
+        $selfTtl = (int) config('messaging.retention_self_ttl', 90 * 86400);
+        $selfCutoff = $selfTtl > 0 ? $now->clone()->subSeconds($selfTtl) : null;
+        // Nothing newer than the latest cutoff can match any policy.
+        $horizon = collect([$graceCutoff, $ttlCutoff, $selfCutoff])->filter()->max();
+
+        $window = max(1, (int) config('messaging.retention_batch_size', 5000));
+        $pause = max(0, (int) config('messaging.retention_pause_ms', 0));
+        $archivePath = $dryRun ? null : $this->archivePath();
+        $archive = null;
+
+        $started = microtime(true);
+        $totals = ['deleted' => 0, 'archived' => 0, 'batches' => 0, 'seconds' => 0.0, 'archive' => null];
+        $after = 0;
+
+        try {
+            while ($maxSeconds === null || microtime(true) - $started < $maxSeconds) {
+                // One primary-key seek hops over ids that are already gone.
+                $head = Message::query()->where('id', '>', $after)->orderBy('id')->first(['id', 'created_at']);
+                if ($head === null || Date::parse($head->created_at)->greaterThanOrEqualTo($horizon)) {
+                    break;
+                }
+
+                $upper = (int) $head->id + $window - 1;
+                $candidates = $this->eligible($graceCutoff, $ttlCutoff, $selfCutoff)
+                    ->whereBetween('messages.id', [$head->id, $upper]);
+
+                if ($dryRun) {
+                    $totals['deleted'] += $candidates->count();
+                } else {
+                    $rows = $archivePath !== null
+                        ? $candidates->orderBy('messages.id')->get(['messages.*'])
+                        : $candidates->pluck('messages.id')->map(fn ($id) => ['id' => $id]);
+
+                    if ($rows->isNotEmpty()) {
+                        if ($archivePath !== null) {
+                            $archive ??= $this->openArchive($archivePath);
+                            $this->writeArchive($archive, $rows);
+                            $totals['archived'] += $rows->count();
+                            $totals['archive'] = $archivePath;
+                        }
+                        $totals['deleted'] += Message::query()->whereIn('id', $rows->pluck('id'))->delete();
+
+                        // Unacked messages past their TTL may have been the oldest pending for their client.
+                        MessageReceipt::refreshBacklog(MessageReceipt::query()
+                            ->whereBetween('first_unacked_message_id', [$head->id, $upper])
+                            ->pluck('client_id'));
+                    }
+                }
+
+                $totals['batches']++;
+                $totals['seconds'] = microtime(true) - $started;
+                $after = $upper;
+
+                if ($progress !== null) {
+                    $progress($totals);
+                }
+                if ($pause > 0) {
+                    usleep($pause * 1000);
+                }
+            }
+        } finally {
+            if ($archive !== null) {
+                gzclose($archive);
+            }
+        }
+
+        $totals['seconds'] = microtime(true) - $started;
+
+        return $totals;
+    }
+
+    private function eligible(CarbonInterface $graceCutoff, ?CarbonInterface $ttlCutoff, ?CarbonInterface $selfCutoff): Builder
+    {
+        return Message::query()
+            ->leftJoin('message_receipts', 'message_receipts.client_id', '=', 'messages.to_client_id')
+            ->where(function (Builder $q) use ($graceCutoff, $ttlCutoff, $selfCutoff) {
+                $q->where(fn (Builder $q) => $q
+                    ->where(fn (Builder $q) => $q->whereNull('messages.from_client_id')->orWhereColumn('messages.from_client_id', '<>', 'messages.to_client_id'))
+                    ->where(function (Builder $q) use ($graceCutoff, $ttlCutoff) {
+                        $q->where(fn (Builder $q) => $q
+                            ->whereColumn('messages.id', '<=', 'message_receipts.last_acked_message_id')
+                            ->where('messages.created_at', '<', $graceCutoff));
+
+                        if ($ttlCutoff !== null) {
+                            $q->orWhere('messages.created_at', '<', $ttlCutoff);
+                        }
+                    }));
+
+                if ($selfCutoff !== null) {
+                    $q->orWhere(fn (Builder $q) => $q
+                        ->whereColumn('messages.from_client_id', 'messages.to_client_id')
+                        ->where('messages.created_at', '<', $selfCutoff));
+                }
+            });
+    }
+
+    private function archivePath(): ?string
+    {
+        $directory = config('messaging.retention_archive_path');
+        if (!$directory) {
+            return null;
+        }
+
+        return rtrim($directory, '/').'/messages-'.Date::now()->format('Ymd-His').'.jsonl.gz';
+    }
+
+    /**
+     * @return resource
+     */
+    private function openArchive(string $path)
+    {
+        if (!is_dir(dirname($path)) && !mkdir(dirname($path), 0750, true) && !is_dir(dirname($path))) {
+            throw new RuntimeException("Cannot create archive directory for $path");
+        }
+
+        $handle = gzopen($path, 'ab6');
+        if ($handle === false) {
+            throw new RuntimeException("Cannot open archive $path");
+        }
+
+        return $handle;
+    }
+
+    /**
+     * Rows are written and flushed to the file before they are deleted; a
+     * failed write aborts the run with the batch still in the table. fflush()
+     * on a gzopen() stream performs a zlib sync flush, so a crash after the
+     * DELETE leaves a readable archive holding every deleted row.
+     *
+     * @param  resource  $archive
+     */
+    private function writeArchive($archive, $rows): void
+    {
+        $lines = '';
+        foreach ($rows as $row) {
+            $lines .= json_encode($row->getAttributes(), JSON_UNESCAPED_SLASHES)."\n";
+        }
+
+        if (gzwrite($archive, $lines) !== strlen($lines) || !fflush($archive)) {
+            throw new RuntimeException('Failed to write the message archive');
+        }
+    }
+}
@@ -0,0 +1,80 @@
+<?php
+
+namespace App\Services;
+
+use App\Models\Client;
+use App\Models\Message;
+use Illuminate\Contracts\Encryption\DecryptException;
+use Illuminate\Support\Carbon;
+
+/**
+ * Decrypts stored messages into the shape the operator endpoints return.
+ */
+class OperatorMessagePresenter
+{
+    public function __construct(
+        private EncryptionService $encryption,
+        private ClientKeyProvider $keys,
+    ) {
+    }
+
+    /**
+     * @param  iterable<Message>  $messages
+     * @param  array<string, Client>  $clients  recipients keyed by id (only the key column is needed)
+     */
+    public function present(iterable $messages, array $clients): array
+    {
+        $presented = [];
+
+        foreach ($messages as $message) {
+            $createdAt = $message->created_at;
+
+            if ($createdAt instanceof Carbon) {
+                $createdAt = $createdAt->toIso8601String();
+            } elseif (!is_null($createdAt)) {
+                $createdAt = Carbon::parse($createdAt)->toIso8601String();
+            }
+
+            if ($message->from_client_id === $message->to_client_id) {
+                // Client-originated (self-addressed) messages were encrypted with
+                // AAD ordering of ['from' => <client>, 'ts' => <iso-ts>]. Preserve
+                // that exact ordering to satisfy AES-GCM integrity checks.
+                $aad = [
+                    'from' => $message->from_client_id,
+                    'ts' => $createdAt,
+                ];
+            } else {
+                // Operator / server fanout messages used ['to' => <client>, 'ts' => <iso-ts>].
+                $aad = [
+                    'to' => $message->to_client_id,
+                    'ts' => $createdAt,
+                ];
+            }
+
+            $client = $clients[$message->to_client_id] ?? null;
+
+            try {
+                if ($client === null) {
+                    throw new DecryptException('Recipient no longer exists');
+                }
+
+                $body = $this->encryption->decrypt(
+                    $this->keys->forClient($client), $message->ciphertext, $message->nonce, $message->tag, $aad, $message->encoding
+                );
+            } catch (DecryptException $e) {
+                $body = ['error' => 'Unable to decrypt message'];
+            }
+
+            $presented[] = [
+                'id' => $message->id,
+                'type' => $message->type,
+                'from_client_id' => $message->from_client_id,
+                'to_client_id' => $message->to_client_id,
+                'created_at' => $createdAt,
+                'payload' => $body,
+            ];
+        }
+
+        return $presented;
+    }
+}
@@ -0,0 +1,84 @@
+<?php
+
+return [
+    // Number of messages returned by a poll when the client does not ask for a page size.
+    'poll_page_size' => (int) env('POLL_PAGE_SIZE', 50),
+
+    // Upper bound on the client-requested `limit` for a single poll page.
+    'poll_max_page_size' => (int) env('POLL_MAX_PAGE_SIZE', 500),
+
+    // Default suggested delay (seconds) sent as X-Poll-Interval on every poll response.
+    // Null leaves scheduling to the client. Override at runtime with `php artisan messaging:poll-interval`.
+    'poll_interval_hint' => env('POLL_INTERVAL_HINT'),
+
+    // Longest a client may hold a poll open with `wait=<seconds>`; 0 disables long polling.
+    'poll_max_wait' => (int) env('POLL_MAX_WAIT', 25),
+
+    // How often a held poll re-checks the new-message signal.
+    'poll_wait_tick_ms' => (int) env('POLL_WAIT_TICK_MS', 250),
+
+    // How long an "idle at cursor" mark may answer polls from the cache without a database read.
+    'poll_idle_cache_ttl' => (int) env('POLL_IDLE_CACHE_TTL', 300),
+
+    // Seconds a verified bearer token is trusted from the cache before bcrypt runs again.
+    'auth_cache_ttl' => (int) env('AUTH_CACHE_TTL', 60),
+
+    // Expected interval of the clients:flush-last-seen schedule; keep well under the online window.
+    'last_seen_flush_seconds' => (int) env('LAST_SEEN_FLUSH_SECONDS', 60),
+
+    // A client seen within this many seconds is reported as online.
+    'online_window' => (int) env('CLIENT_ONLINE_WINDOW', 120),
+
+    // Page size of GET /operators/clients when `limit` is not given, and the most a request may ask for.
+    'operator_clients_page_size' => (int) env('OPERATOR_CLIENTS_PAGE_SIZE', 100),
+    'operator_clients_max_page_size' => (int) env('OPERATOR_CLIENTS_MAX_PAGE_SIZE', 1000),
+
+    // Page size of the operator message feed (/operators/messages) when `limit` is not given, the most a
+    // request may ask for, and the most client ids one request may filter on.
+    'operator_feed_page_size' => (int) env('OPERATOR_FEED_PAGE_SIZE', 200),
+    'operator_feed_max_page_size' => (int) env('OPERATOR_FEED_MAX_PAGE_SIZE', 1000),
+    'operator_feed_max_clients' => (int) env('OPERATOR_FEED_MAX_CLIENTS', 1000),
+
+    // Seconds GET /operators/stats results are cached and shared between callers; 0 disables.
+    'operator_stats_ttl' => (int) env('OPERATOR_STATS_TTL', 5),
+
+    // Retention (php artisan messages:prune, scheduled hourly). Messages at or below the recipient's receipt
+    // are deleted once older than the grace period; any message older than the hard TTL is deleted acked or
+    // not; a client's own (self-addressed) sends follow only their own TTL. TTLs in seconds, 0 keeps forever.
+    'retention_acked_grace' => (int) env('RETENTION_ACKED_GRACE', 86400),
+    'retention_ttl' => (int) env('RETENTION_TTL', 30 * 86400),
+    'retention_self_ttl' => (int) env('RETENTION_SELF_TTL', 90 * 86400),
+
+    // Ids examined per prune batch (one select and one delete each) and an optional pause between batches.
+    'retention_batch_size' => (int) env('RETENTION_BATCH_SIZE', 5000),
+    'retention_pause_ms' => (int) env('RETENTION_PAUSE_MS', 0),
+
+    // Directory for gzip-compressed JSONL archives of pruned rows (still encrypted); unset to skip archiving.
+    'retention_archive_path' => env('RETENTION_ARCHIVE_PATH'),
+
+    // Most envelopes accepted by one POST /messages/send-batch request.
+    'send_batch_max' => (int) env('SEND_BATCH_MAX', 100),
+
+    // Decrypted client keys kept per process (LRU) and how long each may be reused.
+    'key_cache_size' => (int) env('KEY_CACHE_SIZE', 1000),
+    'key_cache_ttl' => (int) env('KEY_CACHE_TTL', 300),
+
+    // Opt-in compression of plaintext before encryption: comma-separated message types ('*' for all),
+    // the smallest serialised payload worth compressing (bytes), and the zlib level. Empty disables it.
+    'compress_types' => env('COMPRESS_TYPES', ''),
+    'compress_threshold' => (int) env('COMPRESS_THRESHOLD', 1024),
+    'compress_level' => (int) env('COMPRESS_LEVEL', 6),
+
+    // Largest plaintext a compressed envelope may inflate to before it is rejected.
+    'compress_max_inflated' => (int) env('COMPRESS_MAX_INFLATED', 16 * 1024 * 1024),
+
+    // JSON responses from poll and operator endpoints at least this large are gzip-encoded
+    // for clients that accept it; 0 disables.
+    'gzip_min_bytes' => (int) env('GZIP_MIN_BYTES', 1024),
+
+    // Recipients handled by one MessageFanoutJob (loaded with one query, encrypted, then bulk inserted).
+    'fanout_chunk_size' => (int) env('FANOUT_CHUNK_SIZE', 500),
+
+    // Rows per multi-row INSERT inside a fan-out job's transaction.
+    'fanout_insert_batch' => (int) env('FANOUT_INSERT_BATCH', 500),
+];
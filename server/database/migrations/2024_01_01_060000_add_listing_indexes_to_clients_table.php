@@ -0,0 +1,24 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration {
+    public function up(): void
+    {
+        Schema::table('clients', function (Blueprint $table) {
+            // Keyset pagination of the operator listing and its name-prefix filter.
+            $table->index(['created_at', 'id']);
+            $table->index('name');
+        });
+    }
+
+    public function down(): void
+    {
+        Schema::table('clients', function (Blueprint $table) {
+            $table->dropIndex(['created_at', 'id']);
+            $table->dropIndex(['name']);
+        });
+    }
+};
@@ -0,0 +1,50 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\DB;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration {
+    public function up(): void
+    {
+        Schema::table('message_receipts', function (Blueprint $table) {
+            // Maintained on every delivery and ack so fleet stats never scan messages.
+            $table->unsignedBigInteger('latest_message_id')->nullable();
+            $table->unsignedBigInteger('first_unacked_message_id')->nullable()->index();
+        });
+
+        // Backfill with plain SQL so this migration does not depend on model code.
+        $now = now();
+        DB::table('message_receipts')->insertUsing(
+            ['client_id', 'created_at', 'updated_at'],
+            DB::table('messages')
+                ->select('to_client_id')
+                ->selectRaw('? as created_at, ? as updated_at', [$now, $now])
+                ->distinct()
+                ->whereNotExists(function ($query) {
+                    $query->select(DB::raw(1))
+                        ->from('message_receipts')
+                        ->whereColumn('message_receipts.client_id', 'messages.to_client_id');
+                })
+        );
+
+        DB::table('message_receipts')->update([
+            'latest_message_id' => DB::raw(
+                '(SELECT MAX(id) FROM messages WHERE messages.to_client_id = message_receipts.client_id)'
+            ),
+            'first_unacked_message_id' => DB::raw(
+                '(SELECT MIN(id) FROM messages WHERE messages.to_client_id = message_receipts.client_id'
+                .' AND messages.id > COALESCE(message_receipts.last_acked_message_id, 0))'
+            ),
+        ]);
+    }
+
+    public function down(): void
+    {
+        Schema::table('message_receipts', function (Blueprint $table) {
+            $table->dropIndex(['first_unacked_message_id']);
+            $table->dropColumn(['latest_message_id', 'first_unacked_message_id']);
+        });
+    }
+};
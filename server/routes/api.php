@@ -3,10 +3,14 @@
 use App\Http\Controllers\AckMessagesController;
 use App\Http\Controllers\ClientMessageController;
 use App\Http\Controllers\ClientRegistrationController;
+use App\Http\Controllers\FastForwardMessagesController;
 use App\Http\Controllers\MessagePublishController;
 use App\Http\Controllers\OperatorClientsController;
 use App\Http\Controllers\OperatorClientMessagesController;
+use App\Http\Controllers\OperatorMessageFeedController;
+use App\Http\Controllers\OperatorStatsController;
 use App\Http\Controllers\PollMessagesController;
+use App\Http\Middleware\CompressJsonResponse;
 use Illuminate\Support\Facades\Route;
 
 Route::prefix('v1')->group(function () {
@@ -14,14 +18,18 @@ Route::prefix('v1')->group(function () {
 
     Route::post('/messages/publish', MessagePublishController::class);
 
-    Route::middleware([\App\Http\Middleware\OperatorTokenAuth::class])->prefix('operators')->group(function () {
+    Route::middleware([\App\Http\Middleware\OperatorTokenAuth::class, CompressJsonResponse::class])->prefix('operators')->group(function () {
         Route::get('/clients', [OperatorClientsController::class, 'index']);
         Route::get('/clients/{client}/messages', [OperatorClientMessagesController::class, 'index']);
+        Route::match(['get', 'post'], '/messages', [OperatorMessageFeedController::class, 'index']);
+        Route::get('/stats', [OperatorStatsController::class, 'index']);
     });
 
     Route::middleware(['throttle:api', \App\Http\Middleware\ClientTokenAuth::class])->group(function () {
         Route::post('/messages/send', [ClientMessageController::class, 'send']);
-        Route::get('/messages/poll', PollMessagesController::class)->middleware('throttle:poll');
+        Route::post('/messages/send-batch', [ClientMessageController::class, 'sendBatch']);
+        Route::get('/messages/poll', PollMessagesController::class)->middleware(['throttle:poll', CompressJsonResponse::class]);
         Route::post('/messages/ack', AckMessagesController::class);
+        Route::post('/messages/fast-forward', FastForwardMessagesController::class);
     });
 });
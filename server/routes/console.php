@@ -1,8 +1,66 @@
 <?php
 
+use App\Http\Controllers\PollMessagesController;
+use App\Services\LastSeenBuffer;
+use App\Services\MessagePruner;
 use Illuminate\Foundation\Inspiring;
 use Illuminate\Support\Facades\Artisan;
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Facades\Schedule;
 
 Artisan::command('inspire', function () {
     $this->comment(Inspiring::quote());
 })->purpose('Display an inspiring quote');
+
+Artisan::command('messaging:poll-interval {seconds? : Suggested delay between client polls} {--clear : Fall back to the configured default}', function () {
+    if ($this->option('clear')) {
+        Cache::forget(PollMessagesController::POLL_INTERVAL_CACHE_KEY);
+        $this->info('Poll interval hint cleared.');
+
+        return;
+    }
+
+    $seconds = $this->argument('seconds');
+    if ($seconds === null || !ctype_digit((string) $seconds)) {
+        $current = Cache::get(PollMessagesController::POLL_INTERVAL_CACHE_KEY, config('messaging.poll_interval_hint'));
+        $this->line('Current poll interval hint: '.($current ?? 'none'));
+
+        return;
+    }
+
+    Cache::forever(PollMessagesController::POLL_INTERVAL_CACHE_KEY, (int) $seconds);
+    $this->info("Clients will be asked to poll every {$seconds}s.");
+})->purpose('Set the X-Poll-Interval hint returned to polling clients');
+
+Artisan::command('clients:flush-last-seen', function (LastSeenBuffer $buffer) {
+    $started = microtime(true);
+    $count = $buffer->flush();
+    $this->info(sprintf('Flushed last_seen_at for %d client(s) in %.1fms.', $count, (microtime(true) - $started) * 1000));
+})->purpose('Write buffered client heartbeats to clients.last_seen_at');
+
+Artisan::command('messages:prune {--dry-run : Count what would be deleted without deleting anything} {--max-seconds= : Stop starting new batches after this many seconds}', function (MessagePruner $pruner) {
+    $dryRun = (bool) $this->option('dry-run');
+    $maxSeconds = $this->option('max-seconds');
+
+    $totals = $pruner->prune($dryRun, $maxSeconds !== null ? (float) $maxSeconds : null, function (array $totals) {
+        if ($this->getOutput()->isVerbose()) {
+            $this->line(sprintf('Batch %d: %d row(s) so far, %.0f rows/sec.', $totals['batches'], $totals['deleted'], $totals['deleted'] / max($totals['seconds'], 0.001)));
+        }
+    });
+
+    $this->info(sprintf(
+        '%s %d message(s) in %d batch(es) in %.1fs (%.0f rows/sec).',
+        $dryRun ? 'Would delete' : 'Deleted',
+        $totals['deleted'],
+        $totals['batches'],
+        $totals['seconds'],
+        $totals['deleted'] / max($totals['seconds'], 0.001)
+    ));
+
+    if ($totals['archive'] !== null) {
+        $this->line("Archived {$totals['archived']} row(s) to {$totals['archive']}.");
+    }
+})->purpose('Delete acked and expired messages according to the retention policy');
+
+Schedule::command('clients:flush-last-seen')->everyMinute()->withoutOverlapping();
+Schedule::command('messages:prune --max-seconds=600')->hourly()->withoutOverlapping();
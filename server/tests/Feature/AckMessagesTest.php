@@ -3,6 +3,7 @@
 namespace Tests\Feature;
 
 use App\Models\Client;
+use App\Models\Message;
 use App\Models\MessageReceipt;
 use Illuminate\Support\Facades\Hash;
 use Tests\TestCase;
@@ -26,4 +27,72 @@ class AckMessagesTest extends TestCase
         $this->assertNotNull($receipt);
         $this->assertEquals(5, $receipt->last_acked_message_id);
     }
+
+    public function test_poll_with_ack_flag_advances_cursor(): void
+    {
+        $client = Client::factory()->create();
+        $apiToken = 'token';
+        $client->api_token_hash = Hash::make($apiToken);
+        $client->save();
+
+        $headers = [
+            'Authorization' => 'Bearer '.$apiToken,
+            'X-Client-Id' => $client->id,
+        ];
+
+        $this->withHeaders($headers)->getJson('/api/v1/messages/poll?cursor=7&ack=1')->assertNoContent();
+        $this->assertEquals(7, MessageReceipt::find($client->id)->last_acked_message_id);
+
+        // A stale cursor must never move the receipt backwards.
+        $this->withHeaders($headers)->getJson('/api/v1/messages/poll?cursor=3&ack=1')->assertNoContent();
+        $this->assertEquals(7, MessageReceipt::find($client->id)->last_acked_message_id);
+    }
+
+    public function test_poll_without_ack_flag_leaves_cursor_untouched(): void
+    {
+        $client = Client::factory()->create();
+        $apiToken = 'token';
+        $client->api_token_hash = Hash::make($apiToken);
+        $client->save();
+
+        $this->withHeaders([
+            'Authorization' => 'Bearer '.$apiToken,
+            'X-Client-Id' => $client->id,
+        ])->getJson('/api/v1/messages/poll?cursor=7')->assertNoContent();
+
+        $this->assertNull(MessageReceipt::find($client->id));
+    }
+
+    public function test_fast_forward_acks_latest_message(): void
+    {
+        $client = Client::factory()->create();
+        $other = Client::factory()->create();
+        $client->api_token_hash = Hash::make('token');
+        $client->save();
+
+        $ids = [];
+        foreach ([$client, $client, $other] as $recipient) {
+            $ids[] = Message::create([
+                'from_client_id' => null,
+                'to_client_id' => $recipient->id,
+                'type' => 'event',
+                'ciphertext' => base64_encode('cipher'),
+                'nonce' => base64_encode('nonce'),
+                'tag' => base64_encode('tag'),
+                'created_at' => now(),
+            ])->id;
+        }
+
+        $headers = [
+            'Authorization' => 'Bearer token',
+            'X-Client-Id' => $client->id,
+        ];
+
+        $this->withHeaders($headers)->postJson('/api/v1/messages/fast-forward')
+            ->assertOk()
+            ->assertJsonPath('last_acked_message_id', $ids[1]);
+        $this->assertEquals($ids[1], MessageReceipt::find($client->id)->last_acked_message_id);
+
+        $this->withHeaders($headers)->getJson('/api/v1/messages/poll')->assertNoContent();
+    }
 }
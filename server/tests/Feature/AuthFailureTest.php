@@ -3,6 +3,9 @@
 namespace Tests\Feature;
 
 use App\Models\Client;
+use App\Services\ClientAuthCache;
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Facades\DB;
 use Illuminate\Support\Facades\Hash;
 use Tests\TestCase;
 
@@ -27,4 +30,108 @@ class AuthFailureTest extends TestCase
 
         $response->assertStatus(401);
     }
+
+    public function test_cached_token_does_not_accept_other_tokens(): void
+    {
+        $client = Client::factory()->create();
+        $client->api_token_hash = Hash::make('expected');
+        $client->save();
+
+        $this->withHeaders([
+            'Authorization' => 'Bearer expected',
+            'X-Client-Id' => $client->id,
+        ])->getJson('/api/v1/messages/poll')->assertNoContent();
+
+        $this->withHeaders([
+            'Authorization' => 'Bearer wrong',
+            'X-Client-Id' => $client->id,
+        ])->getJson('/api/v1/messages/poll')->assertStatus(401);
+    }
+
+    public function test_rotated_token_is_not_served_from_cache(): void
+    {
+        $client = Client::factory()->create();
+        $client->api_token_hash = Hash::make('old-token');
+        $client->save();
+
+        $this->withHeaders([
+            'Authorization' => 'Bearer old-token',
+            'X-Client-Id' => $client->id,
+        ])->getJson('/api/v1/messages/poll')->assertNoContent();
+
+        $client->api_token_hash = Hash::make('new-token');
+        $client->save();
+
+        $this->withHeaders([
+            'Authorization' => 'Bearer old-token',
+            'X-Client-Id' => $client->id,
+        ])->getJson('/api/v1/messages/poll')->assertStatus(401);
+    }
+
+    public function test_cache_entry_from_before_rotation_is_not_trusted(): void
+    {
+        $client = Client::factory()->create();
+        $client->api_token_hash = Hash::make('old-token');
+        $client->save();
+
+        $this->withHeaders([
+            'Authorization' => 'Bearer old-token',
+            'X-Client-Id' => $client->id,
+        ])->getJson('/api/v1/messages/poll')->assertNoContent();
+
+        $stale = Cache::get('auth:client:'.$client->id);
+
+        $client->api_token_hash = Hash::make('new-token');
+        $client->save();
+
+        // A request that verified the old token before the rotation writes its entry afterwards.
+        Cache::put('auth:client:'.$client->id, $stale, 60);
+
+        $this->withHeaders([
+            'Authorization' => 'Bearer old-token',
+            'X-Client-Id' => $client->id,
+        ])->getJson('/api/v1/messages/poll')->assertStatus(401);
+
+        $this->withHeaders([
+            'Authorization' => 'Bearer new-token',
+            'X-Client-Id' => $client->id,
+        ])->getJson('/api/v1/messages/poll')->assertNoContent();
+    }
+
+    public function test_cache_holds_no_client_attributes(): void
+    {
+        $client = Client::factory()->create();
+        $client->api_token_hash = Hash::make('token');
+        $client->save();
+
+        $this->withHeaders([
+            'Authorization' => 'Bearer token',
+            'X-Client-Id' => $client->id,
+        ])->getJson('/api/v1/messages/poll')->assertNoContent();
+
+        $this->assertSame(['digest', 'version'], array_keys(Cache::get('auth:client:'.$client->id)));
+    }
+
+    public function test_cached_token_is_verified_without_reading_the_client(): void
+    {
+        $client = Client::factory()->create();
+        $client->api_token_hash = Hash::make('token');
+        $client->save();
+
+        $headers = [
+            'Authorization' => 'Bearer token',
+            'X-Client-Id' => $client->id,
+        ];
+        $this->withHeaders($headers)->getJson('/api/v1/messages/poll')->assertNoContent();
+
+        $queries = [];
+        DB::listen(function ($query) use (&$queries) {
+            $queries[] = $query->sql;
+        });
+
+        $resolved = app(ClientAuthCache::class)->resolve($client->id, 'token');
+
+        $this->assertSame($client->id, $resolved->id);
+        $this->assertSame([], $queries);
+    }
 }
@@ -0,0 +1,71 @@
+<?php
+
+namespace Tests\Feature;
+
+use App\Models\Client;
+use App\Services\ClientKeyProvider;
+use Illuminate\Support\Facades\Crypt;
+use Tests\TestCase;
+
+class ClientKeyProviderTest extends TestCase
+{
+    public function test_keys_are_decrypted_once_per_client(): void
+    {
+        $keys = new ClientKeyProvider();
+        $client = Client::factory()->create();
+
+        $first = $keys->forClient($client);
+        $second = $keys->forClient($client);
+
+        $this->assertSame(Crypt::decryptString($client->encryption_key_encrypted), $first);
+        $this->assertSame($first, $second);
+        $this->assertSame(1, $keys->stats()['hits']);
+        $this->assertSame(1, $keys->stats()['misses']);
+        $this->assertSame(0.5, $keys->stats()['hit_rate']);
+    }
+
+    public function test_rotated_key_is_not_served_from_cache(): void
+    {
+        $keys = new ClientKeyProvider();
+        $client = Client::factory()->create();
+        $keys->forClient($client);
+
+        $client->update(['encryption_key_encrypted' => Crypt::encryptString('rotated')]);
+
+        $this->assertSame('rotated', $keys->forClient($client));
+    }
+
+    public function test_least_recently_used_key_is_evicted(): void
+    {
+        config(['messaging.key_cache_size' => 2]);
+        $keys = new ClientKeyProvider();
+        [$a, $b, $c] = Client::factory()->count(3)->create()->all();
+
+        $keys->forClient($a);
+        $keys->forClient($b);
+        $keys->forClient($a);
+        $keys->forClient($c);
+
+        $this->assertSame(1, $keys->stats()['evictions']);
+        $keys->forClient($a);
+        $this->assertSame(2, $keys->stats()['hits']);
+        $keys->forClient($b);
+        $this->assertSame(4, $keys->stats()['misses']);
+    }
+
+    public function test_reregistration_with_rotation_invalidates_cached_key(): void
+    {
+        $keys = $this->app->make(ClientKeyProvider::class);
+        $client = Client::factory()->create([
+            'fingerprint' => 'rotating-host',
+            'api_token_encrypted' => 'not-decryptable',
+        ]);
+        $keys->forClient($client);
+
+        $response = $this->postJson('/api/v1/clients/register', ['fingerprint' => 'rotating-host'])
+            ->assertOk();
+
+        $this->assertSame(0, $keys->stats()['size']);
+        $this->assertSame($response->json('personal_token'), $keys->forClient($client->fresh()));
+    }
+}
@@ -0,0 +1,88 @@
+<?php
+
+namespace Tests\Feature;
+
+use App\Models\Client;
+use App\Models\Message;
+use App\Services\EncryptionService;
+use Illuminate\Support\Carbon;
+use Illuminate\Support\Facades\Crypt;
+use Illuminate\Support\Facades\Hash;
+use Tests\TestCase;
+
+class ClientSendBatchTest extends TestCase
+{
+    public function test_batch_is_stored_with_one_request(): void
+    {
+        [$client, $key, $headers] = $this->clientWithKey();
+        $encryption = new EncryptionService();
+
+        $envelopes = [];
+        foreach (range(1, 3) as $i) {
+            $aad = ['from' => $client->id, 'ts' => now()->toIso8601String()];
+            $envelopes[] = $encryption->encrypt($key, ['type' => 'status', 'payload' => ['n' => $i]], $aad);
+        }
+
+        $this->withHeaders($headers)
+            ->postJson('/api/v1/messages/send-batch', ['messages' => $envelopes])
+            ->assertOk()
+            ->assertJsonPath('accepted', 3);
+
+        $stored = Message::where('to_client_id', $client->id)->orderBy('id')->get();
+        $this->assertCount(3, $stored);
+
+        foreach ($stored as $i => $message) {
+            $payload = $encryption->decrypt($key, $message->ciphertext, $message->nonce, $message->tag, [
+                'from' => $client->id,
+                'ts' => Carbon::parse($message->created_at)->toIso8601String(),
+            ]);
+
+            $this->assertSame($i + 1, $payload['payload']['n']);
+            $this->assertSame('status', $message->type);
+        }
+    }
+
+    public function test_batch_with_undecryptable_envelope_stores_nothing(): void
+    {
+        [$client, $key, $headers] = $this->clientWithKey();
+        $encryption = new EncryptionService();
+
+        $good = $encryption->encrypt($key, ['type' => 'status'], ['from' => $client->id]);
+        $bad = $encryption->encrypt(base64_encode(random_bytes(32)), ['type' => 'status'], ['from' => $client->id]);
+
+        $this->withHeaders($headers)
+            ->postJson('/api/v1/messages/send-batch', ['messages' => [$good, $bad]])
+            ->assertStatus(422)
+            ->assertJsonPath('index', 1);
+
+        $this->assertSame(0, Message::count());
+    }
+
+    public function test_send_after_cached_authentication_loads_the_key(): void
+    {
+        [$client, $key, $headers] = $this->clientWithKey();
+        $encryption = new EncryptionService();
+
+        // The first request caches the token; the second is authenticated without reading the row.
+        foreach (range(1, 2) as $i) {
+            $envelope = $encryption->encrypt($key, ['type' => 'status', 'payload' => ['n' => $i]], ['from' => $client->id]);
+            $this->withHeaders($headers)
+                ->postJson('/api/v1/messages/send', $envelope)
+                ->assertOk()
+                ->assertJsonPath('status', 'accepted');
+        }
+    }
+
+    private function clientWithKey(): array
+    {
+        $client = Client::factory()->create();
+        $client->api_token_hash = Hash::make('token');
+        $client->save();
+
+        return [
+            $client,
+            Crypt::decryptString($client->encryption_key_encrypted),
+            ['Authorization' => 'Bearer token', 'X-Client-Id' => $client->id],
+        ];
+    }
+}
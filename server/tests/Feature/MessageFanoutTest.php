@@ -0,0 +1,150 @@
+<?php
+
+namespace Tests\Feature;
+
+use App\Jobs\MessageFanoutJob;
+use App\Models\Client;
+use App\Models\Message;
+use App\Services\EncryptionService;
+use Illuminate\Support\Carbon;
+use Illuminate\Support\Facades\Crypt;
+use Illuminate\Support\Facades\DB;
+use Illuminate\Support\Facades\Hash;
+use Illuminate\Support\Facades\Queue;
+use Illuminate\Support\Str;
+use PHPUnit\Framework\Attributes\Group;
+use Tests\TestCase;
+
+class MessageFanoutTest extends TestCase
+{
+    public function test_fanout_encrypts_for_each_recipient(): void
+    {
+        $clients = Client::factory()->count(3)->create();
+
+        MessageFanoutJob::dispatchSync(
+            [...$clients->pluck('id')->all(), (string) Str::uuid()],
+            null,
+            'event',
+            ['hello' => 'world']
+        );
+
+        $this->assertSame(3, Message::count());
+
+        $encryption = new EncryptionService();
+        foreach ($clients as $client) {
+            $message = Message::where('to_client_id', $client->id)->sole();
+            $payload = $encryption->decrypt(
+                Crypt::decryptString($client->encryption_key_encrypted),
+                $message->ciphertext,
+                $message->nonce,
+                $message->tag,
+                ['to' => $client->id, 'ts' => Carbon::parse($message->created_at)->toIso8601String()]
+            );
+
+            $this->assertSame(['hello' => 'world'], $payload['payload']);
+            $this->assertSame('event', $payload['type']);
+        }
+    }
+
+    public function test_fanout_to_the_sender_is_sealed_with_the_from_aad(): void
+    {
+        [$sender, $other] = Client::factory()->count(2)->create();
+
+        MessageFanoutJob::dispatchSync([$sender->id, $other->id], $sender->id, 'chat', ['n' => 1]);
+
+        $encryption = new EncryptionService();
+        foreach ([[$sender, 'from'], [$other, 'to']] as [$client, $direction]) {
+            $message = Message::where('to_client_id', $client->id)->sole();
+            $payload = $encryption->decrypt(
+                Crypt::decryptString($client->encryption_key_encrypted),
+                $message->ciphertext,
+                $message->nonce,
+                $message->tag,
+                [$direction => $client->id, 'ts' => Carbon::parse($message->created_at)->toIso8601String()]
+            );
+
+            $this->assertSame(['n' => 1], $payload['payload']);
+        }
+    }
+
+    public function test_publish_rejects_invalid_recipient_ids(): void
+    {
+        Queue::fake();
+
+        $this->withHeaders(['X-Admin-Token' => env('ADMIN_TOKEN')])
+            ->postJson('/api/v1/messages/publish', [
+                'to_client_ids' => [(string) Str::uuid(), 'not-a-uuid'],
+                'type' => 'event',
+                'payload' => ['message' => 'hi'],
+            ])
+            ->assertUnprocessable()
+            ->assertJsonValidationErrors('to_client_ids.1');
+
+        Queue::assertNothingPushed();
+    }
+
+    public function test_publish_queues_each_recipient_once(): void
+    {
+        Queue::fake();
+        config(['messaging.fanout_chunk_size' => 2]);
+        $ids = [(string) Str::uuid(), (string) Str::uuid(), (string) Str::uuid()];
+
+        $this->withHeaders(['X-Admin-Token' => env('ADMIN_TOKEN')])
+            ->postJson('/api/v1/messages/publish', [
+                'to_client_ids' => [...$ids, $ids[0]],
+                'type' => 'event',
+                'payload' => ['message' => 'hi'],
+            ])
+            ->assertOk()
+            ->assertJsonPath('queued', 3);
+
+        Queue::assertPushed(MessageFanoutJob::class, 2);
+    }
+
+    #[Group('benchmark')]
+    public function test_publish_to_ten_thousand_recipients(): void
+    {
+        $recipients = 10000;
+        $apiTokenHash = Hash::make('unused');
+        $encryptedKey = Crypt::encryptString(base64_encode(random_bytes(32)));
+        $now = now();
+
+        $ids = [];
+        foreach (array_chunk(range(1, $recipients), 500) as $chunk) {
+            $rows = [];
+            foreach ($chunk as $_) {
+                $id = (string) Str::uuid();
+                $ids[] = $id;
+                $rows[] = [
+                    'id' => $id,
+                    'api_token_hash' => $apiTokenHash,
+                    'encryption_key_encrypted' => $encryptedKey,
+                    'created_at' => $now,
+                    'updated_at' => $now,
+                ];
+            }
+            DB::table('clients')->insert($rows);
+        }
+
+        $started = microtime(true);
+
+        $this->withHeaders(['X-Admin-Token' => env('ADMIN_TOKEN')])
+            ->postJson('/api/v1/messages/publish', [
+                'to_client_ids' => $ids,
+                'type' => 'event',
+                'payload' => ['message' => 'broadcast'],
+            ])
+            ->assertOk()
+            ->assertJsonPath('queued', $recipients);
+
+        $elapsed = microtime(true) - $started;
+
+        $this->assertSame($recipients, Message::count());
+        fwrite(STDERR, sprintf(
+            "\nFan-out: %d messages in %.2fs (%.0f messages/sec)\n",
+            $recipients,
+            $elapsed,
+            $recipients / max($elapsed, 0.001)
+        ));
+    }
+}
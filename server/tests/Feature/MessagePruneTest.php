@@ -0,0 +1,139 @@
+<?php
+
+namespace Tests\Feature;
+
+use App\Models\Client;
+use App\Models\Message;
+use App\Models\MessageReceipt;
+use App\Services\MessagePruner;
+use Illuminate\Support\Facades\Date;
+use Tests\TestCase;
+
+class MessagePruneTest extends TestCase
+{
+    /**
+     * Stores, oldest first: an unacked message past the hard TTL, a self-addressed
+     * acked one within its own TTL, an acked one past the grace period, an unacked
+     * one, and an acked one still inside the grace period.
+     *
+     * @return array<string, Message>
+     */
+    private function seed(): array
+    {
+        config([
+            'messaging.retention_acked_grace' => 3600,
+            'messaging.retention_ttl' => 10 * 86400,
+            'messaging.retention_self_ttl' => 20 * 86400,
+        ]);
+        $now = Date::create(2024, 1, 10, 12, 0, 0);
+        Date::setTestNow($now);
+
+        $acking = Client::factory()->create();
+        $silent = Client::factory()->create();
+        $store = fn (Client $to, $createdAt, ?Client $from = null) => Message::create([
+            'from_client_id' => $from?->id,
+            'to_client_id' => $to->id,
+            'type' => 'event',
+            'ciphertext' => base64_encode('cipher'),
+            'nonce' => base64_encode('nonce'),
+            'tag' => base64_encode('tag'),
+            'created_at' => $createdAt,
+        ]);
+
+        $messages = [
+            'expired' => $store($silent, $now->copy()->subDays(15)),
+            'self' => $store($acking, $now->copy()->subDays(15), $acking),
+            'acked' => $store($acking, $now->copy()->subDays(2)),
+            'unacked' => $store($silent, $now->copy()->subDays(2)),
+            'recent' => $store($acking, $now->copy()->subMinutes(30)),
+        ];
+        MessageReceipt::advance($acking->id, $messages['recent']->id);
+
+        return $messages;
+    }
+
+    public function test_prune_applies_receipt_grace_and_ttl_policies(): void
+    {
+        $messages = $this->seed();
+        config(['messaging.retention_batch_size' => 2]);
+
+        $this->artisan('messages:prune')
+            ->expectsOutputToContain('Deleted 2 message(s)')
+            ->assertSuccessful();
+
+        $this->assertEqualsCanonicalizing(
+            [$messages['self']->id, $messages['unacked']->id, $messages['recent']->id],
+            Message::pluck('id')->all()
+        );
+    }
+
+    public function test_prune_moves_the_oldest_unacked_pointer_past_expired_messages(): void
+    {
+        $messages = $this->seed();
+        $silent = $messages['expired']->to_client_id;
+        $this->assertSame($messages['expired']->id, MessageReceipt::find($silent)->first_unacked_message_id);
+
+        $this->artisan('messages:prune')->assertSuccessful();
+
+        $this->assertSame($messages['unacked']->id, MessageReceipt::find($silent)->first_unacked_message_id);
+    }
+
+    public function test_self_addressed_messages_follow_their_own_ttl(): void
+    {
+        $messages = $this->seed();
+        config(['messaging.retention_self_ttl' => 7 * 86400]);
+
+        $this->artisan('messages:prune')->assertSuccessful();
+
+        $this->assertFalse(Message::whereKey($messages['self']->id)->exists());
+        $this->assertTrue(Message::whereKey($messages['unacked']->id)->exists());
+    }
+
+    public function test_dry_run_deletes_nothing(): void
+    {
+        $this->seed();
+
+        $this->artisan('messages:prune --dry-run')
+            ->expectsOutputToContain('Would delete 2 message(s)')
+            ->assertSuccessful();
+
+        $this->assertSame(5, Message::count());
+    }
+
+    public function test_pruned_rows_are_archived_as_compressed_jsonl(): void
+    {
+        $messages = $this->seed();
+        $directory = sys_get_temp_dir().'/prune-'.uniqid();
+        config(['messaging.retention_archive_path' => $directory]);
+
+        $this->artisan('messages:prune')->assertSuccessful();
+
+        $files = glob($directory.'/messages-*.jsonl.gz');
+        $this->assertCount(1, $files);
+        $rows = array_map(fn ($line) => json_decode($line, true), array_filter(explode("\n", gzdecode(file_get_contents($files[0])))));
+        $this->assertSame([$messages['expired']->id, $messages['acked']->id], array_column($rows, 'id'));
+        $this->assertSame(base64_encode('cipher'), $rows[0]['ciphertext']);
+
+        array_map('unlink', $files);
+        rmdir($directory);
+    }
+
+    public function test_archive_is_readable_before_it_is_closed(): void
+    {
+        $messages = $this->seed();
+        $directory = sys_get_temp_dir().'/prune-'.uniqid();
+        config(['messaging.retention_archive_path' => $directory]);
+
+        // Read the archive while the pruner still holds it open, as a crash right after the DELETE would leave it.
+        $seen = null;
+        app(MessagePruner::class)->prune(progress: function (array $totals) use (&$seen) {
+            $seen ??= inflate_add(inflate_init(ZLIB_ENCODING_GZIP), file_get_contents($totals['archive']), ZLIB_SYNC_FLUSH);
+        });
+
+        $rows = array_map(fn ($line) => json_decode($line, true), array_filter(explode("\n", $seen)));
+        $this->assertSame([$messages['expired']->id, $messages['acked']->id], array_column($rows, 'id'));
+
+        array_map('unlink', glob($directory.'/messages-*.jsonl.gz'));
+        rmdir($directory);
+    }
+}
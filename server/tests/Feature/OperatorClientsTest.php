@@ -4,6 +4,7 @@ namespace Tests\Feature;
 
 use App\Models\Client;
 use Illuminate\Support\Facades\Date;
+use Illuminate\Support\Facades\Hash;
 use Tests\TestCase;
 
 class OperatorClientsTest extends TestCase
@@ -47,4 +48,103 @@ class OperatorClientsTest extends TestCase
 
         $response->assertForbidden();
     }
+
+    public function test_buffered_heartbeats_are_flushed_before_listing(): void
+    {
+        config(['operators.tokens' => 'secret-token']);
+
+        $client = Client::factory()->create(['last_seen_at' => Date::now()->subMinutes(5)]);
+        $client->api_token_hash = Hash::make('token');
+        $client->save();
+
+        $this->withHeaders([
+            'Authorization' => 'Bearer token',
+            'X-Client-Id' => $client->id,
+        ])->getJson('/api/v1/messages/poll')->assertNoContent();
+
+        $response = $this->withHeaders([
+            'X-Operator-Token' => 'secret-token',
+        ])->getJson('/api/v1/operators/clients');
+
+        $response->assertOk();
+        $response->assertJsonFragment(['id' => $client->id, 'status' => 'online']);
+    }
+
+    public function test_listing_is_keyset_paginated(): void
+    {
+        config(['operators.tokens' => 'secret-token']);
+
+        $clients = collect(range(1, 5))->map(fn (int $i) => Client::factory()->create([
+            'created_at' => Date::now()->subMinutes(10 - $i),
+        ]));
+
+        $seen = [];
+        $cursor = null;
+        do {
+            $response = $this->withHeaders(['X-Operator-Token' => 'secret-token'])
+                ->getJson('/api/v1/operators/clients?'.http_build_query(array_filter(['limit' => 2, 'cursor' => $cursor])))
+                ->assertOk();
+
+            $this->assertLessThanOrEqual(2, count($response->json('clients')));
+            $seen = array_merge($seen, array_column($response->json('clients'), 'id'));
+            $cursor = $response->json('next_cursor');
+        } while ($cursor !== null);
+
+        $this->assertSame($clients->pluck('id')->all(), $seen);
+    }
+
+    public function test_listing_filters_by_status_and_name_prefix(): void
+    {
+        config(['operators.tokens' => 'secret-token']);
+
+        $web = Client::factory()->create(['name' => 'web-1', 'last_seen_at' => Date::now()]);
+        $webOffline = Client::factory()->create(['name' => 'web-2', 'last_seen_at' => Date::now()->subMinutes(5)]);
+        $db = Client::factory()->create(['name' => 'db-1', 'last_seen_at' => Date::now()]);
+        $never = Client::factory()->create(['name' => 'web-3', 'last_seen_at' => null]);
+
+        $ids = fn (string $query) => array_column(
+            $this->withHeaders(['X-Operator-Token' => 'secret-token'])
+                ->getJson('/api/v1/operators/clients?'.$query)
+                ->assertOk()
+                ->json('clients'),
+            'id'
+        );
+
+        $this->assertEqualsCanonicalizing([$web->id, $db->id], $ids('status=online'));
+        $this->assertEqualsCanonicalizing([$webOffline->id, $never->id], $ids('status=offline'));
+        $this->assertEqualsCanonicalizing([$web->id, $webOffline->id, $never->id], $ids('name=web-'));
+        $this->assertSame([$web->id], $ids('name=web-&status=online'));
+    }
+
+    public function test_since_returns_only_clients_seen_or_registered_after_it(): void
+    {
+        config(['operators.tokens' => 'secret-token']);
+
+        Client::factory()->create([
+            'created_at' => Date::now()->subHour(),
+            'last_seen_at' => Date::now()->subMinutes(30),
+        ]);
+        $active = Client::factory()->create([
+            'created_at' => Date::now()->subHour(),
+            'last_seen_at' => Date::now()->subMinute(),
+        ]);
+        $new = Client::factory()->create(['created_at' => Date::now()]);
+
+        $response = $this->withHeaders(['X-Operator-Token' => 'secret-token'])
+            ->getJson('/api/v1/operators/clients?'.http_build_query(['since' => Date::now()->subMinutes(10)->toIso8601String()]))
+            ->assertOk();
+
+        $this->assertEqualsCanonicalizing([$active->id, $new->id], array_column($response->json('clients'), 'id'));
+        $this->assertNotNull($response->json('next_since'));
+        $this->assertSame(120, $response->json('online_window'));
+    }
+
+    public function test_invalid_cursor_is_rejected(): void
+    {
+        config(['operators.tokens' => 'secret-token']);
+
+        $this->withHeaders(['X-Operator-Token' => 'secret-token'])
+            ->getJson('/api/v1/operators/clients?cursor=not-a-cursor')
+            ->assertStatus(422);
+    }
 }
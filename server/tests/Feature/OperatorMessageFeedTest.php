@@ -0,0 +1,103 @@
+<?php
+
+namespace Tests\Feature;
+
+use App\Models\Client;
+use App\Models\Message;
+use App\Services\EncryptionService;
+use Illuminate\Support\Facades\Crypt;
+use Illuminate\Support\Facades\Date;
+use Tests\TestCase;
+
+class OperatorMessageFeedTest extends TestCase
+{
+    private function storeMessage(Client $client, string $text): Message
+    {
+        $createdAt = Date::now();
+        $store = (new EncryptionService())->encrypt(Crypt::decryptString($client->encryption_key_encrypted), [
+            'type' => 'event',
+            'text' => $text,
+        ], [
+            'to' => $client->id,
+            'ts' => $createdAt->toIso8601String(),
+        ]);
+
+        return Message::create([
+            'from_client_id' => null,
+            'to_client_id' => $client->id,
+            'type' => 'event',
+            'ciphertext' => $store['ciphertext'],
+            'nonce' => $store['nonce'],
+            'tag' => $store['tag'],
+            'created_at' => $createdAt,
+        ]);
+    }
+
+    public function test_feed_pages_across_clients_in_id_order(): void
+    {
+        config(['operators.tokens' => 'secret-token']);
+
+        $first = Client::factory()->create();
+        $second = Client::factory()->create();
+        $ids = [];
+        foreach (['a', 'b', 'c'] as $text) {
+            $ids[] = $this->storeMessage($first, $text)->id;
+            $ids[] = $this->storeMessage($second, $text)->id;
+        }
+
+        $headers = ['X-Operator-Token' => 'secret-token'];
+        $page = $this->withHeaders($headers)->getJson('/api/v1/operators/messages?cursor=0&limit=4');
+
+        $page->assertOk();
+        $this->assertSame(array_slice($ids, 0, 4), array_column($page->json('messages'), 'id'));
+        $this->assertTrue($page->json('has_more'));
+        $this->assertSame('a', $page->json('messages.0.payload.text'));
+
+        $rest = $this->withHeaders($headers)->getJson('/api/v1/operators/messages?limit=4&cursor='.$page->json('next_cursor'));
+
+        $this->assertSame(array_slice($ids, 4), array_column($rest->json('messages'), 'id'));
+        $this->assertFalse($rest->json('has_more'));
+
+        $this->withHeaders($headers)
+            ->getJson('/api/v1/operators/messages?cursor='.$rest->json('next_cursor'))
+            ->assertNoContent();
+    }
+
+    public function test_feed_filters_by_client_ids(): void
+    {
+        config(['operators.tokens' => 'secret-token']);
+
+        $watched = Client::factory()->create();
+        $other = Client::factory()->create();
+        $this->storeMessage($other, 'ignored');
+        $kept = $this->storeMessage($watched, 'kept');
+
+        $response = $this->withHeaders(['X-Operator-Token' => 'secret-token'])
+            ->postJson('/api/v1/operators/messages', ['cursor' => 0, 'client_ids' => [$watched->id]]);
+
+        $response->assertOk();
+        $this->assertSame([$kept->id], array_column($response->json('messages'), 'id'));
+        $this->assertSame($watched->id, $response->json('messages.0.to_client_id'));
+
+        $this->withHeaders(['X-Operator-Token' => 'secret-token'])
+            ->getJson('/api/v1/operators/messages?cursor=0&client_ids='.$watched->id.','.$other->id)
+            ->assertJsonCount(2, 'messages');
+    }
+
+    public function test_feed_without_cursor_starts_at_the_tail(): void
+    {
+        config(['operators.tokens' => 'secret-token']);
+
+        $client = Client::factory()->create();
+        foreach (range(1, 5) as $n) {
+            $last = $this->storeMessage($client, (string) $n);
+        }
+
+        $response = $this->withHeaders(['X-Operator-Token' => 'secret-token'])
+            ->getJson('/api/v1/operators/messages?limit=2');
+
+        $response->assertOk();
+        $this->assertSame(['4', '5'], array_column(array_column($response->json('messages'), 'payload'), 'text'));
+        $this->assertSame($last->id, $response->json('next_cursor'));
+    }
+}
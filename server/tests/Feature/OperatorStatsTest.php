@@ -0,0 +1,159 @@
+<?php
+
+namespace Tests\Feature;
+
+use App\Models\Client;
+use App\Models\Message;
+use App\Models\MessageReceipt;
+use App\Services\FleetStats;
+use Illuminate\Support\Facades\Crypt;
+use Illuminate\Support\Facades\DB;
+use Illuminate\Support\Facades\Date;
+use Illuminate\Support\Facades\Hash;
+use Illuminate\Support\Str;
+use PHPUnit\Framework\Attributes\Group;
+use Tests\TestCase;
+
+class OperatorStatsTest extends TestCase
+{
+    private function storeMessage(Client $client, $createdAt): Message
+    {
+        return Message::create([
+            'from_client_id' => null,
+            'to_client_id' => $client->id,
+            'type' => 'event',
+            'ciphertext' => base64_encode('cipher'),
+            'nonce' => base64_encode('nonce'),
+            'tag' => base64_encode('tag'),
+            'created_at' => $createdAt,
+        ]);
+    }
+
+    public function test_stats_report_counts_histogram_and_backlog(): void
+    {
+        config(['operators.tokens' => 'secret-token', 'messaging.operator_stats_ttl' => 0]);
+        $now = Date::create(2024, 1, 1, 12, 0, 0);
+        Date::setTestNow($now);
+
+        $online = Client::factory()->create(['name' => 'online', 'last_seen_at' => $now->copy()->subSeconds(30)]);
+        $stale = Client::factory()->create(['name' => 'stale', 'last_seen_at' => $now->copy()->subHours(2)]);
+        $idle = Client::factory()->create(['name' => 'idle', 'last_seen_at' => $now->copy()->subDays(30)]);
+        Client::factory()->create(['last_seen_at' => null]);
+
+        // online: three messages, first acked -> depth 2, oldest unacked is the second.
+        $acked = $this->storeMessage($online, $now->copy()->subMinutes(10));
+        $oldestUnacked = $this->storeMessage($online, $now->copy()->subMinutes(5));
+        $this->storeMessage($online, $now->copy()->subMinute());
+        MessageReceipt::advance($online->id, $acked->id);
+
+        // stale: one message, never acked -> depth 1.
+        $this->storeMessage($stale, $now->copy()->subMinutes(2));
+
+        // idle: everything acked -> not pending.
+        MessageReceipt::advance($idle->id, $this->storeMessage($idle, $now->copy()->subMinutes(3))->id);
+
+        $response = $this->withHeaders(['X-Operator-Token' => 'secret-token'])->getJson('/api/v1/operators/stats');
+
+        $response->assertOk();
+        $response->assertJsonPath('clients', ['total' => 4, 'online' => 1, 'offline' => 3, 'never_seen' => 1]);
+        $histogram = collect($response->json('last_seen_age'));
+        $this->assertSame(1, $histogram->firstWhere('max_seconds', 60)['count']);
+        $this->assertSame(1, $histogram->firstWhere('max_seconds', 21600)['count']);
+        $this->assertSame(['max_seconds' => null, 'count' => 1], $histogram->last());
+        $this->assertSame(3, $histogram->sum('count'));
+
+        $response->assertJsonPath('backlog.clients', 2);
+        $response->assertJsonPath('backlog.messages', 3);
+        $response->assertJsonPath('backlog.max_depth', 2);
+        $response->assertJsonPath('backlog.oldest_unacked_age_seconds', 300);
+        $this->assertSame([$online->id, $stale->id], array_column($response->json('backlog.deepest'), 'client_id'));
+        $response->assertJsonPath('backlog.deepest.0.last_acked_message_id', $acked->id);
+        $this->assertTrue($oldestUnacked->created_at->equalTo(Date::parse($response->json('backlog.oldest_unacked_at'))));
+    }
+
+    public function test_backlog_follows_explicit_acks(): void
+    {
+        config(['operators.tokens' => 'secret-token', 'messaging.operator_stats_ttl' => 0]);
+        $client = Client::factory()->create();
+        $first = $this->storeMessage($client, now());
+        $second = $this->storeMessage($client, now());
+        $headers = ['X-Operator-Token' => 'secret-token'];
+
+        MessageReceipt::acknowledge($client->id, $second->id);
+        $this->withHeaders($headers)->getJson('/api/v1/operators/stats')->assertJsonPath('backlog.clients', 0);
+
+        // An explicit ack may move the receipt backwards.
+        MessageReceipt::acknowledge($client->id, $first->id);
+        $this->withHeaders($headers)->getJson('/api/v1/operators/stats')
+            ->assertJsonPath('backlog.clients', 1)
+            ->assertJsonPath('backlog.deepest.0.depth', 1)
+            ->assertJsonPath('backlog.deepest.0.last_acked_message_id', $first->id);
+    }
+
+    public function test_stats_are_cached_for_the_ttl(): void
+    {
+        config(['operators.tokens' => 'secret-token', 'messaging.operator_stats_ttl' => 60]);
+        $headers = ['X-Operator-Token' => 'secret-token'];
+
+        Client::factory()->create();
+        $this->withHeaders($headers)->getJson('/api/v1/operators/stats')->assertJsonPath('clients.total', 1);
+
+        Client::factory()->create();
+        $this->withHeaders($headers)->getJson('/api/v1/operators/stats')->assertJsonPath('clients.total', 1);
+    }
+
+    #[Group('benchmark')]
+    public function test_stats_over_one_hundred_thousand_clients(): void
+    {
+        config(['operators.tokens' => 'secret-token', 'messaging.operator_stats_ttl' => 0]);
+        $clients = 100000;
+        $apiTokenHash = Hash::make('unused');
+        $encryptedKey = Crypt::encryptString(base64_encode(random_bytes(32)));
+        $now = now();
+
+        foreach (array_chunk(range(1, $clients), 1000) as $chunk) {
+            $rows = [];
+            $messages = [];
+            $receipts = [];
+            foreach ($chunk as $n) {
+                $id = (string) Str::uuid();
+                $rows[] = [
+                    'id' => $id,
+                    'api_token_hash' => $apiTokenHash,
+                    'encryption_key_encrypted' => $encryptedKey,
+                    'last_seen_at' => $now->copy()->subSeconds($n * 7),
+                    'created_at' => $now,
+                    'updated_at' => $now,
+                ];
+                $messages[] = [
+                    'to_client_id' => $id,
+                    'type' => 'event',
+                    'ciphertext' => 'c',
+                    'nonce' => 'n',
+                    'tag' => 't',
+                    'created_at' => $now,
+                ];
+                if ($n % 2) {
+                    $receipts[] = ['client_id' => $id, 'last_acked_message_id' => 0, 'created_at' => $now, 'updated_at' => $now];
+                }
+            }
+            DB::table('clients')->insert($rows);
+            DB::table('message_receipts')->insert($receipts);
+            DB::table('messages')->insert($messages);
+            MessageReceipt::recordDelivered(array_column($rows, 'id'));
+        }
+
+        $this->withHeaders(['X-Operator-Token' => 'secret-token'])
+            ->getJson('/api/v1/operators/stats')
+            ->assertOk()
+            ->assertJsonPath('clients.total', $clients)
+            ->assertJsonPath('backlog.clients', $clients);
+
+        $started = microtime(true);
+        app(FleetStats::class)->compute();
+        $elapsed = microtime(true) - $started;
+
+        fwrite(STDERR, sprintf("\nFleet stats over %d clients: %.1fms uncached\n", $clients, $elapsed * 1000));
+        $this->assertLessThan(0.05, $elapsed, 'Uncached fleet stats should take under 50ms at 100k clients');
+    }
+}
@@ -0,0 +1,123 @@
+<?php
+
+namespace Tests\Feature;
+
+use App\Jobs\MessageFanoutJob;
+use App\Models\Client;
+use App\Models\Message;
+use App\Services\EncryptionService;
+use Illuminate\Support\Carbon;
+use Illuminate\Support\Facades\Crypt;
+use Illuminate\Support\Facades\Hash;
+use Tests\TestCase;
+
+class PayloadCompressionTest extends TestCase
+{
+    public function test_decrypts_envelope_compressed_by_python_client(): void
+    {
+        // Produced by client/crypto.py: zlib level 6, fixed key and nonce.
+        $payload = (new EncryptionService())->decrypt(
+            'AAECAwQFBgcICQoLDA0ODxAREhMUFRYXGBkaGxwdHh8=',
+            'P559Te9M7lPY88Wh+8SwQqmHVWXaM/Ow8Sip1K/DVpjLP4GqHUsUSTStk4nk6gU44ax27w==',
+            'AAECAwQFBgcICQoL',
+            'UUJCTExyiqsmL1BX63p9Gg==',
+            ['from' => 'c1', 'ts' => '2026-01-01T00:00:00+00:00'],
+            EncryptionService::ENCODING_ZLIB
+        );
+
+        $this->assertSame(['type' => 'report', 'payload' => ['rows' => array_fill(0, 5, 'row')]], $payload);
+    }
+
+    public function test_compressed_send_is_stored_and_polled_with_encoding(): void
+    {
+        config(['messaging.compress_types' => 'report', 'messaging.compress_threshold' => 64]);
+        [$client, $key, $headers] = $this->clientWithKey();
+        $body = ['type' => 'report', 'payload' => ['rows' => array_fill(0, 200, ['host' => 'web-1', 'ok' => true])]];
+
+        // Compress and encrypt the way the Python client does.
+        $iv = random_bytes(12);
+        $tag = '';
+        $aad = ['from' => $client->id, 'ts' => now()->toIso8601String()];
+        $cipher = openssl_encrypt(gzcompress(json_encode($body), 6), 'aes-256-gcm', base64_decode($key), OPENSSL_RAW_DATA, $iv, $tag, json_encode($aad, JSON_UNESCAPED_SLASHES), 16);
+
+        $this->withHeaders($headers)->postJson('/api/v1/messages/send', [
+            'ciphertext' => base64_encode($cipher),
+            'nonce' => base64_encode($iv),
+            'tag' => base64_encode($tag),
+            'aad' => $aad,
+            'encoding' => 'zlib',
+        ])->assertOk();
+
+        $message = Message::where('to_client_id', $client->id)->sole();
+        $this->assertSame('zlib', $message->encoding);
+        $this->assertLessThan(strlen(json_encode($body)), strlen(base64_decode($message->ciphertext)));
+
+        $polled = $this->withHeaders($headers)->getJson('/api/v1/messages/poll')->assertOk()->json('messages.0');
+        $this->assertSame('zlib', $polled['encoding']);
+
+        $payload = (new EncryptionService())->decrypt($key, $polled['ciphertext'], $polled['nonce'], $polled['tag'], [
+            'from' => $client->id,
+            'ts' => $polled['created_at'],
+        ], $polled['encoding']);
+        $this->assertSame($body, $payload);
+    }
+
+    public function test_only_allowlisted_types_over_threshold_are_compressed(): void
+    {
+        config(['messaging.compress_types' => 'report', 'messaging.compress_threshold' => 64]);
+        $client = Client::factory()->create();
+        $large = ['rows' => array_fill(0, 200, 'same row')];
+
+        MessageFanoutJob::dispatchSync([$client->id], null, 'report', $large);
+        MessageFanoutJob::dispatchSync([$client->id], null, 'report', ['small' => true]);
+        MessageFanoutJob::dispatchSync([$client->id], null, 'event', $large);
+
+        $messages = Message::orderBy('id')->get();
+        $this->assertSame(['zlib', null, null], $messages->pluck('encoding')->all());
+
+        $encryption = new EncryptionService();
+        $key = Crypt::decryptString($client->encryption_key_encrypted);
+        foreach ($messages as $message) {
+            $payload = $encryption->decrypt($key, $message->ciphertext, $message->nonce, $message->tag, [
+                'to' => $client->id,
+                'ts' => Carbon::parse($message->created_at)->toIso8601String(),
+            ], $message->encoding);
+            $this->assertSame($message->type, $payload['type']);
+        }
+        $this->assertSame($large, $payload['payload']);
+    }
+
+    public function test_poll_json_is_gzip_encoded_when_accepted(): void
+    {
+        config(['messaging.gzip_min_bytes' => 256]);
+        [$client, , $headers] = $this->clientWithKey();
+        MessageFanoutJob::dispatchSync([$client->id], null, 'event', ['text' => str_repeat('x', 1000)]);
+
+        $response = $this->withHeaders($headers + ['Accept-Encoding' => 'gzip'])->get('/api/v1/messages/poll');
+
+        $response->assertOk();
+        $response->assertHeader('Content-Encoding', 'gzip');
+        $this->assertContains('Accept-Encoding', $response->baseResponse->getVary());
+        $body = json_decode(gzdecode($response->getContent()), true);
+        $this->assertCount(1, $body['messages']);
+
+        // Without Accept-Encoding the body is plain JSON.
+        $this->withHeaders($headers)->getJson('/api/v1/messages/poll')
+            ->assertOk()
+            ->assertHeaderMissing('Content-Encoding')
+            ->assertJsonCount(1, 'messages');
+    }
+
+    private function clientWithKey(): array
+    {
+        $client = Client::factory()->create();
+        $client->api_token_hash = Hash::make('token');
+        $client->save();
+
+        return [
+            $client,
+            Crypt::decryptString($client->encryption_key_encrypted),
+            ['Authorization' => 'Bearer token', 'X-Client-Id' => $client->id],
+        ];
+    }
+}
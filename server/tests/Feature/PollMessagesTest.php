@@ -2,9 +2,16 @@
 
 namespace Tests\Feature;
 
+use App\Http\Controllers\PollMessagesController;
+use App\Jobs\MessageFanoutJob;
 use App\Models\Client;
 use App\Models\Message;
 use App\Models\MessageReceipt;
+use App\Services\BinaryPollFormat;
+use App\Services\LastSeenBuffer;
+use App\Services\MessageNotifier;
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Facades\DB;
 use Illuminate\Support\Facades\Hash;
 use Illuminate\Support\Facades\Date;
 use Tests\TestCase;
@@ -52,12 +59,41 @@ class PollMessagesTest extends TestCase
             'X-Client-Id' => $client->id,
         ])->getJson('/api/v1/messages/poll')->assertNoContent();
 
+        // Heartbeats are buffered in the cache and written in bulk.
+        $client->refresh();
+        $this->assertTrue($client->last_seen_at->equalTo($now->copy()->subMinutes(10)));
+
+        $this->assertGreaterThanOrEqual(1, app(LastSeenBuffer::class)->flush());
+
         $client->refresh();
         $this->assertTrue($client->last_seen_at->equalTo($now));
 
         Date::setTestNow();
     }
 
+    public function test_last_seen_flush_drains_every_queued_client_once(): void
+    {
+        $now = Date::create(2024, 1, 1, 12, 0, 0);
+        $clients = Client::factory()->count(3)->create(['last_seen_at' => $now->copy()->subHour()]);
+        $buffer = app(LastSeenBuffer::class);
+
+        foreach ($clients as $client) {
+            $buffer->touch($client->id, $now);
+            $buffer->touch($client->id, $now);
+        }
+
+        $this->assertSame(3, $buffer->flush());
+        $this->assertSame(0, $buffer->flush());
+        foreach ($clients as $client) {
+            $this->assertTrue($client->fresh()->last_seen_at->equalTo($now));
+        }
+
+        // A touch after a flush queues the client again.
+        $buffer->touch($clients[0]->id, $now->copy()->addMinute());
+        $this->assertSame(1, $buffer->flush());
+        $this->assertTrue($clients[0]->fresh()->last_seen_at->equalTo($now->copy()->addMinute()));
+    }
+
     public function test_poll_defaults_cursor_from_last_ack_when_missing(): void
     {
         $client = Client::factory()->create();
@@ -99,4 +135,265 @@ class PollMessagesTest extends TestCase
         $response->assertJsonCount(1, 'messages');
         $response->assertJsonPath('messages.0.id', $second->id);
     }
+
+    public function test_poll_reports_has_more_when_page_is_full(): void
+    {
+        $client = Client::factory()->create();
+        $apiToken = 'token';
+        $client->api_token_hash = Hash::make($apiToken);
+        $client->save();
+
+        $messages = collect(range(1, 3))->map(fn (int $i) => Message::create([
+            'from_client_id' => null,
+            'to_client_id' => $client->id,
+            'type' => 'event',
+            'ciphertext' => base64_encode('cipher-'.$i),
+            'nonce' => base64_encode('nonce-'.$i),
+            'tag' => base64_encode('tag-'.$i),
+            'created_at' => now(),
+        ]));
+
+        $headers = [
+            'Authorization' => 'Bearer '.$apiToken,
+            'X-Client-Id' => $client->id,
+        ];
+
+        $first = $this->withHeaders($headers)->getJson('/api/v1/messages/poll?limit=2');
+        $first->assertOk();
+        $first->assertJsonCount(2, 'messages');
+        $first->assertJsonPath('has_more', true);
+        $first->assertJsonPath('next_cursor', $messages[1]->id);
+
+        $second = $this->withHeaders($headers)->getJson('/api/v1/messages/poll?limit=2&cursor='.$messages[1]->id);
+        $second->assertOk();
+        $second->assertJsonCount(1, 'messages');
+        $second->assertJsonPath('has_more', false);
+    }
+
+    public function test_poll_page_size_is_capped_by_server(): void
+    {
+        config(['messaging.poll_max_page_size' => 2]);
+
+        $client = Client::factory()->create();
+        $apiToken = 'token';
+        $client->api_token_hash = Hash::make($apiToken);
+        $client->save();
+
+        foreach (range(1, 3) as $i) {
+            Message::create([
+                'from_client_id' => null,
+                'to_client_id' => $client->id,
+                'type' => 'event',
+                'ciphertext' => base64_encode('cipher-'.$i),
+                'nonce' => base64_encode('nonce-'.$i),
+                'tag' => base64_encode('tag-'.$i),
+                'created_at' => now(),
+            ]);
+        }
+
+        $response = $this->withHeaders([
+            'Authorization' => 'Bearer '.$apiToken,
+            'X-Client-Id' => $client->id,
+        ])->getJson('/api/v1/messages/poll?limit=1000');
+
+        $response->assertOk();
+        $response->assertJsonCount(2, 'messages');
+        $response->assertJsonPath('has_more', true);
+    }
+
+    public function test_poll_carries_server_interval_hint(): void
+    {
+        config(['messaging.poll_interval_hint' => 20]);
+
+        $client = Client::factory()->create();
+        $apiToken = 'token';
+        $client->api_token_hash = Hash::make($apiToken);
+        $client->save();
+
+        $headers = [
+            'Authorization' => 'Bearer '.$apiToken,
+            'X-Client-Id' => $client->id,
+        ];
+
+        $this->withHeaders($headers)->getJson('/api/v1/messages/poll')
+            ->assertNoContent()
+            ->assertHeader('X-Poll-Interval', '20');
+
+        Cache::forever(PollMessagesController::POLL_INTERVAL_CACHE_KEY, 90);
+
+        $this->withHeaders($headers)->getJson('/api/v1/messages/poll')
+            ->assertNoContent()
+            ->assertHeader('X-Poll-Interval', '90');
+
+        Cache::forget(PollMessagesController::POLL_INTERVAL_CACHE_KEY);
+    }
+
+    public function test_long_poll_returns_message_signalled_while_waiting(): void
+    {
+        $client = Client::factory()->create();
+        $apiToken = 'token';
+        $client->api_token_hash = Hash::make($apiToken);
+        $client->save();
+
+        // Stand-in notifier: the "wait" delivers a message and signals it.
+        $this->app->instance(MessageNotifier::class, new class extends MessageNotifier {
+            public function waitForChange(string $clientId, int $version, int $seconds): bool
+            {
+                Message::create([
+                    'from_client_id' => null,
+                    'to_client_id' => $clientId,
+                    'type' => 'event',
+                    'ciphertext' => base64_encode('cipher'),
+                    'nonce' => base64_encode('nonce'),
+                    'tag' => base64_encode('tag'),
+                    'created_at' => now(),
+                ]);
+
+                return true;
+            }
+        });
+
+        $response = $this->withHeaders([
+            'Authorization' => 'Bearer '.$apiToken,
+            'X-Client-Id' => $client->id,
+        ])->getJson('/api/v1/messages/poll?wait=10');
+
+        $response->assertOk();
+        $response->assertJsonCount(1, 'messages');
+        $response->assertHeader('X-Poll-Wait', '10');
+    }
+
+    public function test_long_poll_wait_is_capped_and_times_out_empty(): void
+    {
+        config(['messaging.poll_max_wait' => 1, 'messaging.poll_wait_tick_ms' => 50]);
+
+        $client = Client::factory()->create();
+        $apiToken = 'token';
+        $client->api_token_hash = Hash::make($apiToken);
+        $client->save();
+
+        $this->withHeaders([
+            'Authorization' => 'Bearer '.$apiToken,
+            'X-Client-Id' => $client->id,
+        ])->getJson('/api/v1/messages/poll?wait=60')
+            ->assertNoContent()
+            ->assertHeader('X-Poll-Wait', '1');
+    }
+
+    public function test_fanout_signals_recipients(): void
+    {
+        $client = Client::factory()->create();
+        $notifier = app(MessageNotifier::class);
+        $before = $notifier->version($client->id);
+
+        MessageFanoutJob::dispatchSync([$client->id], null, 'event', ['hello' => 'world']);
+
+        $this->assertSame($before + 1, $notifier->version($client->id));
+    }
+
+    public function test_idle_poll_runs_no_database_queries(): void
+    {
+        $client = Client::factory()->create();
+        $apiToken = 'token';
+        $client->api_token_hash = Hash::make($apiToken);
+        $client->save();
+
+        $headers = [
+            'Authorization' => 'Bearer '.$apiToken,
+            'X-Client-Id' => $client->id,
+        ];
+
+        // The first empty poll records the idle high-water mark.
+        $this->withHeaders($headers)->getJson('/api/v1/messages/poll')->assertNoContent();
+
+        $queries = [];
+        DB::listen(function ($query) use (&$queries) {
+            $queries[] = $query->sql;
+        });
+
+        $this->withHeaders($headers)->getJson('/api/v1/messages/poll')->assertNoContent();
+
+        // Token verification (digest and version) and heartbeats are cached too, so an idle poll is query-free.
+        $this->assertSame([], $queries);
+
+        // A new message bumps the signal, so the next poll goes back to the database.
+        MessageFanoutJob::dispatchSync([$client->id], null, 'event', ['hello' => 'world']);
+
+        $this->withHeaders($headers)->getJson('/api/v1/messages/poll')
+            ->assertOk()
+            ->assertJsonCount(1, 'messages');
+    }
+
+    public function test_poll_reports_aad_direction(): void
+    {
+        $client = Client::factory()->create();
+        $client->api_token_hash = Hash::make('token');
+        $client->save();
+
+        foreach ([null, $client->id] as $from) {
+            Message::create([
+                'from_client_id' => $from,
+                'to_client_id' => $client->id,
+                'type' => 'event',
+                'ciphertext' => base64_encode('cipher'),
+                'nonce' => base64_encode('nonce'),
+                'tag' => base64_encode('tag'),
+                'created_at' => now(),
+            ]);
+        }
+
+        $this->withHeaders([
+            'Authorization' => 'Bearer token',
+            'X-Client-Id' => $client->id,
+        ])->getJson('/api/v1/messages/poll')
+            ->assertOk()
+            ->assertJsonPath('messages.0.aad_direction', 'to')
+            ->assertJsonPath('messages.1.aad_direction', 'from')
+            ->assertJsonMissingPath('messages.0.from_client_id');
+    }
+
+    public function test_poll_returns_binary_frames_when_requested(): void
+    {
+        $client = Client::factory()->create();
+        $client->api_token_hash = Hash::make('token');
+        $client->save();
+
+        $message = Message::create([
+            'from_client_id' => $client->id,
+            'to_client_id' => $client->id,
+            'type' => 'event',
+            'ciphertext' => base64_encode('cipher'),
+            'nonce' => base64_encode(str_repeat('n', 12)),
+            'tag' => base64_encode(str_repeat('t', 16)),
+            'created_at' => now(),
+        ]);
+
+        $response = $this->withHeaders([
+            'Authorization' => 'Bearer token',
+            'X-Client-Id' => $client->id,
+            'Accept' => BinaryPollFormat::MEDIA_TYPE.', application/json;q=0.5',
+        ])->get('/api/v1/messages/poll');
+
+        $response->assertOk();
+        $response->assertHeader('Content-Type', BinaryPollFormat::MEDIA_TYPE);
+
+        $body = $response->getContent();
+        $this->assertSame('RAF1', substr($body, 0, 4));
+        $header = unpack('Cflags/Jnext/Ncount', $body, 4);
+        $this->assertSame(0, $header['flags']);
+        $this->assertSame($message->id, $header['next']);
+        $this->assertSame(1, $header['count']);
+
+        $frame = unpack('Nlength/Jid/Cflags/Cts_length', $body, 17);
+        $this->assertSame($message->id, $frame['id']);
+        $this->assertSame(1, $frame['flags']);
+        $this->assertStringEndsWith('cipher'.str_repeat('t', 16), $body);
+
+        // Clients that do not ask for frames (e.g. the browser client) keep getting JSON.
+        $this->withHeaders([
+            'Authorization' => 'Bearer token',
+            'X-Client-Id' => $client->id,
+            'Accept' => '*/*',
+        ])->get('/api/v1/messages/poll')->assertOk()->assertJsonPath('messages.0.id', $message->id);
+    }
 }